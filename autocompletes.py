@@ -1,22 +1,114 @@
+import sys
+import asyncio
 import discord
 from discord import app_commands
-from typing import List, Optional, Set, Any, Callable, Awaitable, Tuple
+from typing import List, Optional, Set, Dict, Any, Callable, Awaitable, Tuple, Iterator, Hashable
 import base62
 import re
-import yaml
 import json
+import heapq
+from itertools import islice
+from functools import wraps
+from contextlib import contextmanager
+from Levenshtein import distance as levenshtein_distance
 from cachetools import TTLCache
+from pydantic import BaseModel
 
 from bot import HASSDiscordBot
-from helpers import tokenize, fuzzy_keyword_match_with_order, shorten_option_name, get_domain_from_entity_id, is_matching
+from helpers import tokenize, fuzzy_keyword_match_with_order, shorten_option_name, is_matching, to_list
 from models.FloorModel import FloorModel
 from models.AreaModel import AreaModel
-from models.DeviceModel import DeviceModel
-from models.EntityModel import EntityModel
+from models.DeviceDisplayModel import DeviceDisplayModel
+from models.EntityDisplayRecord import EntityDisplayRecord
 from models.LabelModel import LabelModel
-from models.ServiceModel import ServiceFieldSelectorEntityFilter, ServiceFieldSelectorDeviceFilter, ServiceFieldSelectorSelectOption
+from models.InternedIdList import ID_INTERNER
+from models.ServiceModel import ServiceFieldSelectorEntityFilter, ServiceFieldSelectorDeviceFilter, ServiceFieldSelectorSelectOption, replacePlainSelectorOptions
 from models.MDIIconMeta import MDIIconMeta
 from enums.emojis import Emoji
+from enums.HomeAssistantCacheId import HomeAssistantCacheId
+from enums.HomeAssistantRequestPriority import HomeAssistantRequestPriority
+from scheduler import request_priority
+
+# Shared results of identical queries (several users typing the same prefix into the same field)
+REGISTRY_SOURCE_IDS = (
+  HomeAssistantCacheId.ENTITIES_DISPLAY, HomeAssistantCacheId.DEVICES_DISPLAY,
+  HomeAssistantCacheId.AREAS, HomeAssistantCacheId.FLOORS, HomeAssistantCacheId.LABELS
+)
+
+def get_key_value(value: Any) -> Hashable:
+  if isinstance(value, (list, tuple)):
+    return tuple(get_key_value(x) for x in value)
+  if isinstance(value, dict):
+    return tuple(sorted((k, get_key_value(v)) for k, v in value.items()))
+  if isinstance(value, BaseModel): # Selector filters
+    return (type(value).__name__, value.model_dump_json())
+  return value
+
+def has_integration_filter(kwargs: Dict[str, Any]) -> bool:
+  # Integration entities are fetched on every query, they are not part of the source versions
+  return any(
+    current_filter.integration is not None
+    for name in ('entity_filter', 'device_filter')
+    for current_filter in to_list(kwargs.get(name)) or []
+  )
+
+async def get_default_choices(
+  interaction: discord.Interaction,
+  func: Callable[..., Awaitable[List[app_commands.Choice[str]]]],
+  except_values: Optional[List[str]],
+  kwargs: Dict[str, Any]
+) -> Dict[str, app_commands.Choice[str]]:
+  """All choices of an empty input (every choice scores 0) by value, alphabetically"""
+  choices = await func(interaction, '', except_values, **kwargs, limit=sys.maxsize)
+  return { choice.value: choice for choice in sorted(choices, key=lambda x: x.name.casefold()) }
+
+def get_default_page(bot: HASSDiscordBot, choices: Dict[str, app_commands.Choice[str]]) -> List[app_commands.Choice[str]]:
+  """The recently used choices first, then alphabetically"""
+  limit = bot.MAX_AUTOCOMPLETE_CHOICES
+  page = list(islice((choices[value] for value in bot.recent_choices if value in choices), limit))
+  recent_values = set(choice.value for choice in page)
+  page += islice((choice for choice in choices.values() if choice.value not in recent_values), limit - len(page))
+  return page
+
+def shared_autocomplete(*source_ids: str):
+  """
+  Identical queries share a single computation and its result is reused for a short time.
+  The key holds the arguments, the input tokens (the choices are scored on them only) and the versions of the cached source data.
+  All choices of an empty input (most requests - sent when the option is focused) are kept until the source data changes, the recently used are put first on every request.
+  Empty results, results computed while a Home Assistant fetch failed and results of integration filters are not kept.
+  """
+  def decorator(func: Callable[..., Awaitable[List[app_commands.Choice[str]]]]):
+    @wraps(func)
+    async def wrapper(interaction: discord.Interaction, current_input: str, except_values: Optional[List[str]] = None, **kwargs) -> List[app_commands.Choice[str]]:
+      bot: HASSDiscordBot = interaction.client
+      tokens = tuple(tokenize(current_input))
+      key = (
+        func.__name__,
+        tokens,
+        get_key_value(except_values),
+        get_key_value(kwargs),
+        tuple(bot.homeassistant_client.get_cache_version(id) for id in source_ids)
+      )
+      if len(tokens) == 0:
+        cache = bot.autocomplete_pages
+        compute = lambda: get_default_choices(interaction, func, except_values, kwargs)
+      else:
+        cache = bot.autocomplete_cache
+        compute = lambda: func(interaction, current_input, except_values, **kwargs)
+      async def compute_complete() -> Tuple[List[app_commands.Choice[str]] | Dict[str, app_commands.Choice[str]], bool]:
+        failures = bot.homeassistant_client.fetch_failures
+        choices = await compute()
+        return choices, bot.homeassistant_client.fetch_failures == failures
+      choices = cache.get(key)
+      if choices is None:
+        choices, complete = await bot.autocomplete_flights.run(key, compute_complete)
+        if complete and len(choices) > 0 and not has_integration_filter(kwargs): # Results of failed fetches are not kept, the next query tries again
+          cache[key] = choices
+      if len(tokens) == 0:
+        return get_default_page(bot, choices)
+      return list(choices)
+    return wrapper
+  return decorator
 
 # MDI Icons
 async def get_icon_autocomplete_choices(
@@ -50,10 +142,13 @@ async def get_icon_autocomplete_choices(
   ]
   return choice_list
   
+@shared_autocomplete(HomeAssistantCacheId.MDI_ICONS)
 async def icon_autocomplete(
   interaction: discord.Interaction,
   current_input: str,
-  except_values: Optional[List[str]] = None
+  except_values: Optional[List[str]] = None,
+  *,
+  limit: Optional[int] = None
 ) -> List[app_commands.Choice[str]]:
   bot: HASSDiscordBot = interaction.client
   choice_list: List[Tuple[int, app_commands.Choice[str]]] = await get_icon_autocomplete_choices(bot, current_input)
@@ -62,7 +157,7 @@ async def icon_autocomplete(
   choice_list.sort(key=lambda x: x[0], reverse=True)
 
   min_score = choice_list[0][0] * (1 - bot.SIMILARITY_TOLERANCE) if len(choice_list) != 0 else 0
-  return [x[1] for x in choice_list[:bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
+  return [x[1] for x in choice_list[:limit if limit is not None else bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
 
 # Labels
 async def get_label_autocomplete_choices(
@@ -102,6 +197,7 @@ async def get_label_autocomplete_choices(
   ]
   return choice_list
   
+@shared_autocomplete(*REGISTRY_SOURCE_IDS)
 async def filtered_label_autocomplete(
   interaction: discord.Interaction,
   current_input: str,
@@ -110,7 +206,8 @@ async def filtered_label_autocomplete(
   exclude_values: Optional[List[str]] = None,
   include_values: Optional[List[str]] = None,
   entity_filter: Optional[List[ServiceFieldSelectorEntityFilter]] = None,
-  device_filter: Optional[List[ServiceFieldSelectorDeviceFilter]] = None
+  device_filter: Optional[List[ServiceFieldSelectorDeviceFilter]] = None,
+  limit: Optional[int] = None
 ) -> List[app_commands.Choice[str]]:
   bot: HASSDiscordBot = interaction.client
   matching_entities: Set[str] | None = await get_matching_entities(bot, entity_filter=entity_filter)
@@ -129,7 +226,7 @@ async def filtered_label_autocomplete(
   choice_list.sort(key=lambda x: x[0], reverse=True)
 
   min_score = choice_list[0][0] * (1 - bot.SIMILARITY_TOLERANCE) if len(choice_list) != 0 else 0
-  return [x[1] for x in choice_list[:bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
+  return [x[1] for x in choice_list[:limit if limit is not None else bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
 
 async def label_autocomplete(
   interaction: discord.Interaction,
@@ -175,6 +272,7 @@ async def get_floor_autocomplete_choices(
   ]
   return choice_list
 
+@shared_autocomplete(*REGISTRY_SOURCE_IDS)
 async def filtered_floor_autocomplete(
   interaction: discord.Interaction,
   current_input: str,
@@ -183,7 +281,8 @@ async def filtered_floor_autocomplete(
   exclude_values: Optional[List[str]] = None,
   include_values: Optional[List[str]] = None,
   entity_filter: Optional[List[ServiceFieldSelectorEntityFilter]] = None,
-  device_filter: Optional[List[ServiceFieldSelectorDeviceFilter]] = None
+  device_filter: Optional[List[ServiceFieldSelectorDeviceFilter]] = None,
+  limit: Optional[int] = None
 ) -> List[app_commands.Choice[str]]:
   bot: HASSDiscordBot = interaction.client
   matching_entities: Set[str] | None = await get_matching_entities(bot, entity_filter=entity_filter)
@@ -202,7 +301,7 @@ async def filtered_floor_autocomplete(
   choice_list.sort(key=lambda x: x[0], reverse=True)
 
   min_score = choice_list[0][0] * (1 - bot.SIMILARITY_TOLERANCE) if len(choice_list) != 0 else 0
-  return [x[1] for x in choice_list[:bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
+  return [x[1] for x in choice_list[:limit if limit is not None else bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
   
 async def floor_autocomplete(
   interaction: discord.Interaction,
@@ -248,6 +347,7 @@ async def get_area_autocomplete_choices(
   ]
   return choice_list
 
+@shared_autocomplete(*REGISTRY_SOURCE_IDS)
 async def filtered_area_autocomplete(
   interaction: discord.Interaction,
   current_input: str,
@@ -256,7 +356,8 @@ async def filtered_area_autocomplete(
   exclude_values: Optional[List[str]] = None,
   include_values: Optional[List[str]] = None,
   entity_filter: Optional[List[ServiceFieldSelectorEntityFilter]] = None,
-  device_filter: Optional[List[ServiceFieldSelectorDeviceFilter]] = None
+  device_filter: Optional[List[ServiceFieldSelectorDeviceFilter]] = None,
+  limit: Optional[int] = None
 ) -> List[app_commands.Choice[str]]:
   bot: HASSDiscordBot = interaction.client
   matching_entities: Set[str] | None = await get_matching_entities(bot, entity_filter=entity_filter)
@@ -274,7 +375,7 @@ async def filtered_area_autocomplete(
   choice_list.sort(key=lambda x: x[0], reverse=True)
 
   min_score = choice_list[0][0] * (1 - bot.SIMILARITY_TOLERANCE) if len(choice_list) != 0 else 0
-  return [x[1] for x in choice_list[:bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
+  return [x[1] for x in choice_list[:limit if limit is not None else bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
   
 async def area_autocomplete(
   interaction: discord.Interaction,
@@ -293,7 +394,7 @@ async def get_device_autocomplete_choices(
   include_values: Optional[List[str]] = None
 ) -> List[Tuple[int, app_commands.Choice[str]]]:
   try:
-    homeassistant_devices: List[DeviceModel] = await bot.homeassistant_client.cache_async_custom_get_devices()
+    homeassistant_devices: List[DeviceDisplayModel] = await bot.homeassistant_client.cache_async_custom_get_display_devices()
     if homeassistant_devices is None:
       raise Exception("No devices were returned")
   except Exception as e:
@@ -309,10 +410,10 @@ async def get_device_autocomplete_choices(
     (
       max(
         fuzzy_keyword_match_with_order(tokenize(device.id), target_tokens),
-        fuzzy_keyword_match_with_order(tokenize(device.name), target_tokens)
+        fuzzy_keyword_match_with_order(tokenize(device.display_name), target_tokens)
       ),
       app_commands.Choice(
-        name=shorten_option_name(f"{display_prefix}{device.name} ({device.id})"),
+        name=shorten_option_name(f"{display_prefix}{device.display_name} ({device.id})"),
         value=f'{prefix}{bot.homeassistant_client.escape_id(device.id)}'
       )
     )
@@ -320,6 +421,7 @@ async def get_device_autocomplete_choices(
   ]
   return choice_list
   
+@shared_autocomplete(*REGISTRY_SOURCE_IDS)
 async def filtered_device_autocomplete(
   interaction: discord.Interaction,
   current_input: str,
@@ -328,7 +430,8 @@ async def filtered_device_autocomplete(
   exclude_values: Optional[List[str]] = None,
   include_values: Optional[List[str]] = None,
   device_filter: Optional[List[ServiceFieldSelectorDeviceFilter]] = None,
-  entity_filter: Optional[List[ServiceFieldSelectorEntityFilter]] = None
+  entity_filter: Optional[List[ServiceFieldSelectorEntityFilter]] = None,
+  limit: Optional[int] = None
 ) -> List[app_commands.Choice[str]]:
   bot: HASSDiscordBot = interaction.client
   matching_entities: Set[str] | None = await get_matching_entities(bot, entity_filter=entity_filter)
@@ -345,7 +448,7 @@ async def filtered_device_autocomplete(
   choice_list.sort(key=lambda x: x[0], reverse=True)
 
   min_score = choice_list[0][0] * (1 - bot.SIMILARITY_TOLERANCE) if len(choice_list) != 0 else 0
-  return [x[1] for x in choice_list[:bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
+  return [x[1] for x in choice_list[:limit if limit is not None else bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
   
 async def device_autocomplete(
   interaction: discord.Interaction,
@@ -364,7 +467,7 @@ async def get_entity_autocomplete_choices(
   include_values: Optional[List[str]] = None
 ) -> List[Tuple[int, app_commands.Choice[str]]]:
   try:
-    homeassistant_entities: List[EntityModel] = await bot.homeassistant_client.cache_async_custom_get_entities()
+    homeassistant_entities: List[EntityDisplayRecord] = await bot.homeassistant_client.cache_async_custom_get_display_entities()
     if homeassistant_entities is None:
       raise Exception("No entities were returned")
   except Exception as e:
@@ -391,6 +494,7 @@ async def get_entity_autocomplete_choices(
   ]
   return choice_list
 
+@shared_autocomplete(*REGISTRY_SOURCE_IDS)
 async def filtered_entity_autocomplete(
   interaction: discord.Interaction,
   current_input: str,
@@ -398,7 +502,8 @@ async def filtered_entity_autocomplete(
   *,
   exclude_values: Optional[List[str]] = None,
   include_values: Optional[List[str]] = None,
-  entity_filter: Optional[List[ServiceFieldSelectorEntityFilter]] = None
+  entity_filter: Optional[List[ServiceFieldSelectorEntityFilter]] = None,
+  limit: Optional[int] = None
 ) -> List[app_commands.Choice[str]]:
   bot: HASSDiscordBot = interaction.client
   choice_list: List[Tuple[int, app_commands.Choice[str]]] = await get_entity_autocomplete_choices(
@@ -413,7 +518,7 @@ async def filtered_entity_autocomplete(
   choice_list.sort(key=lambda x: x[0], reverse=True)
 
   min_score = choice_list[0][0] * (1 - bot.SIMILARITY_TOLERANCE) if len(choice_list) != 0 else 0
-  return [x[1] for x in choice_list[:bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
+  return [x[1] for x in choice_list[:limit if limit is not None else bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
 
 async def entity_autocomplete(
   interaction: discord.Interaction,
@@ -422,6 +527,7 @@ async def entity_autocomplete(
   return await filtered_entity_autocomplete(interaction, current_input)
 
 # Combined
+@shared_autocomplete(*REGISTRY_SOURCE_IDS)
 async def label_floor_area_device_entity_autocomplete(
   interaction: discord.Interaction,
   current_input: str,
@@ -430,7 +536,8 @@ async def label_floor_area_device_entity_autocomplete(
   exclude_values: Optional[List[str]] = None,
   include_values: Optional[List[str]] = None,
   device_filter: Optional[List[ServiceFieldSelectorDeviceFilter]] = None,
-  entity_filter: Optional[List[ServiceFieldSelectorEntityFilter]] = None
+  entity_filter: Optional[List[ServiceFieldSelectorEntityFilter]] = None,
+  limit: Optional[int] = None
 ) -> List[app_commands.Choice[str]]:
   bot: HASSDiscordBot = interaction.client
   final_exclude_values=(exclude_values if exclude_values is not None else []) + (except_values if except_values is not None else [])
@@ -455,7 +562,7 @@ async def label_floor_area_device_entity_autocomplete(
   choice_list.sort(key=lambda x: x[0], reverse=True)
 
   min_score = choice_list[0][0] * (1 - bot.SIMILARITY_TOLERANCE) if len(choice_list) != 0 else 0
-  return [x[1] for x in choice_list[:bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
+  return [x[1] for x in choice_list[:limit if limit is not None else bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
 
 # Multiple autocomplete
 class MultipleAutocompleteData():
@@ -551,6 +658,7 @@ async def multiple_autocomplete(
   return new_choices
 
 def transform_object(src: str, interaction: Optional[discord.Interaction] = None) -> Any:
+  import yaml # Imported lazily, only needed by object selectors
   try:
       return yaml.safe_load(src)
   except yaml.YAMLError:
@@ -622,48 +730,201 @@ def transform_multiple_autocomplete(
   return madata.data
 
 # Custom
+class ChoiceIndex():
+  # Immutable search structure for a static option list, built once and shared by all fields using it
+  def __init__(self, options: List[ServiceFieldSelectorSelectOption]):
+    self.options = options
+    token_ids: Dict[str, int] = {}
+    def get_token_ids(text: str) -> List[int]:
+      return [token_ids.setdefault(token, len(token_ids)) for token in tokenize(text)]
+    self.label_tokens: List[List[int]] = [get_token_ids(str(x.label)) for x in options]
+    self.value_tokens: List[List[int]] = [get_token_ids(str(x.value)) for x in options]
+    self.vocabulary: List[str] = list(token_ids) # Unique tokens of all labels and values
+    self.choices: List[app_commands.Choice[str]] = [
+      app_commands.Choice(
+        name=shorten_option_name(str(x.label)),
+        value=str(x.value)
+      )
+      for x in options
+    ]
+    self.values: Dict[str, Any] = {}
+    for x in options:
+      self.values.setdefault(str(x.value), x.value)
+    self.default_pages: Dict[int, List[app_commands.Choice[str]]] = {}
+
+  def __len__(self) -> int:
+    return len(self.options)
+
+  def get_default_page(self, limit: int) -> List[app_commands.Choice[str]]:
+    # Empty input scores every option 0, the page is just the first options in order
+    if limit not in self.default_pages:
+      self.default_pages[limit] = self.choices[:limit]
+    return list(self.default_pages[limit]) # Callers may change the returned list
+
+  def score(self, option_tokens: List[int], distances: List[List[float]]) -> float:
+    # Same as fuzzy_keyword_match_with_order, with the token distances computed once per query
+    if not option_tokens:
+      return 0.0
+    total_similarity = 0.0
+    match_indexes = []
+    for user_distances in distances:
+      best_score = float('inf')
+      best_index = -1
+      for i, token_id in enumerate(option_tokens):
+        norm = user_distances[token_id]
+        if norm < best_score:
+          best_score = norm
+          best_index = i
+      total_similarity += 1 - best_score
+      match_indexes.append(best_index)
+
+    average_similarity = total_similarity / len(distances)
+    order_score = sum(
+      1 for i in range(1, len(match_indexes))
+      if match_indexes[i] > match_indexes[i - 1]
+    ) / len(match_indexes)
+    return 0.9 * average_similarity + 0.1 * order_score
+
+  def search(self, current_input: str, limit: int, tolerance: float, except_values: Optional[List[str]] = None) -> List[app_commands.Choice[str]]:
+    excluded = set(except_values) if except_values is not None else set()
+    input_tokens = tokenize(current_input)
+    if not input_tokens:
+      if not excluded:
+        return self.get_default_page(limit)
+      return list(islice((x for x in self.choices if x.value not in excluded), limit))
+
+    # Each input token is compared with each unique option token only once
+    distances = [
+      [levenshtein_distance(user_token, token) / max(len(user_token), len(token)) for token in self.vocabulary]
+      for user_token in input_tokens
+    ]
+    scored = (
+      (max(self.score(label_tokens, distances), self.score(value_tokens, distances)), choice)
+      for label_tokens, value_tokens, choice in zip(self.label_tokens, self.value_tokens, self.choices)
+      if choice.value not in excluded
+    )
+    top = heapq.nlargest(limit, scored, key=lambda x: x[0]) # Stable, same order as a full sort
+    min_score = top[0][0] * (1 - tolerance) if len(top) != 0 else 0
+    return [x[1] for x in top if x[0] >= min_score]
+
 async def choice_autocomplete(
   interaction: discord.Interaction,
   current_input: str,
   except_values: Optional[List[str]] = None,
   *,
-  all_choices: List[ServiceFieldSelectorSelectOption]
+  all_choices: List[ServiceFieldSelectorSelectOption] | ChoiceIndex
 ) -> List[app_commands.Choice[str]]:
   bot: HASSDiscordBot = interaction.client
-  target_tokens = tokenize(current_input)
-  choice_list = [
-    (
-      max(
-        fuzzy_keyword_match_with_order(tokenize(str(choice.label)), target_tokens),
-        fuzzy_keyword_match_with_order(tokenize(str(choice.value)), target_tokens)
-      ),
-      app_commands.Choice(
-        name=shorten_option_name(str(choice.label)),
-        value=str(choice.value)
-      )
+  index = all_choices if isinstance(all_choices, ChoiceIndex) else ChoiceIndex(all_choices)
+  return index.search(current_input, bot.MAX_AUTOCOMPLETE_CHOICES, bot.SIMILARITY_TOLERANCE, except_values)
+
+# Attributes
+async def get_attribute_options(
+  bot: HASSDiscordBot,
+  entity_id: Optional[List[str] | str],
+  hide_attributes: Optional[List[str]]
+) -> ChoiceIndex:
+  if entity_id is None:
+    return ChoiceIndex([])
+
+  def build_options(entity_attributes: Dict[str, List[str]]) -> ChoiceIndex:
+    attributes: Set[str] = set()
+    for current_entity_id in to_list(entity_id):
+      attributes.update(entity_attributes.get(current_entity_id, []))
+    if hide_attributes is not None:
+      attributes.difference_update(hide_attributes)
+    return ChoiceIndex(replacePlainSelectorOptions(sorted(attributes)))
+
+  return await bot.homeassistant_client.async_cache_derived(
+    f'{HomeAssistantCacheId.ENTITY_ATTRIBUTES} {json.dumps([entity_id, hide_attributes])}',
+    bot.homeassistant_client.cache_async_get_entity_attributes,
+    HomeAssistantCacheId.ENTITIES,
+    build_options
+  )
+
+async def attribute_autocomplete(
+  interaction: discord.Interaction,
+  current_input: str,
+  except_values: Optional[List[str]] = None,
+  *,
+  entity_id: Optional[List[str] | str],
+  hide_attributes: Optional[List[str]] = None
+) -> List[app_commands.Choice[str]]:
+  bot: HASSDiscordBot = interaction.client
+  try:
+    attribute_options = await get_attribute_options(bot, entity_id, hide_attributes)
+  except Exception as e:
+    bot.logger.error("Failed to fetch entity attributes - %s %s", type(e), e)
+    return []
+  return await choice_autocomplete(interaction, current_input, except_values, all_choices=attribute_options)
+
+async def require_attribute(
+  input: str,
+  interaction: discord.Interaction,
+  entity_id: Optional[List[str] | str],
+  hide_attributes: Optional[List[str]] = None
+) -> Any:
+  return require_choice(input, interaction, all_choices=await get_attribute_options(interaction.client, entity_id, hide_attributes))
+
+def get_focused_option_name(options: List[Dict[str, Any]]) -> Optional[str]:
+  for option in options:
+    if option.get('focused'):
+      return option['name']
+    if 'options' in option: # Subcommand (group)
+      name = get_focused_option_name(option['options'])
+      if name is not None:
+        return name
+  return None
+
+class AutocompleteTasks():
+  """Running autocomplete per (user, command, option) - a newer keystroke cancels the previous one, Discord has already discarded its response"""
+  tasks: Dict[Tuple[int, str, Optional[str]], asyncio.Task] = {}
+  superseded: int = 0
+
+  @staticmethod
+  def get_key(interaction: discord.Interaction) -> Tuple[int, str, Optional[str]]:
+    return (
+      interaction.user.id,
+      interaction.command.qualified_name if interaction.command is not None else '',
+      get_focused_option_name((interaction.data or {}).get('options', []))
     )
-    for choice in all_choices
-  ]
-  if except_values is not None:
-    choice_list = list(filter(lambda x: x[1].value not in except_values, choice_list))
-  choice_list.sort(key=lambda x: x[0], reverse=True)
 
-  min_score = choice_list[0][0] * (1 - bot.SIMILARITY_TOLERANCE) if len(choice_list) != 0 else 0
-  return [x[1] for x in choice_list[:bot.MAX_AUTOCOMPLETE_CHOICES] if x[0] >= min_score]
+  @classmethod
+  @contextmanager
+  def track(cl, interaction: discord.Interaction) -> Iterator[None]:
+    # Shared fetches are shielded (`async_cache_data`), cancelling the task only stops its own work
+    key = cl.get_key(interaction)
+    task = asyncio.current_task()
+    previous = cl.tasks.get(key)
+    if previous is not None and not previous.done():
+      previous.cancel()
+      cl.superseded += 1
+    cl.tasks[key] = task
+    try:
+      yield
+    finally:
+      if cl.tasks.get(key) is task:
+        del cl.tasks[key]
 
 def require_permission_autocomplete(
   func, check_role: Optional[str] = None
 ) -> List[app_commands.Choice[str]]:
   async def handler(interaction: discord.Interaction, current_input: str) -> List[app_commands.Choice[str]]:
     bot: HASSDiscordBot = interaction.client
-    if not await bot.check_user_guild(interaction, check_role):
-      return [app_commands.Choice(name=f'{Emoji.WARNING} Failed to fetch suggestions.', value='')]
-    
-    return await func(interaction, current_input)
+    with AutocompleteTasks.track(interaction):
+      if not await bot.check_user_guild(interaction, check_role):
+        return [app_commands.Choice(name=f'{Emoji.WARNING} Failed to fetch suggestions.', value='')]
+      
+      with request_priority(HomeAssistantRequestPriority.AUTOCOMPLETE):
+        return await func(interaction, current_input)
   return handler
 
 # Validation
-def require_choice(input: str, interaction: discord.Interaction, all_choices: List[ServiceFieldSelectorSelectOption], allow_custom: bool = False) -> Any:
+def require_choice(input: str, interaction: discord.Interaction, all_choices: List[ServiceFieldSelectorSelectOption] | ChoiceIndex, allow_custom: bool = False) -> Any:
+  if isinstance(all_choices, ChoiceIndex):
+    if input in all_choices.values:
+      return all_choices.values[input]
+    all_choices = []
   for choice in all_choices:
     if str(choice.value) == input:
       return choice.value
@@ -689,13 +950,16 @@ async def get_matching_labels( # Labels base on areas, devices and entities
     bot.logger.error("Failed to fetch labels - %s %s", type(e), e)
     return []
   
+  matching_area_ids = ID_INTERNER.lookup_set(matching_areas) if matching_areas is not None else None
+  matching_device_ids = ID_INTERNER.lookup_set(matching_devices) if matching_devices is not None else None
+  matching_entity_ids = ID_INTERNER.lookup_set(matching_entities) if matching_entities is not None else None
   matching_labels = set()
   for label in homeassistant_labels:
-    if matching_areas is not None and len(set(label.areas).intersection(matching_areas)) != 0:
+    if matching_area_ids is not None and label.areas.intersects(matching_area_ids):
       matching_labels.add(label.id)
-    elif matching_devices is not None and len(set(label.devices).intersection(matching_devices)) != 0:
+    elif matching_device_ids is not None and label.devices.intersects(matching_device_ids):
       matching_labels.add(label.id)
-    elif matching_entities is not None and len(set(label.entities).intersection(matching_entities)) != 0:
+    elif matching_entity_ids is not None and label.entities.intersects(matching_entity_ids):
       matching_labels.add(label.id)
   
   return matching_labels
@@ -715,9 +979,10 @@ async def get_matching_floors( # Getting matching floors seems to only base on m
     bot.logger.error("Failed to fetch floors - %s %s", type(e), e)
     return []
   
+  matching_area_ids = ID_INTERNER.lookup_set(matching_areas)
   matching_floors = set()
   for floor in homeassistant_floors:
-    if len(set(floor.areas).intersection(matching_areas)) != 0:
+    if floor.areas.intersects(matching_area_ids):
       matching_floors.add(floor.id)
 
   return matching_floors
@@ -738,11 +1003,13 @@ async def get_matching_areas(
     bot.logger.error("Failed to fetch areas - %s %s", type(e), e)
     return []
   
+  matching_device_ids = ID_INTERNER.lookup_set(matching_devices) if matching_devices is not None else None
+  matching_entity_ids = ID_INTERNER.lookup_set(matching_entities) if matching_entities is not None else None
   matching_areas = set()
   for area in homeassistant_areas:
-    if matching_devices is not None and len(set(area.devices).intersection(matching_devices)) != 0:
+    if matching_device_ids is not None and area.devices.intersects(matching_device_ids):
       matching_areas.add(area.id)
-    elif matching_entities is not None and len(set(area.entities).intersection(matching_entities)) != 0:
+    elif matching_entity_ids is not None and area.entities.intersects(matching_entity_ids):
       matching_areas.add(area.id)
   
   return matching_areas
@@ -756,7 +1023,7 @@ async def get_matching_devices(
     return None
   
   try:
-    homeassistant_devices: List[DeviceModel] = await bot.homeassistant_client.cache_async_custom_get_devices()
+    homeassistant_devices: List[DeviceDisplayModel] = await bot.homeassistant_client.cache_async_custom_get_display_devices()
     if homeassistant_devices is None:
       raise Exception("No devices were returned")
   except Exception as e:
@@ -764,20 +1031,21 @@ async def get_matching_devices(
     return set()
   
   if matching_entities is not None:
-    homeassistant_devices = filter(lambda x: len(set(x.entities).intersection(matching_entities)) != 0, homeassistant_devices)
+    matching_entity_ids = ID_INTERNER.lookup_set(matching_entities)
+    homeassistant_devices = list(filter(lambda x: x.entities.intersects(matching_entity_ids), homeassistant_devices))
   
   if not (device_filter is None or len(device_filter) == 0):
-    filter_matching_devices: Set[DeviceModel] = set()
+    filter_matching_devices: Dict[str, DeviceDisplayModel] = {}
     for current_filter in device_filter:
-      filter_devices: List[DeviceModel] = homeassistant_devices
+      filter_devices: List[DeviceDisplayModel] = homeassistant_devices
       if current_filter.integration is not None:
         try:
-          integration_entities: Set[str] = set(await bot.homeassistant_client.async_custom_get_integration_entities(current_filter.integration))
+          integration_entity_ids: Set[int] = ID_INTERNER.lookup_set(await bot.homeassistant_client.async_custom_get_integration_entities(current_filter.integration))
         except Exception as e:
           bot.logger.error("Failed to fetch integration entities - %s %s", type(e), e)
           return set()
         # I don't think it's currently possible to fetch the device's config entry and it's related integration?
-        filter_devices = filter(lambda x: len(integration_entities.intersection(set(x.entities))) != 0, filter_devices) # Any of the device's entities should belong to the integration
+        filter_devices = filter(lambda x: x.entities.intersects(integration_entity_ids), filter_devices) # Any of the device's entities should belong to the integration
 
       if current_filter.manufacturer is not None:
         filter_devices = filter(lambda x: x.manufacturer is not None and x.manufacturer == current_filter.manufacturer, filter_devices)
@@ -788,8 +1056,8 @@ async def get_matching_devices(
       if current_filter.model_id is not None:
         filter_devices = filter(lambda x: x.model_id is not None and x.model_id == current_filter.model_id, filter_devices)
 
-      filter_matching_devices.update(filter_devices)
-    homeassistant_devices = list(filter_matching_devices)
+      filter_matching_devices.update((device.id, device) for device in filter_devices)
+    homeassistant_devices = list(filter_matching_devices.values())
 
   return set([ device.id for device in homeassistant_devices ])  
 
@@ -801,7 +1069,7 @@ async def get_matching_entities(
     return None # Function returns None if there is no filter
   
   try:
-    homeassistant_entities: List[EntityModel] = await bot.homeassistant_client.cache_async_custom_get_entities()
+    homeassistant_entities: List[EntityDisplayRecord] = await bot.homeassistant_client.cache_async_custom_get_display_entities()
     if homeassistant_entities is None:
       raise Exception("No entities were returned")
   except Exception as e:
@@ -810,7 +1078,7 @@ async def get_matching_entities(
   
   filter_matching_entities: Set[str] = set()
   for current_filter in entity_filter:
-    filter_entities: List[EntityModel] = homeassistant_entities
+    filter_entities: List[EntityDisplayRecord] = homeassistant_entities
     if current_filter.integration is not None:
       try:
         integration_entities: Set[str] = set(await bot.homeassistant_client.async_custom_get_integration_entities(current_filter.integration))
@@ -820,15 +1088,15 @@ async def get_matching_entities(
       filter_entities = filter(lambda x: x.entity_id in integration_entities, filter_entities)
     
     if current_filter.domain is not None: # Remove entities which have incorrect domain
-      filter_entities = filter(lambda x: is_matching(current_filter.domain, get_domain_from_entity_id(x.entity_id)), filter_entities)
+      filter_entities = filter(lambda x: is_matching(current_filter.domain, x.domain), filter_entities)
 
     if current_filter.device_class is not None: # Remove entities which have incorrect device_class (or don't have it)
-      filter_entities = filter(lambda x: (device_class := x.attributes.get('device_class') is not None and is_matching(current_filter.device_class, device_class)), filter_entities)
+      filter_entities = filter(lambda x: x.device_class is not None and is_matching(current_filter.device_class, x.device_class), filter_entities)
     
     if current_filter.supported_features is not None: # Remove entities which don't have required features
-      new_filter_entities: List[EntityModel] = []
+      new_filter_entities: List[EntityDisplayRecord] = []
       for entity in filter_entities:
-        entity_supported_features = entity.attributes.get('supported_features')
+        entity_supported_features = entity.supported_features
         if entity_supported_features is not None and isinstance(entity_supported_features, int):
           any_matching = False
           if isinstance(current_filter.supported_features, int):
@@ -0,0 +1,212 @@
+import asyncio
+import statistics
+import time
+from functools import partial
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+from autocompletes import (
+  label_autocomplete, floor_autocomplete, area_autocomplete, device_autocomplete, entity_autocomplete,
+  filtered_entity_autocomplete, filtered_device_autocomplete, filtered_area_autocomplete, filtered_floor_autocomplete,
+  filtered_label_autocomplete, label_floor_area_device_entity_autocomplete, choice_autocomplete, icon_autocomplete, attribute_autocomplete,
+  multiple_autocomplete, ChoiceIndex, get_matching_entities, get_matching_devices, get_matching_areas, get_matching_floors, get_matching_labels,
+  require_permission_autocomplete
+)
+from models.ServiceModel import ServiceFieldSelectorEntityFilter, ServiceFieldSelectorDeviceFilter, replacePlainSelectorOptions
+from cogs.services import get_language_choices, get_country_choices
+from benchmarks.harness import benchmark, measure
+from benchmarks.fixtures import get_home_fixture, HOME_SIZES
+from benchmarks.fakeclient import create_bot, create_interaction
+
+SIZES = list(HOME_SIZES.values())
+QUERIES = ['', 'kitchen', 'livng rm lamp', 'bedroom 2 temperature', 'sensor.garage_power']
+TYPING_USERS = 10
+TYPING_INPUT = 'kitchen ceiling light'
+TYPING_INTERVAL = 0.01 # Seconds between keystrokes
+CHECK_LATENCY = 0.03 # Simulated Discord member fetch of `check_user_guild`
+SHARED_QUERY_USERS = 10
+
+LIGHT_FILTER = [ServiceFieldSelectorEntityFilter.model_validate({'domain': 'light'})]
+TEMPERATURE_FILTER = [ServiceFieldSelectorEntityFilter.model_validate({'domain': ['sensor', 'binary_sensor'], 'device_class': 'temperature'})]
+FEATURES_FILTER = [ServiceFieldSelectorEntityFilter.model_validate({'domain': 'cover', 'supported_features': [4, 8]})]
+PHILIPS_FILTER = [ServiceFieldSelectorDeviceFilter.model_validate({'manufacturer': 'Philips'})]
+
+AUTOCOMPLETES: Dict[str, Callable[..., Any]] = {
+  'label_autocomplete': label_autocomplete,
+  'floor_autocomplete': floor_autocomplete,
+  'area_autocomplete': area_autocomplete,
+  'device_autocomplete': device_autocomplete,
+  'entity_autocomplete': entity_autocomplete,
+  'filtered_entity_autocomplete[light]': partial(filtered_entity_autocomplete, entity_filter=LIGHT_FILTER),
+  'filtered_entity_autocomplete[temperature]': partial(filtered_entity_autocomplete, entity_filter=TEMPERATURE_FILTER),
+  'filtered_entity_autocomplete[features]': partial(filtered_entity_autocomplete, entity_filter=FEATURES_FILTER),
+  'filtered_device_autocomplete[philips]': partial(filtered_device_autocomplete, device_filter=PHILIPS_FILTER),
+  'filtered_area_autocomplete[light]': partial(filtered_area_autocomplete, entity_filter=LIGHT_FILTER),
+  'filtered_floor_autocomplete[light]': partial(filtered_floor_autocomplete, entity_filter=LIGHT_FILTER),
+  'filtered_label_autocomplete[light]': partial(filtered_label_autocomplete, entity_filter=LIGHT_FILTER),
+  'label_floor_area_device_entity_autocomplete': label_floor_area_device_entity_autocomplete,
+  'label_floor_area_device_entity_autocomplete[light]': partial(label_floor_area_device_entity_autocomplete, entity_filter=LIGHT_FILTER),
+  'multiple_autocomplete[target]': partial(multiple_autocomplete, func=partial(label_floor_area_device_entity_autocomplete, entity_filter=LIGHT_FILTER), allow_custom=True),
+  'choice_autocomplete[60]': partial(choice_autocomplete, all_choices=ChoiceIndex(replacePlainSelectorOptions([f'Option number {i}' for i in range(60)]))),
+  'choice_autocomplete[1000]': partial(choice_autocomplete, all_choices=ChoiceIndex(replacePlainSelectorOptions([f'Choice {i} of a very long list' for i in range(1000)]))),
+  'choice_autocomplete[languages]': partial(choice_autocomplete, all_choices=get_language_choices(None, False)),
+  'choice_autocomplete[countries]': partial(choice_autocomplete, all_choices=get_country_choices(('US', 'GB', 'DE', 'FR', 'PL', 'ES', 'IT', 'NL', 'SE', 'NO', 'JP', 'CN', 'BR', 'CA', 'AU'), False)),
+  'icon_autocomplete': icon_autocomplete
+}
+
+def register_autocomplete_benchmark(name: str, autocomplete: Callable[..., Any]) -> None:
+  @benchmark(f'autocomplete.{name}', sizes=SIZES, group='autocomplete')
+  async def prepare(size: int):
+    bot = create_bot(get_home_fixture(size))
+    interaction = create_interaction(bot)
+    await autocomplete(interaction, '') # Warm up the caches, only the autocomplete itself is measured
+
+    async def operation():
+      bot.autocomplete_cache.clear() # Measure the computation, not the shared results
+      for query in QUERIES:
+        await autocomplete(interaction, query)
+    return operation, len(QUERIES)
+
+for name, autocomplete in AUTOCOMPLETES.items():
+  register_autocomplete_benchmark(name, autocomplete)
+
+@benchmark('autocomplete.attribute_autocomplete', sizes=SIZES, group='autocomplete')
+async def bench_attribute_autocomplete(size: int):
+  fixture = get_home_fixture(size)
+  bot = create_bot(fixture)
+  interaction = create_interaction(bot)
+  autocomplete = partial(attribute_autocomplete, entity_id=[state['entity_id'] for state in fixture.states[::max(1, size // 20)]], hide_attributes=['friendly_name'])
+  await autocomplete(interaction, '')
+
+  async def operation():
+    for query in ['', 'brightness', 'colr mode', 'unit']:
+      await autocomplete(interaction, query)
+  return operation, 4
+
+# Matching cascade (entities -> devices -> areas -> floors / labels)
+@benchmark('matching.get_matching_cascade', sizes=SIZES, group='matching')
+async def bench_matching_cascade(size: int):
+  bot = create_bot(get_home_fixture(size))
+  filters: List[Dict[str, Any]] = [
+    {'entity_filter': LIGHT_FILTER, 'device_filter': None},
+    {'entity_filter': TEMPERATURE_FILTER, 'device_filter': None},
+    {'entity_filter': FEATURES_FILTER, 'device_filter': None},
+    {'entity_filter': LIGHT_FILTER, 'device_filter': PHILIPS_FILTER}
+  ]
+
+  async def operation():
+    for current in filters:
+      matching_entities = await get_matching_entities(bot, entity_filter=current['entity_filter'])
+      matching_devices = await get_matching_devices(bot, matching_entities=matching_entities, device_filter=current['device_filter'])
+      matching_areas = await get_matching_areas(bot, matching_entities=matching_entities, matching_devices=matching_devices)
+      await get_matching_floors(bot, matching_areas=matching_areas)
+      await get_matching_labels(bot, matching_entities=matching_entities, matching_devices=matching_devices, matching_areas=matching_areas)
+  await operation() # Warm up the caches
+  return operation, len(filters)
+
+# Fast typing - every keystroke runs the autocomplete in a separate task, like discord.py does
+async def type_input(handler: Callable[..., Any], bot: Any) -> Dict[str, float]:
+  completed = 0
+  async def keystroke(user_id: int, current_input: str):
+    nonlocal completed
+    interaction = SimpleNamespace(
+      client=bot,
+      user=SimpleNamespace(id=user_id),
+      guild=None,
+      namespace=SimpleNamespace(),
+      command=SimpleNamespace(qualified_name='light turn_on'),
+      data={'name': 'light', 'options': [{'name': 'turn_on', 'type': 1, 'options': [{'name': 'entity_id', 'value': current_input, 'focused': True}]}]}
+    )
+    await handler(interaction, current_input)
+    completed += 1
+
+  started, cpu_started = time.perf_counter(), time.process_time()
+  tasks: List[asyncio.Task] = []
+  for length in range(1, len(TYPING_INPUT) + 1):
+    tasks += [asyncio.create_task(keystroke(user_id, TYPING_INPUT[:length])) for user_id in range(TYPING_USERS)]
+    await asyncio.sleep(TYPING_INTERVAL)
+  await asyncio.gather(*tasks, return_exceptions=True)
+  return { 'duration': time.perf_counter() - started, 'cpu': time.process_time() - cpu_started, 'completed': completed }
+
+@benchmark('autocomplete.fast_typing', sizes=SIZES, group='autocomplete')
+async def bench_fast_typing(size: int):
+  """CPU time of users typing into an entity option, superseded keystrokes cancelled against all of them completing"""
+  bot = create_bot(get_home_fixture(size))
+  async def check_user_guild(interaction, check_role=False) -> bool:
+    await asyncio.sleep(CHECK_LATENCY)
+    return True
+  bot.check_user_guild = check_user_guild
+  func = partial(filtered_entity_autocomplete, entity_filter=LIGHT_FILTER)
+  async def untracked(interaction, current_input: str): # Previous handler - no cancellation
+    await bot.check_user_guild(interaction)
+    return await func(interaction, current_input)
+  await func(create_interaction(bot), '') # Warm up the caches
+
+  tracked_runs = [await type_input(require_permission_autocomplete(func), bot) for _ in range(3)]
+  untracked_runs = [await type_input(untracked, bot)] # Slow, every keystroke scores all entities
+  tracked_cpu = [x['cpu'] for x in tracked_runs]
+  return {
+    'rounds': len(tracked_cpu),
+    'min': min(tracked_cpu),
+    'median': statistics.median(tracked_cpu),
+    'keystrokes': TYPING_USERS * len(TYPING_INPUT),
+    'completed': statistics.median(x['completed'] for x in tracked_runs),
+    'untracked_median': statistics.median(x['cpu'] for x in untracked_runs),
+    'untracked_completed': statistics.median(x['completed'] for x in untracked_runs)
+  }
+
+# Shared results - several users querying the same field at once
+@benchmark('autocomplete.shared_queries', sizes=SIZES, group='autocomplete')
+async def bench_shared_queries(size: int):
+  """Users sending identical target queries at once, shared results against every query computed"""
+  bot = create_bot(get_home_fixture(size))
+  interactions = [create_interaction(bot, user_id) for user_id in range(SHARED_QUERY_USERS)]
+  autocomplete = partial(label_floor_area_device_entity_autocomplete, entity_filter=LIGHT_FILTER)
+  unshared_autocomplete = partial(label_floor_area_device_entity_autocomplete.__wrapped__, entity_filter=LIGHT_FILTER)
+  await autocomplete(interactions[0], '') # Warm up the caches
+
+  async def query(func: Callable[..., Any]):
+    for current_input in QUERIES:
+      await asyncio.gather(*(func(interaction, current_input) for interaction in interactions))
+  async def shared():
+    bot.autocomplete_cache.clear()
+    await query(autocomplete)
+  async def unshared():
+    await query(unshared_autocomplete)
+  return {
+    **await measure(shared),
+    'queries': SHARED_QUERY_USERS * len(QUERIES),
+    'unshared_median': (await measure(unshared))['median']
+  }
+
+# Empty input - sent whenever an option is focused
+@benchmark('autocomplete.empty_input', sizes=SIZES, group='autocomplete')
+async def bench_empty_input(size: int):
+  """Empty input of the entity and target fields served from the default pages, against scoring the whole catalog"""
+  bot = create_bot(get_home_fixture(size))
+  interaction = create_interaction(bot)
+  autocompletes = [entity_autocomplete, partial(label_floor_area_device_entity_autocomplete, entity_filter=LIGHT_FILTER)]
+  unpaged_autocompletes = [filtered_entity_autocomplete.__wrapped__, partial(label_floor_area_device_entity_autocomplete.__wrapped__, entity_filter=LIGHT_FILTER)]
+  for _ in range(2): # The first round fetches the sources, which changes their versions
+    for autocomplete in autocompletes:
+      await autocomplete(interaction, '') # Builds the pages
+
+  async def paged():
+    for autocomplete in autocompletes:
+      await autocomplete(interaction, '')
+  async def rebuilt():
+    bot.autocomplete_pages.clear()
+    await paged()
+  recent_value = (await entity_autocomplete(interaction, ''))[-1].value
+  async def after_use(): # A command used a value, the pages are not rebuilt
+    bot.recent_choices.add(recent_value)
+    await paged()
+  async def unpaged():
+    for autocomplete in unpaged_autocompletes:
+      await autocomplete(interaction, '')
+  return {
+    **await measure(paged),
+    'after_use_median': (await measure(after_use))['median'],
+    'rebuild_median': (await measure(rebuilt))['median'],
+    'unpaged_median': (await measure(unpaged))['median']
+  }
\ No newline at end of file
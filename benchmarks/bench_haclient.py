@@ -0,0 +1,398 @@
+import asyncio
+import json
+import gc
+import os
+import sys
+import tempfile
+import statistics
+import time
+import tracemalloc
+from typing import Dict, List, Any, Callable
+from pydantic import TypeAdapter
+
+from metrics import LoopLagMonitor
+from enums.HomeAssistantCacheId import HomeAssistantCacheId
+from helpers import iter_json_array
+from haclient import ENTITY_LIST_ADAPTER, FLOOR_LIST_ADAPTER, AREA_LIST_ADAPTER, LABEL_LIST_ADAPTER, DEVICE_LIST_ADAPTER, DEVICE_DISPLAY_LIST_ADAPTER, CustomHAClient, json_loads
+from models.FloorModel import FloorModel
+from models.AreaModel import AreaModel
+from models.LabelModel import LabelModel
+from models.DeviceModel import DeviceModel
+from models.EntityRecord import EntityRecord
+from benchmarks.harness import benchmark, measure
+from benchmarks.fixtures import get_home_fixture, HOME_SIZES
+from benchmarks.fakeclient import create_bot, create_logger
+from benchmarks.fakeserver import FakeServerConfig, start_fake_server
+from hawebsocket import HomeAssistantWebsocket
+from scheduler import RequestScheduler, request_priority
+from enums.HomeAssistantRequestPriority import HomeAssistantRequestPriority
+
+SIZES = list(HOME_SIZES.values())
+LOOP_LAG_ROUNDS = 5
+LOOP_LAG_INTERVAL = 0.005
+STATES_PAYLOAD_SIZE = 10 * 1024 * 1024
+ROOT = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
+MEMORY_ENTITY_COUNT = 10000
+DEVICE_DISCOVERY_SIZE = HOME_SIZES['medium']
+TEMPLATE_LATENCY_PER_STATE = 0.00002 # Simulated Home Assistant render time of templates iterating over the states (seconds)
+PRIORITY_BURST = 40 # Background requests started right before the service call
+PRIORITY_SERVER_CONCURRENCY = 4 # Requests the stand-in handles at once
+PRIORITY_SERVER_LATENCY = 0.01
+
+async def measure_loop_lag(client, parse_in_thread_size: float) -> Dict[str, Any]:
+  """Fetches the entities while a monitor measures how long the event loop was blocked"""
+  client.PARSE_IN_THREAD_SIZE = parse_in_thread_size
+  timings: List[float] = []
+  max_lags: List[float] = []
+  for _ in range(LOOP_LAG_ROUNDS):
+    monitor = LoopLagMonitor(interval=LOOP_LAG_INTERVAL, history=10000)
+    monitor.start(threshold=float('inf'))
+    await asyncio.sleep(LOOP_LAG_INTERVAL * 2)
+    started = time.perf_counter()
+    await client.async_custom_get_entities()
+    timings.append(time.perf_counter() - started)
+    await asyncio.sleep(LOOP_LAG_INTERVAL * 2)
+    monitor.stop()
+    max_lags.append(monitor.max_lag)
+  return {
+    'min': min(timings),
+    'median': statistics.median(timings),
+    'max_loop_lag': statistics.median(max_lags)
+  }
+
+@benchmark('haclient.entities_loop_lag', sizes=SIZES, group='haclient')
+async def bench_entities_loop_lag(size: int):
+  client = create_bot(get_home_fixture(size)).homeassistant_client
+  await client.async_custom_get_entities() # Warm up (response serialization)
+
+  inline = await measure_loop_lag(client, float('inf'))
+  offloaded = await measure_loop_lag(client, 0)
+  return {
+    'rounds': LOOP_LAG_ROUNDS,
+    'min': offloaded['min'],
+    'median': offloaded['median'],
+    'max_loop_lag': offloaded['max_loop_lag'],
+    'inline_median': inline['median'],
+    'inline_max_loop_lag': inline['max_loop_lag']
+  }
+
+@benchmark('haclient.parse_states_10mb', group='haclient')
+async def bench_parse_states():
+  states = get_home_fixture(HOME_SIZES['medium']).states
+  entity_size = len(json.dumps(states).encode()) / len(states)
+  payload = json.dumps(get_home_fixture(int(STATES_PAYLOAD_SIZE / entity_size)).states).encode()
+
+  decoded = await measure(lambda: ENTITY_LIST_ADAPTER.validate_python(json.loads(payload)), min_rounds=3, min_time=1)
+  direct = await measure(lambda: ENTITY_LIST_ADAPTER.validate_json(payload), min_rounds=3, min_time=1)
+  fast_decoded = await measure(lambda: ENTITY_LIST_ADAPTER.validate_python(json_loads(payload)), min_rounds=3, min_time=1)
+  return {
+    **direct, # validate_json on the raw bytes (small responses)
+    'payload_bytes': len(payload),
+    'json_loads_validate_python_median': decoded['median'],
+    'json_loads_fast_validate_python_median': fast_decoded['median'], # orjson when installed (chunked parsing of large responses)
+    'json_loads_fast': json_loads.__module__
+  }
+
+def measure_resident_bytes(parse: Callable[[], Any]) -> int:
+  """Memory held by the parsed data (allocated and not freed by the parse)"""
+  gc.collect()
+  tracemalloc.start()
+  try:
+    started = tracemalloc.get_traced_memory()[0]
+    parsed = parse()
+    gc.collect()
+    resident = tracemalloc.get_traced_memory()[0] - started
+  finally:
+    tracemalloc.stop()
+  del parsed
+  return resident
+
+@benchmark('haclient.entity_cache_memory', group='haclient')
+async def bench_entity_cache_memory():
+  payload = json.dumps(get_home_fixture(MEMORY_ENTITY_COUNT).states).encode()
+  records = measure_resident_bytes(lambda: CustomHAClient.parse_entity_records(payload))
+  models = measure_resident_bytes(lambda: ENTITY_LIST_ADAPTER.validate_json(payload))
+  return {
+    'entities': MEMORY_ENTITY_COUNT,
+    'resident_bytes': records,
+    'model_resident_bytes': models, # Full EntityModel objects
+    'reduction': round(models / records, 2)
+  }
+
+# Registry models with the membership lists kept as plain strings
+class PlainFloorModel(FloorModel):
+  areas: List[str]
+  entities: List[str]
+
+class PlainAreaModel(AreaModel):
+  entities: List[str]
+  devices: List[str]
+
+class PlainLabelModel(LabelModel):
+  areas: List[str]
+  devices: List[str]
+  entities: List[str]
+
+class PlainDeviceModel(DeviceModel):
+  entities: List[str]
+
+@benchmark('haclient.registry_memory', group='haclient')
+async def bench_registry_memory():
+  home = get_home_fixture(MEMORY_ENTITY_COUNT)
+  registries = [
+    (FLOOR_LIST_ADAPTER, TypeAdapter(List[PlainFloorModel]), json.dumps(home.floors).encode()),
+    (AREA_LIST_ADAPTER, TypeAdapter(List[PlainAreaModel]), json.dumps(home.areas).encode()),
+    (LABEL_LIST_ADAPTER, TypeAdapter(List[PlainLabelModel]), json.dumps(home.labels).encode()),
+    (DEVICE_LIST_ADAPTER, TypeAdapter(List[PlainDeviceModel]), json.dumps(home.devices).encode())
+  ]
+  parse_interned = lambda: [adapter.validate_json(payload) for adapter, _, payload in registries]
+  first = measure_resident_bytes(parse_interned) # Also pays for the interning table (unless already interned)
+  interned = measure_resident_bytes(parse_interned) # Refreshed snapshot
+  plain = measure_resident_bytes(lambda: [adapter.validate_json(payload) for _, adapter, payload in registries])
+  return {
+    'entities': MEMORY_ENTITY_COUNT,
+    'resident_bytes': interned,
+    'first_resident_bytes': first,
+    'plain_resident_bytes': plain,
+    'reduction': round(plain / interned, 2)
+  }
+
+@benchmark('haclient.display_datasets', sizes=SIZES, group='haclient')
+async def bench_display_datasets(size: int):
+  bot = create_bot(get_home_fixture(size))
+  client = bot.homeassistant_client
+  # Responses rendered once, only the parsing is measured
+  rendered: List[bytes] = []
+  render = client.async_get_rendered_template_bytes
+  async def record(template: str) -> bytes:
+    rendered.append(await render(template))
+    return rendered[-1]
+  client.async_get_rendered_template_bytes = record
+  await client.async_custom_get_devices()
+  await client.async_custom_get_display_entities()
+  await client.async_custom_get_display_devices()
+  entities = await client.async_request_bytes('states')
+  devices, display_entities, display_devices = rendered
+
+  parse_full = lambda: (CustomHAClient.parse_entity_records(entities), DEVICE_LIST_ADAPTER.validate_json(devices))
+  parse_display = lambda: (CustomHAClient.parse_entity_display_records(display_entities), DEVICE_DISPLAY_LIST_ADAPTER.validate_json(display_devices))
+  full = await measure(parse_full)
+  return {
+    **await measure(parse_display),
+    'payload_bytes': len(display_entities) + len(display_devices),
+    'resident_bytes': measure_resident_bytes(parse_display),
+    'full_median': full['median'],
+    'full_payload_bytes': len(entities) + len(devices),
+    'full_resident_bytes': measure_resident_bytes(parse_full)
+  }
+
+@benchmark('haclient.device_discovery', group='haclient')
+async def bench_device_discovery():
+  """Device list from the states template against the device registry, served by the local stand-in"""
+  fixture = get_home_fixture(DEVICE_DISCOVERY_SIZE)
+  _, runner, url = await start_fake_server(fixture, FakeServerConfig(template_latency_per_state=TEMPLATE_LATENCY_PER_STATE))
+  client = CustomHAClient(url, 'token', async_cache_session=False)
+  websocket = HomeAssistantWebsocket(url, 'token', create_logger())
+  try:
+    websocket.start()
+    await asyncio.wait_for(websocket.connected.wait(), 10)
+
+    client.websocket = None
+    template_devices = await client.async_custom_get_devices()
+    template = await measure(client.async_custom_get_devices)
+    client.websocket = websocket
+    registry_devices = await client.async_custom_get_devices()
+    registry = await measure(client.async_custom_get_devices)
+  finally:
+    await websocket.close()
+    await client.async_cache_session.close()
+    await runner.cleanup()
+  return {
+    **registry,
+    'entities': DEVICE_DISCOVERY_SIZE,
+    'devices': len(registry_devices),
+    'template_median': template['median'],
+    'template_devices': len(template_devices),
+    'template_latency_per_state': TEMPLATE_LATENCY_PER_STATE
+  }
+
+@benchmark('haclient.refresh_unchanged', sizes=SIZES, group='haclient')
+async def bench_refresh_unchanged(size: int):
+  """Cache refresh of identical entity and service responses"""
+  client = create_bot(get_home_fixture(size)).homeassistant_client
+  async def refresh():
+    await client.cache_async_custom_get_entities(bypass=True)
+    await client.cache_async_custom_get_domains(bypass=True)
+  async def refresh_parsed():
+    client.cache_snapshots.clear()
+    await refresh()
+
+  await refresh() # Warm up (response serialization)
+  parsed = await measure(refresh_parsed)
+  generation = client.get_cache_generation(HomeAssistantCacheId.ENTITIES)
+  unchanged = await measure(refresh)
+  if client.get_cache_generation(HomeAssistantCacheId.ENTITIES) != generation:
+    raise RuntimeError("Unchanged refresh created a new generation")
+  return {
+    **unchanged,
+    'parsed_median': parsed['median']
+  }
+
+@benchmark('haclient.bypass_refresh', group='haclient')
+async def bench_bypass_refresh():
+  """Cache refresh of the services against the local stand-in, every refresh (and refetch after a registry event) has to reach the server"""
+  server, runner, url = await start_fake_server(get_home_fixture(HOME_SIZES['small']))
+  client = CustomHAClient(url, 'token')
+  async def refresh():
+    await client.cache_async_custom_get_domains(bypass=True)
+  try:
+    await client.cache_async_custom_get_domains()
+    await refresh()
+    if server.stats.get('rest GET /api/services', 0) != 2:
+      raise RuntimeError("Bypass refresh was not sent to Home Assistant")
+    await client.cache_async_custom_get_entities()
+    await client.on_registry_updated({'event_type': 'entity_registry_updated'})
+    await client.cache_async_custom_get_entities()
+    if server.stats.get('rest GET /api/states', 0) != 2:
+      raise RuntimeError("Entities were not fetched again after a registry event")
+    result = await measure(refresh)
+  finally:
+    await client.async_cache_session.close()
+    await runner.cleanup()
+  return {
+    **result,
+    'requests': server.stats.get('rest GET /api/services', 0)
+  }
+
+def measure_peak_bytes(parse: Callable[[], Any]) -> int:
+  """Highest memory allocated during the parse (above the memory before it)"""
+  gc.collect()
+  tracemalloc.start()
+  try:
+    started = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    parsed = parse()
+    peak = tracemalloc.get_traced_memory()[1] - started
+  finally:
+    tracemalloc.stop()
+  del parsed
+  return peak
+
+async def measure_peak_rss(payload_path: str, parser: str) -> int:
+  """Growth of the peak RSS of a fresh interpreter parsing the payload file"""
+  process = await asyncio.create_subprocess_exec(
+    sys.executable, '-c',
+    # VmHWM belongs to the new address space, ru_maxrss would start at the (larger) benchmark process peak
+    'import re\n'
+    'from helpers import json_loads, iter_json_array\n'
+    'from models.EntityRecord import EntityRecord\n'
+    'peak = lambda: int(re.search(r"VmHWM:\\s+(\\d+)", open("/proc/self/status").read()).group(1)) * 1024\n'
+    f'data = open({payload_path!r}, "rb").read()\n'
+    'before = peak()\n'
+    f'records = [EntityRecord.from_state(state) for state in {parser}(data)]\n'
+    'print(peak() - before)',
+    cwd=ROOT,
+    stdout=asyncio.subprocess.PIPE,
+    stderr=asyncio.subprocess.PIPE
+  )
+  stdout, stderr = await process.communicate()
+  if process.returncode != 0:
+    raise RuntimeError(stderr.decode().strip().splitlines()[-1])
+  return int(stdout.decode().strip())
+
+@benchmark('haclient.states_ingestion_memory', sizes=SIZES, group='haclient')
+async def bench_states_ingestion_memory(size: int):
+  """Entity records built from the /api/states response decoded item by item against decoded as a whole"""
+  payload = json.dumps(get_home_fixture(size).states).encode()
+  streamed = lambda: [EntityRecord.from_state(state) for state in iter_json_array(payload)]
+  decoded = lambda: [EntityRecord.from_state(state) for state in json_loads(payload)]
+  with tempfile.NamedTemporaryFile(suffix='.json') as payload_file:
+    payload_file.write(payload)
+    payload_file.flush()
+    peak_rss = await measure_peak_rss(payload_file.name, 'iter_json_array')
+    decoded_peak_rss = await measure_peak_rss(payload_file.name, 'json_loads')
+  return {
+    **await measure(streamed),
+    'payload_bytes': len(payload),
+    'peak_bytes': measure_peak_bytes(streamed),
+    'peak_rss_bytes': peak_rss,
+    'decoded_median': (await measure(decoded))['median'],
+    'decoded_peak_bytes': measure_peak_bytes(decoded),
+    'decoded_peak_rss_bytes': decoded_peak_rss
+  }
+
+async def measure_service_call_during_burst(client: CustomHAClient, entity_ids: List[str]) -> Dict[str, float]:
+  """Latency of a service call made while a burst of background entity fetches is running"""
+  with request_priority(HomeAssistantRequestPriority.BACKGROUND):
+    burst = [asyncio.create_task(client.async_custom_get_entity(entity_id)) for entity_id in entity_ids]
+  await asyncio.sleep(0.001) # The burst requests are sent first
+  started = time.perf_counter()
+  await client.async_custom_trigger_services('light', 'turn_on', entity_id=entity_ids[0])
+  service_call = time.perf_counter() - started
+  await asyncio.gather(*burst)
+  return { 'service_call': service_call, 'burst': time.perf_counter() - started }
+
+@benchmark('haclient.request_priority', group='haclient')
+async def bench_request_priority():
+  """Service call latency during a burst of background requests, with the scheduler and with unlimited concurrency"""
+  fixture = get_home_fixture(HOME_SIZES['small'])
+  entity_ids = [state['entity_id'] for state in fixture.states if state['entity_id'].startswith('light.')][:PRIORITY_BURST]
+  _, runner, url = await start_fake_server(fixture, FakeServerConfig(latency=PRIORITY_SERVER_LATENCY, concurrency=PRIORITY_SERVER_CONCURRENCY))
+  client = CustomHAClient(url, 'token', async_cache_session=False)
+  unlimited_client = CustomHAClient(
+    url, 'token', async_cache_session=False,
+    scheduler=RequestScheduler(max_concurrency=1000, class_limits={ priority: 1000 for priority in HomeAssistantRequestPriority })
+  )
+  try:
+    scheduled = [await measure_service_call_during_burst(client, entity_ids) for _ in range(5)]
+    unlimited = [await measure_service_call_during_burst(unlimited_client, entity_ids) for _ in range(5)]
+  finally:
+    await client.async_cache_session.close()
+    await unlimited_client.async_cache_session.close()
+    await runner.cleanup()
+  service_calls = [x['service_call'] for x in scheduled]
+  return {
+    'rounds': len(service_calls),
+    'min': min(service_calls),
+    'median': statistics.median(service_calls),
+    'burst_median': statistics.median(x['burst'] for x in scheduled),
+    'unlimited_median': statistics.median(x['service_call'] for x in unlimited),
+    'unlimited_burst_median': statistics.median(x['burst'] for x in unlimited),
+    'burst_requests': len(entity_ids),
+    'server_concurrency': PRIORITY_SERVER_CONCURRENCY
+  }
+async def measure_joined_fetch_during_burst(client: CustomHAClient, entity_ids: List[str]) -> Dict[str, float]:
+  """Latency of an autocomplete joining a background cache fetch queued behind a burst of background requests"""
+  client.invalidate_cache(HomeAssistantCacheId.DOMAINS)
+  with request_priority(HomeAssistantRequestPriority.BACKGROUND):
+    burst = [asyncio.create_task(client.async_custom_get_entity(entity_id)) for entity_id in entity_ids]
+    background_fetch = asyncio.create_task(client.cache_async_custom_get_domains())
+  await asyncio.sleep(0.001) # The background fetch is queued
+  started = time.perf_counter()
+  with request_priority(HomeAssistantRequestPriority.AUTOCOMPLETE):
+    await client.cache_async_custom_get_domains()
+  joined = time.perf_counter() - started
+  await asyncio.gather(background_fetch, *burst)
+  return { 'joined': joined, 'burst': time.perf_counter() - started }
+
+@benchmark('haclient.shared_fetch_priority', group='haclient')
+async def bench_shared_fetch_priority():
+  """Autocomplete waiting for a cache fetch started in the background during a burst of background requests"""
+  fixture = get_home_fixture(HOME_SIZES['small'])
+  entity_ids = [state['entity_id'] for state in fixture.states if state['entity_id'].startswith('light.')][:PRIORITY_BURST]
+  _, runner, url = await start_fake_server(fixture, FakeServerConfig(latency=PRIORITY_SERVER_LATENCY, concurrency=PRIORITY_SERVER_CONCURRENCY))
+  client = CustomHAClient(url, 'token')
+  try:
+    rounds = [await measure_joined_fetch_during_burst(client, entity_ids) for _ in range(5)]
+  finally:
+    await client.async_cache_session.close()
+    await runner.cleanup()
+  joined = [x['joined'] for x in rounds]
+  return {
+    'rounds': len(joined),
+    'min': min(joined),
+    'median': statistics.median(joined),
+    'burst_median': statistics.median(x['burst'] for x in rounds),
+    'burst_requests': len(entity_ids),
+    'server_concurrency': PRIORITY_SERVER_CONCURRENCY
+  }
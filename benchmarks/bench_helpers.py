@@ -0,0 +1,36 @@
+from typing import List, Tuple
+
+from helpers import tokenize, fuzzy_keyword_match, fuzzy_keyword_match_with_order
+from benchmarks.harness import benchmark
+from benchmarks.fixtures import get_home_fixture, HOME_SIZES
+
+QUERIES = ['kitchen light', 'livng rm temprature', 'bedroom', 'sensor.garage_power', 'x']
+
+def get_token_pairs(size: int) -> List[Tuple[List[str], List[str]]]:
+  fixture = get_home_fixture(size)
+  targets = [tokenize(state['attributes']['friendly_name']) for state in fixture.states[:2000]]
+  return [(target, tokenize(query)) for target in targets for query in QUERIES]
+
+@benchmark('helpers.tokenize', group='helpers')
+async def bench_tokenize():
+  names = [state['attributes']['friendly_name'] for state in get_home_fixture(HOME_SIZES['small']).states]
+  def operation():
+    for name in names:
+      tokenize(name)
+  return operation, len(names)
+
+@benchmark('helpers.fuzzy_keyword_match', group='helpers')
+async def bench_fuzzy_keyword_match():
+  pairs = get_token_pairs(HOME_SIZES['small'])
+  def operation():
+    for target_tokens, input_tokens in pairs:
+      fuzzy_keyword_match(target_tokens, input_tokens)
+  return operation, len(pairs)
+
+@benchmark('helpers.fuzzy_keyword_match_with_order', group='helpers')
+async def bench_fuzzy_keyword_match_with_order():
+  pairs = get_token_pairs(HOME_SIZES['small'])
+  def operation():
+    for target_tokens, input_tokens in pairs:
+      fuzzy_keyword_match_with_order(target_tokens, input_tokens)
+  return operation, len(pairs)
@@ -0,0 +1,64 @@
+import json
+import os
+from typing import Any, List
+
+from pydantic import TypeAdapter
+
+from haclient import DOMAIN_LIST_ADAPTER
+from models.ServiceModel import ParsedServiceFieldSelector
+from benchmarks.harness import benchmark
+from benchmarks.fixtures import get_home_fixture, HOME_SIZES, EDGE_CASE_SELECTORS
+from benchmarks.fakeclient import create_bot
+
+SIZES = list(HOME_SIZES.values())
+SELECTOR_LIST_ADAPTER = TypeAdapter(List[ParsedServiceFieldSelector])
+
+@benchmark('services.async_custom_get_domains', sizes=SIZES, group='services')
+async def bench_get_domains(size: int):
+  fixture = get_home_fixture(size)
+  client = create_bot(fixture).homeassistant_client
+  return client.async_custom_get_domains, len(fixture.all_service_ids())
+
+def check_round_trip(adapter: TypeAdapter, parsed: Any) -> None:
+  """Dumped models have to validate into the same models"""
+  if adapter.validate_python(adapter.dump_python(parsed)) != parsed:
+    raise RuntimeError("Parsed models changed after a dump and validation")
+
+@benchmark('services.parse_domains', sizes=SIZES, group='services')
+async def bench_parse_domains(size: int):
+  fixture = get_home_fixture(size)
+  client = create_bot(fixture).homeassistant_client
+  payload = await client.async_request_bytes('services')
+  check_round_trip(DOMAIN_LIST_ADAPTER, client.parse_list_chunked(payload, DOMAIN_LIST_ADAPTER))
+  check_round_trip(SELECTOR_LIST_ADAPTER, SELECTOR_LIST_ADAPTER.validate_python(EDGE_CASE_SELECTORS))
+  return lambda: client.parse_list_chunked(payload, DOMAIN_LIST_ADAPTER), len(fixture.all_service_ids())
+
+@benchmark('services.cog_load', sizes=SIZES, group='services')
+async def bench_cog_load(size: int):
+  fixture = get_home_fixture(size)
+  os.environ['WHITELISTED_SERVICES'] = json.dumps(fixture.whitelist)
+  from cogs.services import Services # Imported lazily, the cog module is heavy
+
+  bot = create_bot(fixture)
+  await bot.homeassistant_client.cache_async_custom_get_domains() # Only the command generation is measured
+  await bot.homeassistant_client.cache_async_custom_get_entities()
+
+  async def operation():
+    cog = Services(bot)
+    await cog.cog_load()
+    await cog.cog_unload()
+  return operation
+
+@benchmark('services.check_whitelist', sizes=SIZES, group='services')
+async def bench_check_whitelist(size: int):
+  fixture = get_home_fixture(size)
+  os.environ['WHITELISTED_SERVICES'] = json.dumps(fixture.whitelist + [[f'integration_{i}$', f'set_{i}'] for i in range(100)])
+  from cogs.services import Services
+
+  bot = create_bot(fixture)
+  service_ids = fixture.all_service_ids()
+  def operation():
+    cog = Services(bot) # Fresh cog - the per-domain matchers are built during the measurement
+    for domain_id, service_id in service_ids:
+      cog.check_whitelist(domain_id, service_id)
+  return operation, len(service_ids)
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import statistics
+import sys
+from typing import Dict, List, Tuple
+
+from benchmarks.harness import benchmark
+
+ROOT = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
+STARTUP_ROUNDS = 5
+SLOWEST_IMPORTS = 15
+
+def get_startup_modules() -> List[str]:
+  """Modules imported by the bot before `on_ready` (bot and all cogs)"""
+  return ['bot'] + [f'cogs.{file[:-3]}' for file in sorted(os.listdir(os.path.join(ROOT, 'cogs'))) if file.endswith('.py')]
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+  """Parses `-X importtime` output into (module, self us, cumulative us) tuples"""
+  imports: List[Tuple[str, int, int]] = []
+  for line in output.splitlines():
+    if not line.startswith('import time:') or 'self [us]' in line:
+      continue
+    self_us, cumulative_us, module = line[len('import time:'):].split('|')
+    imports.append((module.strip(), int(self_us), int(cumulative_us)))
+  return imports
+
+async def profile_imports(modules: List[str]) -> Tuple[float, List[Tuple[str, int, int]]]:
+  """Imports the modules in a fresh interpreter, returns the wall time (seconds) and the import profile"""
+  process = await asyncio.create_subprocess_exec(
+    sys.executable, '-X', 'importtime', '-c',
+    f'import time; started = time.perf_counter(); import {", ".join(modules)}; print(time.perf_counter() - started)',
+    cwd=ROOT,
+    stdout=asyncio.subprocess.PIPE,
+    stderr=asyncio.subprocess.PIPE
+  )
+  stdout, stderr = await process.communicate()
+  if process.returncode != 0:
+    raise RuntimeError(stderr.decode().strip().splitlines()[-1])
+  return float(stdout.decode().strip()), parse_importtime(stderr.decode())
+
+@benchmark('startup.import_time', group='startup')
+async def bench_import_time():
+  modules = get_startup_modules()
+  timings: List[float] = []
+  profiles: List[List[Tuple[str, int, int]]] = []
+  for _ in range(STARTUP_ROUNDS):
+    elapsed, profile = await profile_imports(modules)
+    timings.append(elapsed)
+    profiles.append(profile)
+
+  # Profile of the median round (self time, the cumulative time double counts nested imports)
+  median_profile = profiles[timings.index(sorted(timings)[len(timings) // 2])]
+  slowest: Dict[str, float] = {
+    module: self_us / 1e6
+    for module, self_us, _ in sorted(median_profile, key=lambda x: x[1], reverse=True)[:SLOWEST_IMPORTS]
+  }
+  return {
+    'rounds': len(timings),
+    'min': min(timings),
+    'median': statistics.median(timings),
+    'mean': statistics.fmean(timings),
+    'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    'module_count': len(median_profile),
+    'slowest_imports': slowest
+  }
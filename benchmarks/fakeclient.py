@@ -0,0 +1,72 @@
+import json
+import logging
+import os
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from pydantic import TypeAdapter
+
+from bot import HASSDiscordBot
+from haclient import CustomHAClient
+from models.MDIIconMeta import MDIIconMeta
+from benchmarks.fixtures import HomeFixture
+
+CREATED_CLIENTS: List["FixtureHAClient"] = []
+
+class FixtureHAClient(CustomHAClient):
+  """`CustomHAClient` answering the REST requests from a `HomeFixture` instead of Home Assistant"""
+  def __init__(self, fixture: HomeFixture):
+    super().__init__('http://fixture.invalid/api', 'fixture-token')
+    self.fixture = fixture
+    self.response_bodies: Dict[str, bytes] = {}
+    CREATED_CLIENTS.append(self)
+
+  def get_response_body(self, path: str, method: str, json_data: Any) -> bytes:
+    """Serialized response (GET responses are serialized once, the way Home Assistant would send them)"""
+    if method != 'GET':
+      return json.dumps(self.fixture.handle_request(path, method, json_data)).encode()
+    if path not in self.response_bodies:
+      self.response_bodies[path] = json.dumps(self.fixture.handle_request(path, method, json_data)).encode()
+    return self.response_bodies[path]
+
+  async def async_request(self, path: str, method: str = "GET", headers: Optional[dict] = None, **kwargs) -> Any:
+    if path == 'template':
+      return self.fixture.render_template(kwargs['json']['template'])
+    return json.loads(self.get_response_body(path, method, kwargs.get('json'))) # Fresh objects like aiohttp's response.json()
+
+  async def async_request_bytes(self, path: str, method: str = "GET", headers: Optional[dict] = None, **kwargs) -> bytes:
+    if path == 'template':
+      return self.fixture.render_template(kwargs['json']['template']).encode()
+    return self.get_response_body(path, method, kwargs.get('json'))
+
+  async def async_get_rendered_template(self, template: str) -> str:
+    return self.fixture.render_template(template)
+
+  async def async_get_mdi_icons(self) -> List[MDIIconMeta]:
+    return TypeAdapter(List[MDIIconMeta]).validate_python(self.fixture.mdi_icons())
+
+async def close_clients() -> None:
+  while len(CREATED_CLIENTS) > 0:
+    await CREATED_CLIENTS.pop().async_cache_session.close()
+
+def create_logger() -> logging.Logger:
+  logger = logging.getLogger("benchmarks")
+  logger.setLevel(logging.CRITICAL) # Benchmarks deliberately hit unsupported selectors, keep the output clean
+  return logger
+
+def create_bot(fixture: HomeFixture) -> HASSDiscordBot:
+  """Creates the bot (without connecting to Discord) backed by the fixture client"""
+  os.environ.setdefault('WHITELISTED_SERVICES', '[[".*", ".*"]]')
+  bot = HASSDiscordBot(logger=create_logger(), file_logger=create_logger())
+  bot.homeassistant_client = FixtureHAClient(fixture)
+  return bot
+
+def create_interaction(bot: HASSDiscordBot, user_id: int = 1) -> Any:
+  """Minimal stand-in for `discord.Interaction` as seen by the autocomplete functions"""
+  return SimpleNamespace(
+    client=bot,
+    user=SimpleNamespace(id=user_id),
+    guild=None,
+    namespace=SimpleNamespace(),
+    command=None
+  )
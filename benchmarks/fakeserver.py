@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from aiohttp import web, WSMsgType
+
+from benchmarks.fixtures import HomeFixture, get_home_fixture, context_id, HOME_SIZES
+
+# Local Home Assistant stand-in serving a `HomeFixture` over the REST and websocket APIs.
+# Used for integration tests, benchmarks and soak tests without a real Home Assistant instance.
+
+HA_VERSION = '2025.1.0'
+
+class FakeServerConfig():
+  def __init__(
+    self,
+    latency: float = 0.0,
+    latency_jitter: float = 0.0,
+    failure_rate: float = 0.0,
+    attribute_padding: int = 0,
+    template_latency_per_state: float = 0.0,
+    concurrency: int = 0,
+    token: Optional[str] = None,
+    seed: int = 0
+  ):
+    self.latency = latency # Base delay of every response (seconds)
+    self.latency_jitter = latency_jitter # Additional uniformly distributed delay (seconds)
+    self.failure_rate = failure_rate # Probability of responding with HTTP 500 / websocket error
+    self.attribute_padding = attribute_padding # Bytes of padding added to every entity's attributes (payload size)
+    self.template_latency_per_state = template_latency_per_state # Simulated template render cost for templates iterating over `states`
+    self.concurrency = concurrency # REST requests handled at once, the others wait (0 - unlimited)
+    self.token = token # Required access token (None - any token is accepted)
+    self.rng = random.Random(seed)
+
+  def update(self, **kwargs) -> None:
+    for key, value in kwargs.items():
+      if key not in ('latency', 'latency_jitter', 'failure_rate', 'template_latency_per_state'):
+        raise KeyError(f'Option {key} can not be changed at runtime')
+      setattr(self, key, float(value))
+
+  def to_dict(self) -> Dict[str, Any]:
+    return {
+      'latency': self.latency,
+      'latency_jitter': self.latency_jitter,
+      'failure_rate': self.failure_rate,
+      'attribute_padding': self.attribute_padding,
+      'template_latency_per_state': self.template_latency_per_state,
+      'concurrency': self.concurrency
+    }
+
+class FakeHomeAssistant():
+  def __init__(self, fixture: HomeFixture, config: Optional[FakeServerConfig] = None):
+    self.fixture = fixture
+    self.config = config if config is not None else FakeServerConfig()
+    self.stats: Dict[str, int] = {}
+    self.subscriptions: Set[Tuple[web.WebSocketResponse, int, Optional[str]]] = set()
+
+    self.states = self.fixture.states
+    if self.config.attribute_padding > 0: # Padded copies, the fixture is shared with other users
+      padding = 'x' * self.config.attribute_padding
+      self.states = [state | {'attributes': state['attributes'] | {'padding': padding}} for state in self.fixture.states]
+    self.states_by_id = {state['entity_id']: state for state in self.states}
+    self.encoded: Dict[str, bytes] = {}
+    self.request_semaphore = asyncio.Semaphore(self.config.concurrency) if self.config.concurrency > 0 else None
+
+  # Helpers
+  def count(self, key: str) -> None:
+    self.stats[key] = self.stats.get(key, 0) + 1
+
+  async def simulate_latency(self, extra: float = 0.0) -> None:
+    delay = self.config.latency + extra
+    if self.config.latency_jitter > 0:
+      delay += self.config.rng.uniform(0, self.config.latency_jitter)
+    if delay > 0:
+      await asyncio.sleep(delay)
+
+  def should_fail(self) -> bool:
+    return self.config.failure_rate > 0 and self.config.rng.random() < self.config.failure_rate
+
+  def is_authorized(self, token: Optional[str]) -> bool:
+    return self.config.token is None or token == self.config.token
+
+  def template_cost(self, template: str) -> float:
+    if 'states' in template and 'floors()' not in template and 'areas()' not in template and 'labels()' not in template:
+      return self.config.template_latency_per_state * len(self.states)
+    return 0.0
+
+  def encode(self, key: str, data: Any) -> bytes:
+    """Serialized responses of the static (GET) endpoints are cached like Home Assistant's JSON cache"""
+    if key not in self.encoded:
+      self.encoded[key] = json.dumps(data).encode()
+    return self.encoded[key]
+
+  # REST API
+  @web.middleware
+  async def middleware(self, request: web.Request, handler):
+    if request.path.startswith('/api/') and request.path != '/api/websocket':
+      self.count(f'rest {request.method} {request.match_info.route.resource.canonical if request.match_info.route.resource is not None else request.path}')
+      authorization = request.headers.get('Authorization', '')
+      if not self.is_authorized(authorization[len('Bearer '):] if authorization.startswith('Bearer ') else None):
+        return web.json_response({'message': 'Unauthorized'}, status=401)
+      if self.request_semaphore is not None:
+        async with self.request_semaphore:
+          return await self.handle_rest(request, handler)
+      return await self.handle_rest(request, handler)
+    return await handler(request)
+
+  async def handle_rest(self, request: web.Request, handler) -> web.Response:
+    await self.simulate_latency()
+    if self.should_fail():
+      self.count('failures')
+      return web.Response(status=500, text='Simulated failure')
+    return await handler(request)
+
+  async def handle_api_root(self, request: web.Request) -> web.Response:
+    return web.json_response({'message': 'API running.'})
+
+  async def handle_states(self, request: web.Request) -> web.Response:
+    return web.Response(body=self.encode('states', self.states), content_type='application/json')
+
+  async def handle_state(self, request: web.Request) -> web.Response:
+    state = self.states_by_id.get(request.match_info['entity_id'])
+    if state is None:
+      return web.json_response({'message': 'Entity not found.'}, status=404)
+    return web.json_response(state)
+
+  async def handle_services(self, request: web.Request) -> web.Response:
+    return web.Response(body=self.encode('services', self.fixture.domains), content_type='application/json')
+
+  async def handle_service_call(self, request: web.Request) -> web.Response:
+    domain, service = request.match_info['domain'], request.match_info['service']
+    if service not in self.fixture.services_by_domain().get(domain, {}):
+      return web.json_response({'message': f'Service {domain}.{service} not found.'}, status=400)
+    data = await request.json() if request.can_read_body else {}
+    changed_states = self.changed_states(data)
+    if 'return_response' in request.query:
+      return web.json_response({'changed_states': changed_states, 'service_response': {'domain': domain, 'service': service, 'data': data}})
+    return web.json_response(changed_states)
+
+  async def handle_template(self, request: web.Request) -> web.Response:
+    template = (await request.json())['template']
+    await asyncio.sleep(self.template_cost(template))
+    try:
+      return web.Response(text=self.fixture.render_template(template), content_type='text/plain')
+    except ValueError as e:
+      return web.json_response({'message': f'Error rendering template: {e}'}, status=400)
+
+  async def handle_conversation(self, request: web.Request) -> web.Response:
+    return web.json_response(self.fixture.handle_request('conversation/process', 'POST', await request.json()))
+
+  def changed_states(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    entity_ids = data.get('entity_id', [])
+    if isinstance(entity_ids, str):
+      entity_ids = [entity_ids]
+    return [self.states_by_id[x] for x in entity_ids if x in self.states_by_id]
+
+  # Websocket API
+  async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+    ws = web.WebSocketResponse(max_msg_size=0)
+    await ws.prepare(request)
+    self.count('websocket connections')
+
+    await ws.send_json({'type': 'auth_required', 'ha_version': HA_VERSION})
+    auth_message = await ws.receive_json()
+    if auth_message.get('type') != 'auth' or not self.is_authorized(auth_message.get('access_token')):
+      await ws.send_json({'type': 'auth_invalid', 'message': 'Invalid access token or password'})
+      await ws.close()
+      return ws
+    await ws.send_json({'type': 'auth_ok', 'ha_version': HA_VERSION})
+
+    try:
+      async for message in ws:
+        if message.type != WSMsgType.TEXT:
+          break
+        payload = json.loads(message.data)
+        for command in payload if isinstance(payload, list) else [payload]: # Coalesced messages
+          asyncio.create_task(self.handle_websocket_command(ws, command))
+    finally:
+      self.subscriptions = {x for x in self.subscriptions if x[0] is not ws}
+    return ws
+
+  async def handle_websocket_command(self, ws: web.WebSocketResponse, command: Dict[str, Any]) -> None:
+    command_id = command.get('id')
+    command_type = command.get('type')
+    self.count(f'websocket {command_type}')
+    await self.simulate_latency()
+    if ws.closed:
+      return
+
+    if command_type == 'ping':
+      return await ws.send_json({'id': command_id, 'type': 'pong'})
+    if self.should_fail():
+      self.count('failures')
+      return await ws.send_json({'id': command_id, 'type': 'result', 'success': False, 'error': {'code': 'unknown_error', 'message': 'Simulated failure'}})
+
+    results = {
+      'get_states': lambda: self.states,
+      'get_services': self.fixture.services_by_domain,
+      'get_config': lambda: {'version': HA_VERSION, 'location_name': 'Fixture', 'components': sorted(set(self.fixture.entity_platforms.values()))},
+      'config/area_registry/list': self.fixture.area_registry,
+      'config/device_registry/list': self.fixture.device_registry,
+      'config/entity_registry/list': self.fixture.entity_registry,
+      'config/entity_registry/list_for_display': self.fixture.entity_registry_display,
+      'config/floor_registry/list': self.fixture.floor_registry,
+      'config/label_registry/list': self.fixture.label_registry
+    }
+
+    if command_type in results:
+      await ws.send_str(json.dumps({'id': command_id, 'type': 'result', 'success': True, 'result': results[command_type]()}))
+    elif command_type == 'subscribe_events':
+      self.subscriptions.add((ws, command_id, command.get('event_type')))
+      await ws.send_json({'id': command_id, 'type': 'result', 'success': True, 'result': None})
+    elif command_type == 'unsubscribe_events':
+      self.subscriptions = {x for x in self.subscriptions if not (x[0] is ws and x[1] == command.get('subscription'))}
+      await ws.send_json({'id': command_id, 'type': 'result', 'success': True, 'result': None})
+    elif command_type == 'render_template':
+      await asyncio.sleep(self.template_cost(command['template']))
+      await ws.send_json({'id': command_id, 'type': 'result', 'success': True, 'result': None})
+      await ws.send_json({'id': command_id, 'type': 'event', 'event': {'result': self.fixture.render_template(command['template']), 'listeners': {'all': False, 'entities': [], 'domains': [], 'time': False}}})
+    elif command_type == 'call_service':
+      changed_states = self.changed_states(command.get('target', {}) | command.get('service_data', {}))
+      await ws.send_json({'id': command_id, 'type': 'result', 'success': True, 'result': {'context': {'id': context_id(self.config.rng), 'parent_id': None, 'user_id': None}, 'response': {'changed_states': len(changed_states)} if command.get('return_response') else None}})
+    else:
+      await ws.send_json({'id': command_id, 'type': 'result', 'success': False, 'error': {'code': 'unknown_command', 'message': 'Unknown command.'}})
+
+  async def fire_event(self, event_type: str, data: Optional[Dict[str, Any]] = None) -> int:
+    """Sends the event to all matching subscriptions, returns the number of notified subscriptions"""
+    event = {'event_type': event_type, 'data': data or {}, 'origin': 'LOCAL', 'time_fired': time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime()), 'context': {'id': context_id(self.config.rng), 'parent_id': None, 'user_id': None}}
+    notified = 0
+    for ws, subscription_id, subscribed_type in list(self.subscriptions):
+      if (subscribed_type is None or subscribed_type == event_type) and not ws.closed:
+        await ws.send_json({'id': subscription_id, 'type': 'event', 'event': event})
+        notified += 1
+    return notified
+
+  # Control API (not part of Home Assistant)
+  async def handle_fake_fire_event(self, request: web.Request) -> web.Response:
+    body = await request.json()
+    return web.json_response({'notified': await self.fire_event(body['event_type'], body.get('data'))})
+
+  async def handle_fake_config(self, request: web.Request) -> web.Response:
+    if request.method == 'POST':
+      self.config.update(**(await request.json()))
+    return web.json_response(self.config.to_dict())
+
+  async def handle_fake_stats(self, request: web.Request) -> web.Response:
+    return web.json_response(self.stats)
+
+  def create_app(self) -> web.Application:
+    app = web.Application(middlewares=[self.middleware], client_max_size=64 * 1024**2)
+    app.router.add_get('/api/', self.handle_api_root)
+    app.router.add_get('/api/states', self.handle_states)
+    app.router.add_get('/api/states/{entity_id}', self.handle_state)
+    app.router.add_get('/api/services', self.handle_services)
+    app.router.add_post('/api/services/{domain}/{service}', self.handle_service_call)
+    app.router.add_post('/api/template', self.handle_template)
+    app.router.add_post('/api/conversation/process', self.handle_conversation)
+    app.router.add_get('/api/websocket', self.handle_websocket)
+    app.router.add_post('/fake/events', self.handle_fake_fire_event)
+    app.router.add_route('*', '/fake/config', self.handle_fake_config)
+    app.router.add_get('/fake/stats', self.handle_fake_stats)
+    return app
+
+async def start_fake_server(
+  fixture: HomeFixture,
+  config: Optional[FakeServerConfig] = None,
+  host: str = '127.0.0.1',
+  port: int = 0
+) -> Tuple[FakeHomeAssistant, web.AppRunner, str]:
+  """Starts the server in the running event loop. Returns the server, its runner (for cleanup) and the API url"""
+  server = FakeHomeAssistant(fixture, config)
+  runner = web.AppRunner(server.create_app(), access_log=None)
+  await runner.setup()
+  site = web.TCPSite(runner, host, port)
+  await site.start()
+  bound_port = site._server.sockets[0].getsockname()[1]
+  return server, runner, f'http://{host}:{bound_port}/api/'
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description="Runs a local Home Assistant stand-in serving a synthetic home")
+  parser.add_argument('--size', default='medium', help="Entity count or small/medium/large")
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--host', default='127.0.0.1')
+  parser.add_argument('--port', type=int, default=8123)
+  parser.add_argument('--token', default=None, help="Required access token (any token is accepted by default)")
+  parser.add_argument('--latency', type=float, default=0.0, help="Base response latency (seconds)")
+  parser.add_argument('--latency-jitter', type=float, default=0.0, help="Additional random latency (seconds)")
+  parser.add_argument('--failure-rate', type=float, default=0.0, help="Probability of a failed response")
+  parser.add_argument('--attribute-padding', type=int, default=0, help="Bytes of padding added to every entity's attributes")
+  parser.add_argument('--template-latency-per-state', type=float, default=0.0, help="Simulated render time per state for templates iterating over states (seconds)")
+  parser.add_argument('--concurrency', type=int, default=0, help="REST requests handled at once (0 - unlimited)")
+  args = parser.parse_args()
+
+  size = HOME_SIZES[args.size] if args.size in HOME_SIZES else int(args.size)
+  config = FakeServerConfig(
+    latency=args.latency,
+    latency_jitter=args.latency_jitter,
+    failure_rate=args.failure_rate,
+    attribute_padding=args.attribute_padding,
+    template_latency_per_state=args.template_latency_per_state,
+    concurrency=args.concurrency,
+    token=args.token,
+    seed=args.seed
+  )
+  server = FakeHomeAssistant(get_home_fixture(size, args.seed), config)
+  print(f"Serving a home with {size} entities at http://{args.host}:{args.port}/api/")
+  web.run_app(server.create_app(), host=args.host, port=args.port, access_log=None)
+
+if __name__ == '__main__':
+  main()
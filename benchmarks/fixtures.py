@@ -0,0 +1,603 @@
+import random
+import re
+import json
+import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+# Synthetic Home Assistant installations used by the benchmarks.
+# The payloads mirror what Home Assistant returns for `/api/states`, `/api/services`
+# and the registry templates rendered by `CustomHAClient`.
+
+HOME_SIZES: Dict[str, int] = {
+  'small': 500,
+  'medium': 5_000,
+  'large': 50_000
+}
+
+AREA_NAMES = [
+  'Kitchen', 'Living Room', 'Bedroom', 'Bathroom', 'Office', 'Garage', 'Hallway', 'Basement', 'Attic',
+  'Guest Room', 'Laundry', 'Dining Room', 'Patio', 'Garden', 'Nursery', 'Workshop', 'Pantry', 'Closet',
+  'Porch', 'Driveway', 'Study', 'Gym', 'Cinema', 'Library', 'Sauna', 'Terrace', 'Staircase', 'Entrance'
+]
+FLOOR_NAMES = ['Basement', 'Ground Floor', 'First Floor', 'Second Floor', 'Third Floor', 'Attic Floor', 'Outside']
+LABEL_NAMES = [
+  'Energy', 'Security', 'Comfort', 'Night', 'Vacation', 'Critical', 'Battery', 'Outdoor', 'Kids', 'Guests',
+  'Lighting', 'Climate', 'Media', 'Cleaning', 'Maintenance', 'Notifications', 'Presence', 'Morning'
+]
+MANUFACTURERS = [
+  ('Philips', ['Hue White', 'Hue Color', 'Hue Go']), ('IKEA', ['TRADFRI bulb', 'STYRBAR', 'FYRTUR']),
+  ('Aqara', ['Door Sensor', 'Motion Sensor P1', 'Climate Sensor']), ('Shelly', ['Plus 1PM', 'Plug S', 'H&T']),
+  ('Sonos', ['One', 'Arc', 'Era 100']), ('Google', ['Nest Hub', 'Chromecast']), ('Tado', ['Smart Thermostat']),
+  ('Yale', ['Linus Smart Lock']), ('Espressif', ['ESPHome Node']), ('Xiaomi', ['Air Purifier 4', 'Vacuum S5'])
+]
+
+# (domain, weight, device_bound, name parts, device_classes, supported_features, integrations)
+ENTITY_KINDS: List[Tuple[str, float, bool, List[str], List[Optional[str]], List[Optional[int]], List[str]]] = [
+  ('sensor', 34, True, ['Temperature', 'Humidity', 'Power', 'Energy', 'Battery', 'Illuminance', 'Signal Strength', 'Voltage'], ['temperature', 'humidity', 'power', 'energy', 'battery', 'illuminance', 'signal_strength', 'voltage'], [None], ['zha', 'mqtt', 'esphome', 'shelly']),
+  ('binary_sensor', 14, True, ['Motion', 'Door', 'Window', 'Occupancy', 'Leak', 'Smoke'], ['motion', 'door', 'window', 'occupancy', 'moisture', 'smoke'], [None], ['zha', 'mqtt', 'esphome']),
+  ('light', 10, True, ['Ceiling Light', 'Lamp', 'LED Strip', 'Spotlight', 'Pendant'], [None], [0, 4, 40, 44], ['hue', 'zha', 'mqtt']),
+  ('switch', 8, True, ['Plug', 'Relay', 'Outlet', 'Child Lock'], ['outlet', 'switch', None], [None], ['shelly', 'tplink', 'esphome']),
+  ('cover', 4, True, ['Blinds', 'Curtain', 'Garage Door', 'Shutter'], ['blind', 'curtain', 'garage', 'shutter'], [3, 7, 15, 255], ['zha', 'somfy']),
+  ('media_player', 2, True, ['Speaker', 'TV', 'Soundbar', 'Chromecast'], ['speaker', 'tv', 'receiver'], [152461, 21437, 4127295], ['sonos', 'cast', 'androidtv']),
+  ('climate', 2, True, ['Thermostat', 'Radiator', 'Air Conditioner'], [None], [385, 387, 401], ['tado', 'mqtt']),
+  ('fan', 2, True, ['Ceiling Fan', 'Air Purifier', 'Extractor'], [None], [1, 9, 57], ['xiaomi_miio', 'mqtt']),
+  ('lock', 1, True, ['Front Door Lock', 'Back Door Lock'], [None], [0, 1], ['yale']),
+  ('button', 4, True, ['Restart', 'Identify', 'Ping'], ['restart', 'identify', None], [None], ['esphome', 'shelly']),
+  ('number', 2, True, ['Sensitivity', 'Brightness Offset', 'Delay'], [None], [None], ['mqtt', 'esphome']),
+  ('select', 2, True, ['Mode', 'Preset', 'Power On Behavior'], [None], [None], ['mqtt', 'zha']),
+  ('update', 2, True, ['Firmware'], ['firmware'], [1, 5, 21], ['esphome', 'shelly', 'hue']),
+  ('weather', 0.3, True, ['Forecast'], [None], [3, 7], ['met']),
+  ('input_boolean', 3, False, ['Guest Mode', 'Vacation Mode', 'Night Mode', 'Party Mode'], [None], [None], ['input_boolean']),
+  ('automation', 5, False, ['Turn On Lights', 'Notify Door Open', 'Morning Routine', 'Heating Schedule'], [None], [None], ['automation']),
+  ('script', 3, False, ['Good Night', 'Leave Home', 'Movie Time', 'Wake Up'], [None], [None], ['script']),
+  ('conversation', 0.05, False, ['Home Assistant', 'OpenAI'], [None], [None], ['conversation'])
+]
+
+def slugify(text: str) -> str:
+  return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+def iso_timestamp(rng: random.Random) -> str:
+  base = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+  return (base + datetime.timedelta(seconds=rng.randrange(0, 365 * 24 * 3600), microseconds=rng.randrange(0, 10**6))).isoformat()
+
+def context_id(rng: random.Random) -> str:
+  return ''.join(rng.choice('0123456789ABCDEFGHJKMNPQRSTVWXYZ') for _ in range(26))
+
+def entity_attributes(rng: random.Random, domain: str, friendly_name: str, device_class: Optional[str], supported_features: Optional[int]) -> Dict[str, Any]:
+  attributes: Dict[str, Any] = {}
+  match domain:
+    case 'sensor':
+      attributes['state_class'] = 'measurement'
+      attributes['unit_of_measurement'] = {'temperature': '°C', 'humidity': '%', 'power': 'W', 'energy': 'kWh', 'battery': '%', 'illuminance': 'lx', 'signal_strength': 'dBm', 'voltage': 'V'}.get(device_class, '')
+    case 'light':
+      attributes['supported_color_modes'] = rng.choice([['onoff'], ['brightness'], ['color_temp', 'hs'], ['color_temp', 'xy']])
+      attributes['color_mode'] = attributes['supported_color_modes'][0]
+      attributes['brightness'] = rng.randrange(0, 256)
+      attributes['min_color_temp_kelvin'] = 2000
+      attributes['max_color_temp_kelvin'] = 6535
+      attributes['effect_list'] = ['None', 'Rainbow', 'Colorloop', 'Candle', 'Fireplace']
+    case 'media_player':
+      attributes['source_list'] = [f'Source {i}' for i in range(40)]
+      attributes['sound_mode_list'] = ['Music', 'Movie', 'Voice', 'Night']
+      attributes['media_title'] = f'Track {rng.randrange(1000)}'
+      attributes['media_artist'] = f'Artist {rng.randrange(300)}'
+      attributes['media_album_name'] = f'Album {rng.randrange(300)}'
+      attributes['entity_picture'] = f'/api/media_player_proxy/media_player.x?token={context_id(rng)}{context_id(rng)}'
+      attributes['group_members'] = [f'media_player.speaker_{i}' for i in range(rng.randrange(1, 6))]
+      attributes['queue'] = [{'title': f'Track {i}', 'artist': f'Artist {i % 17}', 'duration': 180 + i} for i in range(rng.randrange(10, 60))]
+      attributes['volume_level'] = round(rng.random(), 2)
+    case 'climate':
+      attributes['hvac_modes'] = ['off', 'heat', 'cool', 'auto']
+      attributes['preset_modes'] = ['home', 'away', 'eco', 'boost']
+      attributes['min_temp'] = 5
+      attributes['max_temp'] = 30
+      attributes['current_temperature'] = round(rng.uniform(16, 25), 1)
+      attributes['temperature'] = round(rng.uniform(18, 23), 1)
+    case 'weather':
+      attributes['temperature'] = round(rng.uniform(-10, 30), 1)
+      attributes['humidity'] = rng.randrange(20, 100)
+      attributes['forecast'] = [
+        {
+          'datetime': iso_timestamp(rng),
+          'condition': rng.choice(['sunny', 'cloudy', 'rainy', 'snowy', 'partlycloudy']),
+          'temperature': round(rng.uniform(-10, 30), 1),
+          'templow': round(rng.uniform(-15, 20), 1),
+          'precipitation': round(rng.uniform(0, 10), 1),
+          'wind_speed': round(rng.uniform(0, 40), 1),
+          'wind_bearing': rng.randrange(0, 360)
+        }
+        for _ in range(48)
+      ]
+    case 'fan':
+      attributes['percentage'] = rng.randrange(0, 101)
+      attributes['preset_modes'] = ['auto', 'sleep', 'favorite']
+    case 'select':
+      attributes['options'] = ['off', 'on', 'previous', 'toggle']
+    case 'number':
+      attributes['min'] = 0
+      attributes['max'] = 100
+      attributes['step'] = 1
+      attributes['mode'] = 'auto'
+    case 'update':
+      attributes['installed_version'] = f'1.{rng.randrange(20)}.{rng.randrange(10)}'
+      attributes['latest_version'] = f'1.{rng.randrange(20)}.{rng.randrange(10)}'
+      attributes['release_summary'] = 'Bug fixes and performance improvements. ' * rng.randrange(1, 8)
+    case 'automation':
+      attributes['id'] = str(rng.randrange(10**12))
+      attributes['last_triggered'] = iso_timestamp(rng)
+      attributes['mode'] = 'single'
+      attributes['current'] = 0
+
+  if device_class is not None:
+    attributes['device_class'] = device_class
+  if supported_features is not None:
+    attributes['supported_features'] = supported_features
+  attributes['friendly_name'] = friendly_name
+  return attributes
+
+# Services
+def selector_pool(entity_domain: str) -> List[Dict[str, Any]]:
+  """Field definitions covering every selector type supported by `Services.create_service_command`"""
+  return [
+    {'selector': {'number': {'min': 0, 'max': 255, 'step': 1, 'mode': 'slider'}}, 'name': 'Brightness', 'description': 'Number indicating brightness.', 'example': 120},
+    {'selector': {'number': {'min': 0, 'max': 300, 'unit_of_measurement': 'seconds'}}, 'name': 'Transition', 'description': 'Duration it takes to get to next state.'},
+    {'selector': {'color_temp': {'unit': 'kelvin', 'min': 2000, 'max': 6500}}, 'name': 'Color temperature', 'description': 'Color temperature in Kelvin.'},
+    {'selector': {'color_rgb': None}, 'name': 'Color', 'description': 'The color in RGB format.', 'example': '[255, 100, 100]'},
+    {'selector': {'boolean': None}, 'name': 'Enabled', 'description': 'Whether the feature is enabled.', 'default': False},
+    {'selector': {'text': None}, 'name': 'Message', 'description': 'Message body.', 'example': 'Hello'},
+    {'selector': {'text': {'multiline': True}}, 'name': 'Data', 'description': 'Additional data.'},
+    {'selector': {'text': {'multiple': True}}, 'name': 'Tags', 'description': 'List of tags.'},
+    {'selector': {'select': {'options': ['short', 'long']}}, 'name': 'Flash', 'description': 'Tell light to flash.'},
+    {'selector': {'select': {'options': [{'label': f'Option {i}', 'value': f'option_{i}'} for i in range(60)], 'mode': 'dropdown'}}, 'name': 'Preset', 'description': 'Preset to apply.'},
+    {'selector': {'select': {'options': ['alpha', 'beta', 'gamma', 'delta'], 'multiple': True, 'custom_value': True}}, 'name': 'Channels', 'description': 'Channels to use.'},
+    {'selector': {'button_toggle': {'options': ['low', 'medium', 'high']}}, 'name': 'Level', 'description': 'Level of the effect.'},
+    {'selector': {'entity': {'filter': [{'domain': entity_domain}]}}, 'name': 'Entity', 'description': 'Entity to use.'},
+    {'selector': {'entity': {'multiple': True, 'filter': {'domain': ['sensor', 'binary_sensor'], 'device_class': 'temperature'}}}, 'name': 'Sensors', 'description': 'Sensors to use.'},
+    {'selector': {'entity': {'domain': 'media_player'}}, 'name': 'Media player', 'description': 'Legacy entity selector.'},
+    {'selector': {'device': {'filter': {'manufacturer': 'Philips'}, 'entity': [{'domain': 'light'}]}}, 'name': 'Device', 'description': 'Device to use.'},
+    {'selector': {'device': {'integration': 'zha', 'multiple': True}}, 'name': 'Devices', 'description': 'Legacy device selector.'},
+    {'selector': {'area': {'entity': [{'domain': entity_domain}]}}, 'name': 'Area', 'description': 'Area to use.'},
+    {'selector': {'area': {'multiple': True}}, 'name': 'Areas', 'description': 'Areas to use.'},
+    {'selector': {'floor': None}, 'name': 'Floor', 'description': 'Floor to use.'},
+    {'selector': {'floor': {'multiple': True}}, 'name': 'Floors', 'description': 'Floors to use.'},
+    {'selector': {'label': None}, 'name': 'Label', 'description': 'Label to use.'},
+    {'selector': {'attribute': {'entity_id': f'{entity_domain}.kitchen_ceiling_light', 'hide_attributes': ['friendly_name']}}, 'name': 'Attribute', 'description': 'Attribute to use.'},
+    {'selector': {'duration': {'enable_day': True}}, 'name': 'Duration', 'description': 'How long.'},
+    {'selector': {'time': None}, 'name': 'Time', 'description': 'At what time.'},
+    {'selector': {'date': None}, 'name': 'Date', 'description': 'At what date.'},
+    {'selector': {'datetime': None}, 'name': 'Date and time', 'description': 'At what moment.'},
+    {'selector': {'location': {'radius': True}}, 'name': 'Location', 'description': 'Where.'},
+    {'selector': {'icon': {'placeholder': 'mdi:lightbulb'}}, 'name': 'Icon', 'description': 'Icon to use.'},
+    {'selector': {'object': {'fields': {'key': {'selector': {'text': None}, 'required': True}, 'value': {'selector': {'text': None}}}}}, 'name': 'Payload', 'description': 'Object payload.'},
+    {'selector': {'template': None}, 'name': 'Template', 'description': 'Template to render.'},
+    {'selector': {'language': {'languages': ['en', 'de', 'fr', 'pl', 'es', 'it', 'nl']}}, 'name': 'Language', 'description': 'Language to use.'},
+    {'selector': {'language': None}, 'name': 'Any language', 'description': 'Language to use.'},
+    {'selector': {'country': {'countries': ['US', 'GB', 'DE', 'PL', 'FR', 'NL', 'ES', 'IT']}}, 'name': 'Country', 'description': 'Country to use.'},
+    {'selector': {'constant': {'value': True, 'label': 'Enabled'}}, 'name': 'Constant', 'description': 'Constant flag.'},
+    {'selector': {'conversation_agent': None}, 'name': 'Agent', 'description': 'Conversation agent.'},
+    {'selector': {'config_entry': {'integration': 'mqtt'}}, 'name': 'Config entry', 'description': 'Config entry.'},
+    {'selector': {'statistic': {'device_class': 'energy'}}, 'name': 'Statistic', 'description': 'Statistic id.'},
+    {'selector': {'state': {'entity_id': f'{entity_domain}.x'}}, 'name': 'State', 'description': 'State.'},
+    {'selector': {'theme': None}, 'name': 'Theme', 'description': 'Theme.'},
+    {'selector': {'addon': None}, 'name': 'Add-on', 'description': 'Add-on.'},
+    {'selector': {'backup_location': None}, 'name': 'Backup location', 'description': 'Backup location.'},
+    {'selector': {'assist_pipeline': None}, 'name': 'Pipeline', 'description': 'Assist pipeline.'}
+  ]
+
+# Selector shapes Home Assistant can send beside the single type key, `selector_pool` keeps to the common ones
+EDGE_CASE_SELECTORS: List[Dict[str, Any]] = [
+  {},
+  {'entity': {'domain': 'light'}, 'device': None},
+  {'text': {'multiline': True}, 'icon': {}},
+  {'object': {'fields': {'key': {'selector': {'text': None, 'template': None}}}}}
+]
+
+COMMON_SERVICES: Dict[str, List[Tuple[str, List[int]]]] = {
+  # service name, indexes into the selector pool (shared schemas across domains on purpose)
+  'light': [('turn_on', [0, 1, 2, 3, 8, 9, 31]), ('turn_off', [1, 8]), ('toggle', [0, 1, 2, 3, 8])],
+  'switch': [('turn_on', []), ('turn_off', []), ('toggle', [])],
+  'fan': [('turn_on', [9]), ('turn_off', []), ('toggle', []), ('set_percentage', [0]), ('set_preset_mode', [9])],
+  'input_boolean': [('turn_on', []), ('turn_off', []), ('toggle', []), ('reload', [])],
+  'cover': [('open_cover', []), ('close_cover', []), ('stop_cover', []), ('set_cover_position', [0]), ('toggle', [])],
+  'climate': [('set_temperature', [0, 1, 11]), ('set_hvac_mode', [8]), ('set_preset_mode', [9]), ('turn_on', []), ('turn_off', [])],
+  'media_player': [('media_play', []), ('media_pause', []), ('volume_set', [0]), ('play_media', [5, 9, 6]), ('select_source', [9]), ('turn_on', []), ('turn_off', [])],
+  'lock': [('lock', [5]), ('unlock', [5]), ('open', [5])],
+  'notify': [('send_message', [5, 6, 7]), ('persistent_notification', [5, 6])],
+  'tts': [('speak', [5, 31, 12, 4]), ('clear_cache', [])],
+  'automation': [('trigger', [4]), ('turn_on', []), ('turn_off', [4]), ('toggle', []), ('reload', [])],
+  'script': [('turn_on', [29]), ('turn_off', []), ('toggle', []), ('reload', [])],
+  'scene': [('turn_on', [1]), ('apply', [29, 1]), ('create', [5, 29, 7])],
+  'homeassistant': [('restart', []), ('reload_all', []), ('update_entity', [13]), ('set_location', [27])],
+  'recorder': [('purge', [23, 4]), ('purge_entities', [13, 23]), ('get_statistics', [37, 26, 26, 9])],
+  'calendar': [('create_event', [5, 6, 26, 26, 27]), ('get_events', [26, 23])],
+  'weather': [('get_forecasts', [8])],
+  'conversation': [('process', [5, 31, 35]), ('reload', [31, 35])],
+  'backup': [('create', [41])],
+  'timer': [('start', [23]), ('pause', []), ('cancel', []), ('change', [23])],
+  'input_datetime': [('set_datetime', [25, 24, 26])],
+  'input_select': [('select_option', [8]), ('set_options', [7])],
+  'zone': [('reload', [])],
+  'frontend': [('set_theme', [39])],
+  'device_tracker': [('see', [5, 5, 27, 33])],
+  'system_log': [('write', [5, 8, 5])],
+  'image': [('snapshot', [5])],
+  'counter': [('increment', []), ('decrement', []), ('reset', []), ('set_value', [0])]
+}
+
+def build_services(rng: random.Random, extra_domain_count: int) -> List[Dict[str, Any]]:
+  domains: List[Dict[str, Any]] = []
+  for domain, services in COMMON_SERVICES.items():
+    pool = selector_pool(domain)
+    domains.append({
+      'domain': domain,
+      'services': {
+        service_name: build_service(domain, service_name, [pool[i] for i in field_indexes], with_target=domain not in ('notify', 'homeassistant', 'recorder', 'backup', 'zone', 'frontend', 'system_log'))
+        for service_name, field_indexes in services
+      }
+    })
+
+  # Custom integrations (HACS etc.) with random schemas
+  for i in range(extra_domain_count):
+    domain = f'integration_{i}'
+    pool = selector_pool(domain)
+    domains.append({
+      'domain': domain,
+      'services': {
+        f'action_{j}': build_service(domain, f'action_{j}', rng.sample(pool, rng.randrange(0, 8)), with_target=rng.random() < 0.6)
+        for j in range(rng.randrange(2, 12))
+      }
+    })
+  return domains
+
+def build_service(domain: str, service_name: str, fields: List[Dict[str, Any]], with_target: bool) -> Dict[str, Any]:
+  service: Dict[str, Any] = {
+    'name': service_name.replace('_', ' ').capitalize(),
+    'description': f'{service_name.replace('_', ' ').capitalize()} for {domain} entities.',
+    'fields': {}
+  }
+  advanced_fields: Dict[str, Any] = {}
+  for i, field in enumerate(fields):
+    field = json.loads(json.dumps(field)) # Deep copy
+    field_id = f'{slugify(field['name'])}_{i}' if i > 0 else slugify(field['name'])
+    if i >= 4: # Fields collapsed into a section like in HA (e.g. light.turn_on advanced fields)
+      advanced_fields[field_id] = field
+    else:
+      service['fields'][field_id] = field
+  if len(advanced_fields) > 0:
+    service['fields']['advanced_fields'] = {'collapsed': True, 'fields': advanced_fields}
+  if with_target:
+    service['target'] = {'entity': [{'domain': [domain]}]}
+  return service
+
+class HomeFixture:
+  def __init__(self, entity_count: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    self.entity_count = entity_count
+
+    area_count = max(5, entity_count // 25)
+    floor_count = max(1, area_count // 8)
+    label_count = max(3, entity_count // 50)
+    device_count = max(10, entity_count // 4)
+
+    # Floors & areas
+    self.floors: List[Dict[str, Any]] = []
+    for i in range(floor_count):
+      name = FLOOR_NAMES[i % len(FLOOR_NAMES)] + (f' {i // len(FLOOR_NAMES) + 1}' if i >= len(FLOOR_NAMES) else '')
+      self.floors.append({'id': slugify(name), 'name': name, 'areas': [], 'entities': []})
+
+    self.areas: List[Dict[str, Any]] = []
+    area_floor: Dict[str, Dict[str, Any]] = {}
+    for i in range(area_count):
+      name = AREA_NAMES[i % len(AREA_NAMES)] + (f' {i // len(AREA_NAMES) + 1}' if i >= len(AREA_NAMES) else '')
+      area = {'id': slugify(name), 'name': name, 'entities': [], 'devices': []}
+      self.areas.append(area)
+      floor = self.floors[i % floor_count]
+      floor['areas'].append(area['id'])
+      area_floor[area['id']] = floor
+
+    self.labels: List[Dict[str, Any]] = []
+    for i in range(label_count):
+      name = LABEL_NAMES[i % len(LABEL_NAMES)] + (f' {i // len(LABEL_NAMES) + 1}' if i >= len(LABEL_NAMES) else '')
+      self.labels.append({'id': slugify(name), 'name': name, 'description': f'{name} related items' if rng.random() < 0.5 else None, 'areas': [], 'devices': [], 'entities': []})
+
+    # Devices
+    self.devices: List[Dict[str, Any]] = []
+    for i in range(device_count):
+      manufacturer, models = rng.choice(MANUFACTURERS)
+      model = rng.choice(models)
+      area = rng.choice(self.areas) if rng.random() < 0.9 else None
+      name = f'{area['name'] if area is not None else 'Unassigned'} {model} {i}'
+      device = {
+        'id': f'{rng.getrandbits(128):032x}',
+        'area_id': area['id'] if area is not None else None,
+        'device_id': None,
+        'name': name,
+        'name_by_user': f'{name} (custom)' if rng.random() < 0.1 else None,
+        'manufacturer': manufacturer,
+        'model': model,
+        'model_id': slugify(model).upper(),
+        'serial_number': f'{rng.getrandbits(48):012X}',
+        'hw_version': f'rev{rng.randrange(1, 5)}',
+        'sw_version': f'{rng.randrange(1, 4)}.{rng.randrange(0, 30)}.{rng.randrange(0, 10)}',
+        'entities': []
+      }
+      self.devices.append(device)
+      if area is not None:
+        area['devices'].append(device['id'])
+      if rng.random() < 0.15:
+        rng.choice(self.labels)['devices'].append(device['id'])
+
+    # Entities
+    self.states: List[Dict[str, Any]] = []
+    self.integrations: Dict[str, List[str]] = {}
+    self.entity_devices: Dict[str, Optional[str]] = {}
+    self.entity_platforms: Dict[str, str] = {}
+    self.entity_direct_areas: Dict[str, str] = {} # Entities assigned to an area directly (not through the device)
+    areas_by_id = {area['id']: area for area in self.areas}
+    used_ids: Dict[str, int] = {}
+    weights = [kind[1] for kind in ENTITY_KINDS]
+    for i in range(entity_count):
+      domain, _, device_bound, names, device_classes, features, integrations = rng.choices(ENTITY_KINDS, weights=weights)[0]
+      device = rng.choice(self.devices) if device_bound else None
+      area = areas_by_id.get(device['area_id']) if device is not None and device['area_id'] is not None else (rng.choice(self.areas) if rng.random() < 0.3 else None)
+      kind_index = rng.randrange(len(names))
+      friendly_name = f'{area['name'] if area is not None else 'Home'} {names[kind_index]}'
+      object_id = slugify(friendly_name)
+      count = used_ids.get(f'{domain}.{object_id}', 0)
+      used_ids[f'{domain}.{object_id}'] = count + 1
+      if count > 0:
+        object_id = f'{object_id}_{count + 1}'
+        friendly_name = f'{friendly_name} {count + 1}'
+      entity_id = f'{domain}.{object_id}'
+
+      device_class = device_classes[kind_index % len(device_classes)]
+      supported_features = rng.choice(features)
+      last_changed = iso_timestamp(rng)
+      self.states.append({
+        'entity_id': entity_id,
+        'state': self.random_state(rng, domain),
+        'attributes': entity_attributes(rng, domain, friendly_name, device_class, supported_features),
+        'last_changed': last_changed,
+        'last_reported': last_changed,
+        'last_updated': last_changed,
+        'context': {'id': context_id(rng), 'parent_id': None, 'user_id': None}
+      })
+
+      integration = rng.choice(integrations)
+      self.integrations.setdefault(integration, []).append(entity_id)
+      self.entity_devices[entity_id] = device['id'] if device is not None else None
+      self.entity_platforms[entity_id] = integration
+      if device is None and area is not None:
+        self.entity_direct_areas[entity_id] = area['id']
+      if device is not None:
+        device['entities'].append(entity_id)
+      if area is not None:
+        area['entities'].append(entity_id)
+        area_floor[area['id']]['entities'].append(entity_id)
+      if rng.random() < 0.1:
+        rng.choice(self.labels)['entities'].append(entity_id)
+
+    for label in self.labels:
+      label['areas'] = [area['id'] for area in rng.sample(self.areas, min(len(self.areas), rng.randrange(0, 4)))]
+
+    self.all_devices = self.devices
+    self.devices = [device for device in self.devices if len(device['entities']) > 0] # Template only lists devices having entities
+    self.domains: List[Dict[str, Any]] = build_services(rng, extra_domain_count=max(4, entity_count // 400))
+
+  @staticmethod
+  def random_state(rng: random.Random, domain: str) -> str:
+    match domain:
+      case 'sensor':
+        return str(round(rng.uniform(0, 1000), 2))
+      case 'binary_sensor' | 'light' | 'switch' | 'fan' | 'input_boolean' | 'automation' | 'script' | 'update':
+        return rng.choice(['on', 'off'])
+      case 'cover':
+        return rng.choice(['open', 'closed', 'opening'])
+      case 'media_player':
+        return rng.choice(['playing', 'paused', 'idle', 'off'])
+      case 'climate':
+        return rng.choice(['heat', 'cool', 'off', 'auto'])
+      case 'lock':
+        return rng.choice(['locked', 'unlocked'])
+      case 'weather':
+        return rng.choice(['sunny', 'cloudy', 'rainy'])
+      case 'button' | 'conversation':
+        return iso_timestamp(rng)
+    return 'unknown'
+
+  @property
+  def whitelist(self) -> List[List[str]]:
+    """
+    Whitelist (as `WHITELISTED_SERVICES`) matching all common services and as many custom integrations
+    as fit within Discord's limit of 100 top-level commands
+    """
+    return [['(?!integration_)', '.*'], ['integration_[1-5]?[0-9]$', '.*']]
+
+  def all_service_ids(self) -> List[Tuple[str, str]]:
+    return [(domain['domain'], service_id) for domain in self.domains for service_id in domain['services'].keys()]
+
+  # Responses for the Home Assistant REST API
+  def render_template(self, template: str) -> str:
+    if (match := re.search(r"set (floor|area|label|device)_id = '([^']*)'", template)) is not None:
+      kind, object_id = match.groups()
+      collection = {'floor': self.floors, 'area': self.areas, 'label': self.labels, 'device': self.devices}[kind]
+      found = next((x for x in collection if x['id'] == object_id), None)
+      return json.dumps(found) if found is not None else ''
+    if (match := re.search(r"set integration = '([^']*)'", template)) is not None:
+      return json.dumps(self.integrations.get(match.group(1), []))
+    if 'floors()' in template:
+      return json.dumps(self.floors)
+    if 'areas()' in template:
+      return json.dumps(self.areas)
+    if 'labels()' in template:
+      return json.dumps(self.labels)
+    if 'for state in states' in template: # Entity display rows
+      return json.dumps([
+        [state['entity_id'], state['attributes'].get('friendly_name'), state['attributes'].get('device_class'), state['attributes'].get('supported_features')]
+        for state in self.states
+      ])
+    if "map('device_id')" in template: # Only the rendered device fields
+      keys = re.findall(r'"(\w+)": ', template)
+      return json.dumps([{key: device[key] for key in keys} for device in self.devices])
+    raise ValueError('Unsupported template')
+
+  def handle_request(self, path: str, method: str = 'GET', json_data: Any = None) -> Any:
+    path = path.strip('/')
+    query = ''
+    if '?' in path:
+      path, query = path.split('?', 1)
+
+    if path == 'states' and method == 'GET':
+      return self.states
+    if path.startswith('states/') and method == 'GET':
+      entity_id = path[len('states/'):]
+      return next((x for x in self.states if x['entity_id'] == entity_id), None)
+    if path == 'services' and method == 'GET':
+      return self.domains
+    if path.startswith('services/') and method == 'POST':
+      if query == 'return_response':
+        return {'changed_states': [], 'service_response': {}}
+      return []
+    if path == 'template' and method == 'POST':
+      return self.render_template(json_data['template'])
+    if path == 'conversation/process' and method == 'POST':
+      return {
+        'response': {
+          'language': json_data.get('language') or 'en',
+          'card': {},
+          'data': {'targets': [], 'success': [], 'failed': []},
+          'speech': {'plain': {'speech': 'Done', 'extra_data': None}},
+          'response_type': 'action_done'
+        },
+        'conversation_id': context_id(random.Random(json_data.get('text'))),
+        'continue_conversation': False
+      }
+    raise KeyError(f'Unsupported endpoint {method} {path}')
+
+  # Registries as returned by the websocket API
+  def floor_registry(self) -> List[Dict[str, Any]]:
+    return [
+      {'floor_id': floor['id'], 'name': floor['name'], 'level': i, 'icon': None, 'aliases': [], 'created_at': 0.0, 'modified_at': 0.0}
+      for i, floor in enumerate(self.floors)
+    ]
+
+  def area_registry(self) -> List[Dict[str, Any]]:
+    area_floors = {area_id: floor['id'] for floor in self.floors for area_id in floor['areas']}
+    area_labels = self.label_membership('areas')
+    return [
+      {'area_id': area['id'], 'name': area['name'], 'floor_id': area_floors.get(area['id']), 'labels': area_labels.get(area['id'], []), 'icon': None, 'picture': None, 'aliases': [], 'created_at': 0.0, 'modified_at': 0.0}
+      for area in self.areas
+    ]
+
+  def label_registry(self) -> List[Dict[str, Any]]:
+    return [
+      {'label_id': label['id'], 'name': label['name'], 'description': label['description'], 'color': None, 'icon': None, 'created_at': 0.0, 'modified_at': 0.0}
+      for label in self.labels
+    ]
+
+  def device_registry(self) -> List[Dict[str, Any]]:
+    device_labels = self.label_membership('devices')
+    return [
+      {
+        'id': device['id'],
+        'area_id': device['area_id'],
+        'name': device['name'],
+        'name_by_user': device['name_by_user'],
+        'manufacturer': device['manufacturer'],
+        'model': device['model'],
+        'model_id': device['model_id'],
+        'serial_number': device['serial_number'],
+        'hw_version': device['hw_version'],
+        'sw_version': device['sw_version'],
+        'labels': device_labels.get(device['id'], []),
+        'config_entries': [f'{device['id'][:26]}'],
+        'connections': [],
+        'identifiers': [['fixture', device['id']]],
+        'disabled_by': None,
+        'entry_type': None,
+        'via_device_id': None,
+        'configuration_url': None,
+        'created_at': 0.0,
+        'modified_at': 0.0
+      }
+      for device in self.all_devices
+    ]
+
+  def entity_registry(self) -> List[Dict[str, Any]]:
+    entity_labels = self.label_membership('entities')
+    return [
+      {
+        'entity_id': state['entity_id'],
+        'device_id': self.entity_devices[state['entity_id']],
+        'area_id': self.entity_direct_areas.get(state['entity_id']),
+        'platform': self.entity_platforms[state['entity_id']],
+        'labels': entity_labels.get(state['entity_id'], []),
+        'name': None,
+        'original_name': state['attributes'].get('friendly_name'),
+        'icon': None,
+        'id': f'{i:032x}',
+        'unique_id': state['entity_id'],
+        'disabled_by': None,
+        'hidden_by': None,
+        'entity_category': None,
+        'has_entity_name': False,
+        'translation_key': None,
+        'config_entry_id': None,
+        'created_at': 0.0,
+        'modified_at': 0.0
+      }
+      for i, state in enumerate(self.states)
+    ]
+
+  def entity_registry_display(self) -> Dict[str, Any]:
+    """Compact `config/entity_registry/list_for_display` response"""
+    entity_labels = self.label_membership('entities')
+    entities: List[Dict[str, Any]] = []
+    for state in self.states:
+      entity_id = state['entity_id']
+      entry: Dict[str, Any] = {'ei': entity_id, 'pl': self.entity_platforms[entity_id]}
+      if self.entity_devices[entity_id] is not None: entry['di'] = self.entity_devices[entity_id]
+      if entity_id in self.entity_direct_areas: entry['ai'] = self.entity_direct_areas[entity_id]
+      if entity_id in entity_labels: entry['lb'] = entity_labels[entity_id]
+      if 'friendly_name' in state['attributes']: entry['en'] = state['attributes']['friendly_name']
+      entities.append(entry)
+    return {'entity_categories': {'0': 'config', '1': 'diagnostic'}, 'entities': entities}
+
+  def label_membership(self, kind: str) -> Dict[str, List[str]]:
+    membership: Dict[str, List[str]] = {}
+    for label in self.labels:
+      for object_id in label[kind]:
+        membership.setdefault(object_id, []).append(label['id'])
+    return membership
+
+  def services_by_domain(self) -> Dict[str, Dict[str, Any]]:
+    """`get_services` websocket response"""
+    return {domain['domain']: domain['services'] for domain in self.domains}
+
+  def mdi_icons(self, count: int = 7000) -> List[Dict[str, Any]]:
+    rng = random.Random(count)
+    words = ['light', 'bulb', 'lamp', 'home', 'door', 'window', 'fan', 'thermometer', 'water', 'fire', 'lock', 'music', 'television', 'speaker', 'battery', 'power', 'plug', 'alert', 'account', 'car', 'garage', 'weather', 'sun', 'moon', 'cloud', 'outline', 'off', 'variant', 'box', 'circle']
+    return [
+      {
+        'id': f'{rng.getrandbits(128):032X}',
+        'baseIconId': f'{rng.getrandbits(128):032X}',
+        'name': (name := '-'.join(rng.sample(words, rng.randrange(1, 4))) + f'-{i}'),
+        'codepoint': f'F{i:04X}',
+        'aliases': [f'{name}-alias-{j}' for j in range(rng.randrange(0, 3))],
+        'styles': [],
+        'version': '1.5.54',
+        'deprecated': False,
+        'tags': [],
+        'author': 'Google'
+      }
+      for i in range(count)
+    ]
+
+FIXTURE_CACHE: Dict[Tuple[int, int], HomeFixture] = {}
+
+def get_home_fixture(entity_count: int, seed: int = 0) -> HomeFixture:
+  """Returns memoized fixture (generating the large homes takes a while)"""
+  key = (entity_count, seed)
+  if key not in FIXTURE_CACHE:
+    FIXTURE_CACHE[key] = HomeFixture(entity_count, seed)
+  return FIXTURE_CACHE[key]
@@ -0,0 +1,129 @@
+import inspect
+import json
+import platform
+import statistics
+import time
+import datetime
+from typing import Callable, Dict, List, Any, Optional, Awaitable
+
+# Benchmark registry
+class Benchmark():
+  def __init__(self, name: str, func: Callable[..., Any], sizes: Optional[List[int]] = None, group: Optional[str] = None):
+    self.name = name
+    self.func = func
+    self.sizes = sizes # None - the benchmark does not depend on the home size
+    self.group = group
+
+  def result_name(self, size: Optional[int]) -> str:
+    return self.name if size is None else f'{self.name}[{size}]'
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+def benchmark(name: str, sizes: Optional[List[int]] = None, group: Optional[str] = None):
+  """
+  Registers a benchmark. The decorated (async) function receives the home size (when `sizes` is set)
+  and returns the measured operation (callable or coroutine function), `(operation, item_count)` tuple
+  for throughput benchmarks or an already measured result dictionary.
+  """
+  def decorator(func):
+    BENCHMARKS[name] = Benchmark(name, func, sizes, group)
+    return func
+  return decorator
+
+# Measurement
+async def measure(
+  operation: Callable[[], Any] | Callable[[], Awaitable[Any]],
+  min_rounds: int = 3,
+  max_rounds: int = 1000,
+  min_time: float = 0.5
+) -> Dict[str, Any]:
+  """Runs the operation until both `min_rounds` and `min_time` are reached and returns timing statistics (seconds)"""
+  is_async = inspect.iscoroutinefunction(operation)
+  timings: List[float] = []
+  started = time.perf_counter()
+  while len(timings) < max_rounds and (len(timings) < min_rounds or time.perf_counter() - started < min_time):
+    round_started = time.perf_counter()
+    if is_async:
+      await operation()
+    else:
+      operation()
+    timings.append(time.perf_counter() - round_started)
+
+  return {
+    'rounds': len(timings),
+    'min': min(timings),
+    'median': statistics.median(timings),
+    'mean': statistics.fmean(timings),
+    'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0
+  }
+
+async def run_benchmarks(
+  selected: List[Benchmark],
+  sizes: List[int],
+  min_rounds: int = 3,
+  min_time: float = 0.5,
+  log: Callable[[str], None] = print
+) -> Dict[str, Any]:
+  results: Dict[str, Any] = {}
+  for bench in selected:
+    bench_sizes: List[Optional[int]] = [None] if bench.sizes is None else [x for x in sizes if x in bench.sizes]
+    for size in bench_sizes:
+      name = bench.result_name(size)
+      try:
+        prepared = await bench.func(size) if bench.sizes is not None else await bench.func()
+        if isinstance(prepared, dict): # Benchmark measured itself (e.g. memory usage)
+          result = prepared
+        elif isinstance(prepared, tuple): # (operation, items processed by single operation call)
+          operation, item_count = prepared
+          result = await measure(operation, min_rounds=min_rounds, min_time=min_time)
+          result['items_per_second'] = item_count / result['median'] if result['median'] > 0 else 0.0
+        else:
+          result = await measure(prepared, min_rounds=min_rounds, min_time=min_time)
+        results[name] = result
+        log(f'{name:<60} {format_result(result)}')
+      except Exception as e:
+        results[name] = {'error': f'{type(e).__name__}: {e}'}
+        log(f'{name:<60} FAILED {type(e).__name__}: {e}')
+  return results
+
+def format_result(result: Dict[str, Any]) -> str:
+  if 'median' in result:
+    return f"median {result['median'] * 1000:10.3f} ms  min {result['min'] * 1000:10.3f} ms  rounds {result['rounds']}"
+  return '  '.join(f'{key} {value}' for key, value in result.items())
+
+# Reports
+def create_report(results: Dict[str, Any]) -> Dict[str, Any]:
+  return {
+    'meta': {
+      'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+      'python': platform.python_version(),
+      'platform': platform.platform(),
+      'machine': platform.machine()
+    },
+    'results': results
+  }
+
+def write_report(path: str, report: Dict[str, Any]) -> None:
+  with open(path, 'w', encoding='utf-8') as f:
+    json.dump(report, f, indent=2, sort_keys=True)
+
+def read_report(path: str) -> Dict[str, Any]:
+  with open(path, 'r', encoding='utf-8') as f:
+    return json.load(f)
+
+COMPARED_METRICS = ['median', 'peak_bytes', 'resident_bytes', 'max_loop_lag']
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+  """Returns descriptions of results which got worse than the baseline by more than `max_regression` (fraction)"""
+  regressions: List[str] = []
+  for name, result in current['results'].items():
+    base_result = baseline['results'].get(name)
+    if base_result is None:
+      continue
+    for metric in COMPARED_METRICS:
+      if metric not in result or metric not in base_result or base_result[metric] <= 0:
+        continue
+      change = result[metric] / base_result[metric] - 1
+      if change > max_regression:
+        regressions.append(f'{name} {metric}: {base_result[metric]:.6g} -> {result[metric]:.6g} (+{change * 100:.1f}%)')
+  return regressions
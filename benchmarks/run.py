@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import fnmatch
+import sys
+from typing import List, Dict, Any
+
+from benchmarks.harness import Benchmark, BENCHMARKS, run_benchmarks, create_report, write_report, read_report, compare_reports
+from benchmarks.fixtures import HOME_SIZES
+from benchmarks.fakeclient import close_clients
+
+# Benchmark modules (registering the benchmarks on import)
+import benchmarks.bench_helpers
+import benchmarks.bench_autocompletes
+import benchmarks.bench_services
+import benchmarks.bench_haclient
+import benchmarks.bench_startup
+
+def parse_sizes(value: str) -> List[int]:
+  sizes: List[int] = []
+  for part in value.split(','):
+    part = part.strip()
+    sizes.append(HOME_SIZES[part] if part in HOME_SIZES else int(part))
+  return sizes
+
+async def run(selected: List[Benchmark], args: argparse.Namespace) -> Dict[str, Any]:
+  try:
+    return await run_benchmarks(selected, args.sizes, min_rounds=args.min_rounds, min_time=args.min_time)
+  finally:
+    await close_clients()
+
+def main() -> int:
+  parser = argparse.ArgumentParser(description="Runs the synthetic large-home benchmarks")
+  parser.add_argument('-k', '--filter', action='append', default=None, help="Glob pattern of benchmark names to run (may be repeated)")
+  parser.add_argument('-s', '--sizes', type=parse_sizes, default=list(HOME_SIZES.values()), help="Comma separated home sizes (entity counts or small/medium/large)")
+  parser.add_argument('-o', '--output', default='bench_output.json', help="Path of the JSON report")
+  parser.add_argument('-b', '--baseline', default=None, help="JSON report to compare against")
+  parser.add_argument('--max-regression', type=float, default=0.25, help="Allowed slowdown against the baseline (fraction)")
+  parser.add_argument('--min-rounds', type=int, default=3)
+  parser.add_argument('--min-time', type=float, default=0.5, help="Minimum measuring time per benchmark (seconds)")
+  parser.add_argument('--list', action='store_true', help="Lists the benchmarks and exits")
+  args = parser.parse_args()
+
+  selected = [
+    bench for name, bench in BENCHMARKS.items()
+    if args.filter is None or any(fnmatch.fnmatch(name, pattern) for pattern in args.filter)
+  ]
+  if args.list:
+    for bench in selected:
+      print(bench.name)
+    return 0
+
+  results = asyncio.run(run(selected, args))
+  report = create_report(results)
+  write_report(args.output, report)
+  print(f"Report written to {args.output}")
+
+  failed = [name for name, result in results.items() if 'error' in result]
+  if len(failed) > 0:
+    print(f"{len(failed)} benchmarks failed: {', '.join(failed)}")
+
+  if args.baseline is not None:
+    regressions = compare_reports(report, read_report(args.baseline), args.max_regression)
+    if len(regressions) > 0:
+      print("Regressions against the baseline:")
+      for regression in regressions:
+        print(f"  {regression}")
+      return 1
+    print("No regressions against the baseline")
+  return 1 if len(failed) > 0 else 0
+
+if __name__ == '__main__':
+  sys.exit(main())
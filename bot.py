@@ -1,16 +1,24 @@
 import platform
 import os
 import logging
+import asyncio
+import json
+import hashlib
 from cachetools import TTLCache
-from typing import Union
+from typing import Union, Optional, Dict
 
 import discord
 from discord.ext.commands import Context
 from discord import app_commands
 from discord.ext import commands, tasks
 from haclient import CustomHAClient
+from hawebsocket import HomeAssistantWebsocket
+from metrics import METRICS
+from helpers import SingleFlight, RecentValues
+from scheduler import request_priority
 
 from enums.emojis import Emoji
+from enums.HomeAssistantRequestPriority import HomeAssistantRequestPriority
 
 class HASSDiscordBot(commands.Bot):
   def __init__(self, logger: logging.Logger, file_logger: logging.Logger) -> None:
@@ -20,6 +28,10 @@ class HASSDiscordBot(commands.Bot):
     )
 
     self.conversation_cache = TTLCache(maxsize=100, ttl=15*60)
+    self.autocomplete_cache = TTLCache(maxsize=1000, ttl=30) # Results of identical autocomplete queries
+    self.autocomplete_flights = SingleFlight() # Identical autocomplete queries being computed
+    self.autocomplete_pages = TTLCache(maxsize=200, ttl=15*60) # Choices of an empty input
+    self.recent_choices = RecentValues() # Values used in the executed commands
     self.homeassistant_url = os.getenv("HOMEASSISTANT_URL")
 
     discord_guild_id_env = os.getenv("DISCORD_GUILD_ID")
@@ -28,33 +40,65 @@ class HASSDiscordBot(commands.Bot):
     self.discord_special_role_id = int(discord_special_role_id_env) if discord_special_role_id_env is not None else None
 
     self.status_template = os.getenv("STATUS_TEMPLATE")
+    self.command_hashes_path = os.getenv("COMMAND_HASHES_PATH") or f"{os.path.realpath(os.path.dirname(__file__))}/data/command_hashes.json"
+
+    loop_lag_warning_env = os.getenv("LOOP_LAG_WARNING")
+    self.loop_lag_warning = float(loop_lag_warning_env) if loop_lag_warning_env is not None else 0.25 # Seconds
+
+    homeassistant_cache_ttl_env = os.getenv("HOMEASSISTANT_CACHE_TTL")
+    self.homeassistant_cache_ttl = float(homeassistant_cache_ttl_env) if homeassistant_cache_ttl_env is not None else 15*60 # Seconds
+    homeassistant_registry_cache_ttl_env = os.getenv("HOMEASSISTANT_REGISTRY_CACHE_TTL")
+    self.homeassistant_registry_cache_ttl = float(homeassistant_registry_cache_ttl_env) if homeassistant_registry_cache_ttl_env is not None else 60*60 # Seconds - registry changes invalidate the caches earlier
 
     self.MAX_AUTOCOMPLETE_CHOICES = 25
     self.SIMILARITY_TOLERANCE = 0.2 # Only display items with score >= max_score * (1 - SIMILARITY_TOLERANCE)
 
     self.logger = logger
     self.file_logger = file_logger
+    self.metrics = METRICS
+    self.startup_completed = False
+
+  async def load_cog(self, cog_name: str) -> None:
+    extension_name = f"cogs.{cog_name}"
+    if not extension_name in self.extensions:
+      try:
+        with self.metrics.startup.span(f"cog {cog_name}"):
+          await self.load_extension(extension_name)
+        self.logger.info(f"Loaded cog {cog_name}")
+      except Exception as e:
+        self.logger.error(
+          f"Failed to load the cog {cog_name} - {type(e).__name__}\n{e}"
+        )
 
   async def load_cogs(self) -> None:
+    # Cogs do not depend on each other - load them concurrently so that HA fetches of one cog do not block the others
     COG_EXTENSION = ".py"
-    for file in os.listdir(f"{os.path.realpath(os.path.dirname(__file__))}/cogs"):
-      if file.endswith(COG_EXTENSION):
-        cog_name = file[:-len(COG_EXTENSION)]
-        extension_name = f"cogs.{cog_name}"
-        if not extension_name in self.extensions:
-          try:
-            await self.load_extension(extension_name)
-            self.logger.info(f"Loaded cog {cog_name}")
-          except Exception as e:
-            self.logger.error(
-              f"Failed to load the cog {cog_name} - {type(e).__name__}\n{e}"
-            )
+    await asyncio.gather(*(
+      self.load_cog(file[:-len(COG_EXTENSION)])
+      for file in sorted(os.listdir(f"{os.path.realpath(os.path.dirname(__file__))}/cogs"))
+      if file.endswith(COG_EXTENSION)
+    ))
+
+  async def warmup_homeassistant(self) -> None:
+    # Prefetch the data used by autocompletes (domains are fetched by the services cog, full entities and devices on first use)
+    try:
+      with self.metrics.startup.span("homeassistant warmup"), request_priority(HomeAssistantRequestPriority.BACKGROUND):
+        await asyncio.gather(
+          self.homeassistant_client.cache_async_custom_get_display_entities(),
+          self.homeassistant_client.cache_async_custom_get_display_devices(),
+          self.homeassistant_client.cache_async_custom_get_areas(),
+          self.homeassistant_client.cache_async_custom_get_floors(),
+          self.homeassistant_client.cache_async_custom_get_labels()
+        )
+    except Exception as e:
+      self.logger.error("Home Assistant warmup error - %s %s", type(e), e)
 
   @tasks.loop(minutes=1)
   async def status_task(self) -> None:
     if self.status_template is not None:
       try:
-        new_status = await self.homeassistant_client.async_format_string(self.status_template)
+        with request_priority(HomeAssistantRequestPriority.BACKGROUND):
+          new_status = await self.homeassistant_client.async_format_string(self.status_template)
       except:
         new_status = "Unavailable"
       await self.change_presence(activity=discord.Game(name=new_status))
@@ -64,11 +108,27 @@ class HASSDiscordBot(commands.Bot):
     await self.wait_until_ready()
 
   async def setup_hook(self):
+    setup_entry = self.metrics.startup.begin("setup_hook")
+    self.metrics.loop_lag.start(
+      self.loop_lag_warning,
+      lambda lag: self.logger.warning("Event loop was blocked for %.0f ms", lag * 1000)
+    )
     self.homeassistant_client = CustomHAClient(
       os.getenv("HOMEASSISTANT_API_URL"),
-      os.getenv("HOMEASSISTANT_TOKEN")
+      os.getenv("HOMEASSISTANT_TOKEN"),
+      cache_ttl=self.homeassistant_cache_ttl,
+      registry_cache_ttl=self.homeassistant_registry_cache_ttl
+    )
+    self.homeassistant_websocket = HomeAssistantWebsocket(
+      self.homeassistant_client.api_url,
+      self.homeassistant_client.token,
+      self.logger
     )
+    self.homeassistant_client.attach_websocket(self.homeassistant_websocket)
+    self.metrics.requests = self.homeassistant_client.scheduler
+    self.homeassistant_websocket.start()
 
+    self.warmup_task = asyncio.create_task(self.warmup_homeassistant())
     await self.load_cogs()
 
     self.file_logger.info(f"Logged in as {self.user.name}")
@@ -77,8 +137,15 @@ class HASSDiscordBot(commands.Bot):
     self.file_logger.info(f"Running on: {platform.system()} {platform.release()} ({os.name})")
 
     self.status_task.start()
+    self.metrics.startup.end(setup_entry)
     return await super().setup_hook()
 
+
+  async def close(self) -> None:
+    self.metrics.loop_lag.stop()
+    if hasattr(self, 'homeassistant_websocket'):
+      await self.homeassistant_websocket.close()
+    await super().close()
   
   async def on_message(self, message: discord.Message) -> None:
     if message.author == self.user or message.author.bot:
@@ -126,16 +193,71 @@ class HASSDiscordBot(commands.Bot):
     except Exception as e:
       self.logger.error("Command error handling - %s %s", type(e), e)
   
+  def get_command_tree_hash(self, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    # Stable hash of the payload sent to Discord by tree.sync
+    payload = sorted(
+      (command.to_dict(self.tree) for command in self.tree.get_commands(guild=guild)),
+      key=lambda x: (x.get('type', 1), x['name'])
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode()).hexdigest()
+
+  def read_command_hashes(self) -> Dict[str, str]:
+    try:
+      with open(self.command_hashes_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+    except FileNotFoundError:
+      return {}
+    except Exception as e:
+      self.logger.error("Failed to read command hashes - %s %s", type(e), e)
+      return {}
+
+  def write_command_hashes(self, hashes: Dict[str, str]) -> None:
+    try:
+      os.makedirs(os.path.dirname(self.command_hashes_path), exist_ok=True)
+      with open(self.command_hashes_path, 'w', encoding='utf-8') as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+    except Exception as e:
+      self.logger.error("Failed to write command hashes - %s %s", type(e), e)
+
+  async def sync_commands(self, force: bool = False) -> Dict[str, Optional[int]]:
+    """Syncs the global and main guild commands which changed since the last sync. Returns synced command count per scope (None - skipped)"""
+    scopes: Dict[str, Optional[discord.Object]] = { 'global': None }
+    if self.discord_main_guild_id is not None:
+      scopes[f'guild {self.discord_main_guild_id}'] = discord.Object(self.discord_main_guild_id)
+
+    hashes = self.read_command_hashes()
+    results: Dict[str, Optional[int]] = {}
+    for scope, guild in scopes.items():
+      hash_key = f'{self.application_id} {scope}' # Hashes are only valid for the same application
+      tree_hash = self.get_command_tree_hash(guild)
+      if not force and hashes.get(hash_key) == tree_hash:
+        results[scope] = None
+        self.file_logger.info(f"Skipped {scope} commands sync (unchanged)")
+        continue
+
+      synced = await self.tree.sync(guild=guild)
+      hashes[hash_key] = tree_hash
+      self.write_command_hashes(hashes)
+      results[scope] = len(synced)
+      self.file_logger.info(f"Synced {len(synced)} {scope} commands")
+    return results
+
   async def on_ready(self):
     self.file_logger.info("Bot is ready")
+    if not self.startup_completed:
+      self.metrics.startup.mark("ready")
     try:
-      synced = await self.tree.sync()
-      self.file_logger.info(f"Synced {len(synced)} commands")
-      if self.discord_main_guild_id is not None:
-        synced_guild = await self.tree.sync(guild=discord.Object(self.discord_main_guild_id))
-        self.file_logger.info(f"Synced {len(synced_guild)} guild commands")
+      if self.startup_completed:
+        await self.sync_commands()
+      else:
+        with self.metrics.startup.span("command sync"):
+          await self.sync_commands()
     except Exception as e:
       self.logger.error("Sync error - %s %s", type(e), e)
+
+    if not self.startup_completed:
+      self.startup_completed = True
+      self.file_logger.info("Startup timeline:\n" + "\n".join(self.metrics.startup.format()))
   
   async def check_user_guild(self, interaction: discord.Interaction, check_role=False) -> bool:
     respond = interaction.type == discord.InteractionType.application_command
@@ -11,8 +11,8 @@ from enums.emojis import Emoji
 from helpers import add_param, find, shorten_embed_value
 from autocompletes import require_permission_autocomplete, area_autocomplete
 from models.AreaModel import AreaModel
-from models.DeviceModel import DeviceModel
-from models.EntityModel import EntityModel
+from models.DeviceDisplayModel import DeviceDisplayModel
+from models.EntityDisplayRecord import EntityDisplayRecord
 
 class Areas(commands.Cog):
   def __init__(self, bot: HASSDiscordBot) -> None:
@@ -40,6 +40,7 @@ class Areas(commands.Cog):
       except Exception as e:
         self.bot.logger.error("Failed to fetch area from HomeAssistant - %s %s", type(e), e)
         return await interaction.followup.send(f"{Emoji.ERROR} Failed to fetch area from HomeAssistant.", ephemeral=True)
+      self.bot.recent_choices.add(area_id)
 
       escaped_area_id = self.bot.homeassistant_client.escape_id(area_data.id)
       history_url = add_param(urllib.parse.urljoin(self.bot.homeassistant_url, "history"), area_id=escaped_area_id)
@@ -56,7 +57,7 @@ class Areas(commands.Cog):
       if len(area_data.devices) > 0:
         devices: List[str] = []
         try:
-          devices_data: List[DeviceModel] = await self.bot.homeassistant_client.cache_async_custom_get_devices()
+          devices_data: List[DeviceDisplayModel] = await self.bot.homeassistant_client.cache_async_custom_get_display_devices()
           if devices_data is None:
             raise Exception("No devices were returned")
         except Exception as e:
@@ -64,7 +65,7 @@ class Areas(commands.Cog):
           return await interaction.followup.send(f"{Emoji.ERROR} Failed to fetch devices from HomeAssistant.", ephemeral=True)
         
         for device_id in area_data.devices:
-          device: DeviceModel | None = find(lambda x: x.id == device_id, devices_data)
+          device: DeviceDisplayModel | None = find(lambda x: x.id == device_id, devices_data)
           if device is not None:
             devices.append(f"**{device.name}** ({device.id})")
           else:
@@ -75,7 +76,7 @@ class Areas(commands.Cog):
       if len(area_data.entities) > 0:
         entities: List[str] = []
         try:
-          entities_data: List[EntityModel] = await self.bot.homeassistant_client.cache_async_custom_get_entities()
+          entities_data: List[EntityDisplayRecord] = await self.bot.homeassistant_client.cache_async_custom_get_display_entities()
           if entities_data is None:
             raise Exception("No entities were returned")
         except Exception as e:
@@ -83,7 +84,7 @@ class Areas(commands.Cog):
           return await interaction.followup.send(f"{Emoji.ERROR} Failed to fetch entities from HomeAssistant", ephemeral=True)
 
         for entity_id in area_data.entities:
-          entity: EntityModel | None = find(lambda x: x.entity_id == entity_id, entities_data)
+          entity: EntityDisplayRecord | None = find(lambda x: x.entity_id == entity_id, entities_data)
           if entity is not None:
             friendly_name = self.bot.homeassistant_client.get_entity_friendlyname(entity)
             entities.append(f"**{friendly_name if friendly_name is not None else "?"}** ({entity.entity_id})")
@@ -10,7 +10,7 @@ from helpers import add_param, find, shorten_embed_value
 from autocompletes import device_autocomplete, require_permission_autocomplete
 from models.DeviceModel import DeviceModel
 from models.AreaModel import AreaModel
-from models.EntityModel import EntityModel
+from models.EntityDisplayRecord import EntityDisplayRecord
 from enums.emojis import Emoji
 
 class Devices(commands.Cog):
@@ -39,6 +39,7 @@ class Devices(commands.Cog):
       except Exception as e:
         self.bot.logger.error("Failed to fetch device from HomeAssistant - %s %s", type(e), e)
         return await interaction.followup.send(f"{Emoji.ERROR} Failed to fetch device from HomeAssistant.", ephemeral=True)
+      self.bot.recent_choices.add(device_id)
       
       area_data: AreaModel | None = None
       if device_data.area_id is not None:
@@ -56,7 +57,7 @@ class Devices(commands.Cog):
       config_url = urllib.parse.urljoin(self.bot.homeassistant_url, f"config/devices/device/{escaped_device_id}")
 
       embed = discord.Embed(
-        title=str(device_data.name) + (f" ({device_data.name_by_user})" if device_data.name_by_user is not None else ''),
+        title=device_data.display_name + (f" ({device_data.name_by_user})" if device_data.name_by_user is not None else ''),
         description=str(device_data.id),
         color=discord.Colour.default(),
         timestamp=datetime.datetime.now()
@@ -86,7 +87,7 @@ class Devices(commands.Cog):
       if len(device_data.entities) > 0:
         entities: List[str] = []
         try:
-          entities_data: List[EntityModel] = await self.bot.homeassistant_client.cache_async_custom_get_entities()
+          entities_data: List[EntityDisplayRecord] = await self.bot.homeassistant_client.cache_async_custom_get_display_entities()
           if entities_data is None:
             raise Exception("No entities were returned")
         except Exception as e:
@@ -94,7 +95,7 @@ class Devices(commands.Cog):
           return await interaction.followup.send(f"{Emoji.ERROR} Failed to fetch entities from HomeAssistant", ephemeral=True)
 
         for entity_id in device_data.entities:
-          entity: EntityModel | None = find(lambda x: x.entity_id == entity_id, entities_data)
+          entity: EntityDisplayRecord | None = find(lambda x: x.entity_id == entity_id, entities_data)
           if entity is not None:
             friendly_name = self.bot.homeassistant_client.get_entity_friendlyname(entity)
             entities.append(f"**{friendly_name if friendly_name is not None else "?"}** ({entity.entity_id})")
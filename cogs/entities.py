@@ -41,6 +41,7 @@ class Entities(commands.Cog):
       except Exception as e:
         self.bot.logger.error("Failed to fetch entity from HomeAssistant - %s %s", type(e), e)
         return await interaction.followup.send(f"{Emoji.ERROR} Failed to fetch entity from HomeAssistant.", ephemeral=True)
+      self.bot.recent_choices.add(entity_id)
       
       try:
         areas_data: List[AreaModel] = await self.bot.homeassistant_client.cache_async_custom_get_areas()
@@ -12,7 +12,7 @@ from helpers import add_param, find, shorten_embed_value
 from autocompletes import require_permission_autocomplete, floor_autocomplete
 from models.FloorModel import FloorModel
 from models.AreaModel import AreaModel
-from models.EntityModel import EntityModel
+from models.EntityDisplayRecord import EntityDisplayRecord
 
 class Floors(commands.Cog):
   def __init__(self, bot: HASSDiscordBot) -> None:
@@ -40,6 +40,7 @@ class Floors(commands.Cog):
       except Exception as e:
         self.bot.logger.error("Failed to fetch floor from HomeAssistant - %s %s", type(e), e)
         return await interaction.followup.send(f"{Emoji.ERROR} Failed to fetch floor from HomeAssistant.", ephemeral=True)
+      self.bot.recent_choices.add(floor_id)
 
       escaped_floor_id = self.bot.homeassistant_client.escape_id(floor_data.id)
       history_url = add_param(urllib.parse.urljoin(self.bot.homeassistant_url, "history"), floor_id=escaped_floor_id)
@@ -74,7 +75,7 @@ class Floors(commands.Cog):
       if len(floor_data.entities) > 0:
         entities: List[str] = []
         try:
-          entities_data: List[EntityModel] = await self.bot.homeassistant_client.cache_async_custom_get_entities()
+          entities_data: List[EntityDisplayRecord] = await self.bot.homeassistant_client.cache_async_custom_get_display_entities()
           if entities_data is None:
             raise Exception("No entities were returned")
         except Exception as e:
@@ -82,7 +83,7 @@ class Floors(commands.Cog):
           return await interaction.followup.send(f"{Emoji.ERROR} Failed to fetch entities from HomeAssistant", ephemeral=True)
 
         for entity_id in floor_data.entities:
-          entity: EntityModel | None = find(lambda x: x.entity_id == entity_id, entities_data)
+          entity: EntityDisplayRecord | None = find(lambda x: x.entity_id == entity_id, entities_data)
           if entity is not None:
             friendly_name = self.bot.homeassistant_client.get_entity_friendlyname(entity)
             entities.append(f"**{friendly_name if friendly_name is not None else "?"}** ({entity.entity_id})")
@@ -11,8 +11,8 @@ from enums.emojis import Emoji
 from helpers import add_param, find, shorten_embed_value
 from autocompletes import label_autocomplete, require_permission_autocomplete
 from models.AreaModel import AreaModel
-from models.DeviceModel import DeviceModel
-from models.EntityModel import EntityModel
+from models.DeviceDisplayModel import DeviceDisplayModel
+from models.EntityDisplayRecord import EntityDisplayRecord
 from models.LabelModel import LabelModel
 
 class Labels(commands.Cog):
@@ -41,6 +41,7 @@ class Labels(commands.Cog):
       except Exception as e:
         self.bot.logger.error("Failed to fetch label from HomeAssistant - %s %s", type(e), e)
         return await interaction.followup.send(f"{Emoji.ERROR} Failed to fetch label from HomeAssistant.", ephemeral=True)
+      self.bot.recent_choices.add(label_id)
 
       escaped_label_id = self.bot.homeassistant_client.escape_id(label_data.id)
       history_url = add_param(urllib.parse.urljoin(self.bot.homeassistant_url, "history"), label_id=escaped_label_id)
@@ -80,7 +81,7 @@ class Labels(commands.Cog):
       if len(label_data.devices) > 0:
         devices: List[str] = []
         try:
-          devices_data: List[DeviceModel] = await self.bot.homeassistant_client.cache_async_custom_get_devices()
+          devices_data: List[DeviceDisplayModel] = await self.bot.homeassistant_client.cache_async_custom_get_display_devices()
           if devices_data is None:
             raise Exception("No devices were returned")
         except Exception as e:
@@ -88,7 +89,7 @@ class Labels(commands.Cog):
           return await interaction.followup.send(f"{Emoji.ERROR} Failed to fetch devices from HomeAssistant.", ephemeral=True)
         
         for device_id in label_data.devices:
-          device: DeviceModel | None = find(lambda x: x.id == device_id, devices_data)
+          device: DeviceDisplayModel | None = find(lambda x: x.id == device_id, devices_data)
           if device is not None:
             devices.append(f"**{device.name}** ({device.id})")
           else:
@@ -100,7 +101,7 @@ class Labels(commands.Cog):
       if len(label_data.entities) > 0:
         entities: List[str] = []
         try:
-          entities_data: List[EntityModel] = await self.bot.homeassistant_client.cache_async_custom_get_entities()
+          entities_data: List[EntityDisplayRecord] = await self.bot.homeassistant_client.cache_async_custom_get_display_entities()
           if entities_data is None:
             raise Exception("No entities were returned")
         except Exception as e:
@@ -108,7 +109,7 @@ class Labels(commands.Cog):
           return await interaction.followup.send(f"{Emoji.ERROR} Failed to fetch entities from HomeAssistant", ephemeral=True)
 
         for entity_id in label_data.entities:
-          entity: EntityModel | None = find(lambda x: x.entity_id == entity_id, entities_data)
+          entity: EntityDisplayRecord | None = find(lambda x: x.entity_id == entity_id, entities_data)
           if entity is not None:
             friendly_name = self.bot.homeassistant_client.get_entity_friendlyname(entity)
             entities.append(f"**{friendly_name if friendly_name is not None else "?"}** ({entity.entity_id})")
@@ -1,25 +1,84 @@
 import os
-from typing import Optional, Literal, List, Dict, Any, Callable, Set
+from typing import Optional, Literal, List, Dict, Any, Callable, Set, Tuple, TYPE_CHECKING
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import json
 import inspect
-from helpers import shorten, shorten_argument_rename, to_list, is_matching
+import hashlib
+import asyncio
+from helpers import shorten, shorten_argument_rename, to_list
 import datetime
 import re
-import pycountry
-import langcodes
-from langcodes.language_lists import CLDR_LANGUAGES
 
 from bot import HASSDiscordBot
-from autocompletes import transform_multiple, transform_object, transform_multiple_autocomplete, multiple_autocomplete, icon_autocomplete, filtered_label_autocomplete, filtered_floor_autocomplete, filtered_area_autocomplete, filtered_device_autocomplete, filtered_entity_autocomplete, require_choice, label_floor_area_device_entity_autocomplete, choice_autocomplete, require_permission_autocomplete
-from functools import partial
+from autocompletes import transform_multiple, transform_object, transform_multiple_autocomplete, multiple_autocomplete, icon_autocomplete, filtered_label_autocomplete, filtered_floor_autocomplete, filtered_area_autocomplete, filtered_device_autocomplete, filtered_entity_autocomplete, require_choice, require_attribute, attribute_autocomplete, label_floor_area_device_entity_autocomplete, choice_autocomplete, require_permission_autocomplete, ChoiceIndex
+from functools import partial, cache
 from enums.emojis import Emoji
+from enums.HomeAssistantCacheId import HomeAssistantCacheId
+from enums.HomeAssistantRequestPriority import HomeAssistantRequestPriority
+from scheduler import request_priority
 from models.ServiceModel import ServiceFieldSelectorLocation, ServiceFieldSelectorDuration, DomainModel, ServiceModel, ServiceFieldSelectorDevice, ServiceFieldSelectorEntity, ServiceFieldCollection, ServiceField, ServiceFieldSelectorSelectOption, ServiceFieldSelectorEntityFilter, replacePlainSelectorOptions, replaceLegacyDeviceSelector, replaceLegacyEntitySelector
 from homeassistant_api.errors import RequestError
 
-ALL_LANGUAGES: List[langcodes.Language] = [langcodes.get(x) for x in CLDR_LANGUAGES]
+if TYPE_CHECKING:
+  import pycountry
+  import langcodes
+
+# pycountry and langcodes are imported lazily - they are only needed by country and language selectors
+@cache
+def get_all_languages() -> List['langcodes.Language']:
+  import langcodes
+  from langcodes.language_lists import CLDR_LANGUAGES
+  return [langcodes.get(x) for x in CLDR_LANGUAGES]
+
+def find_language(code: str) -> Optional['langcodes.Language']:
+  import langcodes
+  try:
+    return langcodes.find(code) # Language name
+  except LookupError:
+    pass
+  try:
+    return langcodes.get(code) # Language tag
+  except Exception:
+    return None
+
+# Option tables shared by all fields with the same subset and sort flag
+@cache
+def get_language_choices(languages: Optional[Tuple[str, ...]], no_sort: bool) -> ChoiceIndex:
+  selected_languages: List['langcodes.Language'] = get_all_languages()
+  if languages is not None:
+    selected_languages = [language for code in languages if (language := find_language(code)) is not None]
+
+  if not no_sort:
+    selected_languages = sorted(selected_languages, key=lambda x: x.display_name()) # Shared list can't be sorted in place
+
+  return ChoiceIndex([
+    ServiceFieldSelectorSelectOption.model_validate({
+      'label': x.display_name(),
+      'value': x.to_tag()
+    })
+    for x in selected_languages
+  ])
+
+@cache
+def get_country_choices(countries: Tuple[str, ...], no_sort: bool) -> ChoiceIndex:
+  import pycountry
+  selected_countries: List['pycountry.ExistingCountries'] = [
+    country
+    for code in countries
+    if (country := pycountry.countries.get(alpha_2=code) or pycountry.countries.get(alpha_3=code)) is not None
+  ]
+  if not no_sort:
+    selected_countries.sort(key=lambda x: x.name)
+
+  return ChoiceIndex([
+    ServiceFieldSelectorSelectOption.model_validate({
+      'label': x.name,
+      'value': x.alpha_2 # Home Assistant uses alpha2 ISO 3166
+    })
+    for x in selected_countries
+  ])
 
 def transform_duration(input: str, selector: ServiceFieldSelectorDuration):
   split = [int(x) for x in input.split(':')]
@@ -80,45 +139,224 @@ def transform_location(input: str, selector: ServiceFieldSelectorLocation, defau
   
   return obj
 
+REGEX_METACHARACTERS = set('.^$*+?{}[]\\|()')
+BACKREFERENCE_REGEX = re.compile(r'\\\d|\(\?P=') # Backreferences would point at the groups of other patterns in an alternation
+
+class PatternMatcher():
+  # re.match (prefix match) semantics of a set of patterns, compiled into a single alternation where possible
+  def __init__(self, patterns: List[str]):
+    self.match_all = any(x in ('.*', '') for x in patterns)
+    self.prefixes = tuple(x for x in patterns if not any(c in REGEX_METACHARACTERS for c in x)) # Plain text - startswith fast path
+    regex_patterns = [x for x in patterns if x not in self.prefixes and BACKREFERENCE_REGEX.search(x) is None]
+    self.regexes: List[re.Pattern] = [re.compile(x) for x in patterns if x not in self.prefixes and x not in regex_patterns]
+    if len(regex_patterns) > 0:
+      try:
+        self.regexes.append(re.compile('|'.join(f'(?:{x})' for x in regex_patterns)))
+      except re.error: # Patterns which can't be combined (e.g. inline global flags)
+        self.regexes += [re.compile(x) for x in regex_patterns]
+
+  def match(self, value: str) -> bool:
+    return self.match_all or value.startswith(self.prefixes) or any(x.match(value) is not None for x in self.regexes)
+
+class ServiceWhitelist():
+  def __init__(self, rules: List[List[str]]):
+    self.rules = [(domain_pattern, service_pattern) for domain_pattern, service_pattern in rules]
+    self.compiled_rules = [(re.compile(domain_pattern), re.compile(service_pattern)) for domain_pattern, service_pattern in self.rules] # Validates the patterns
+    self.domain_matchers: Dict[str, PatternMatcher] = {} # Domain id -> matcher of the service patterns of all rules matching the domain
+
+  def get_domain_matcher(self, domain_id: str) -> PatternMatcher:
+    matcher = self.domain_matchers.get(domain_id)
+    if matcher is None:
+      matcher = PatternMatcher([
+        service_pattern
+        for (_, service_pattern), (domain_regex, _) in zip(self.rules, self.compiled_rules)
+        if domain_regex.match(domain_id) is not None
+      ])
+      self.domain_matchers[domain_id] = matcher
+    return matcher
+
+  def is_allowed(self, domain_id: str, service_id: str) -> bool:
+    return self.get_domain_matcher(domain_id).match(service_id)
+
+  def get_rule_matches(self, domains: List[DomainModel]) -> List[List[str]]:
+    """Services (domain.service) matched by each rule"""
+    return [
+      [
+        f'{domain.domain}.{service_id}'
+        for domain in domains if domain_regex.match(domain.domain) is not None
+        for service_id in domain.services.keys() if service_regex.match(service_id) is not None
+      ]
+      for domain_regex, service_regex in self.compiled_rules
+    ]
+
+NO_CONSTANT = object()
+
+class ServiceFieldSpec():
+  # Command parameter built from a field selector, shared by all fields with the same normalized schema
+  def __init__(
+    self,
+    field_type: Any,
+    default_value: Any,
+    additional_description: str | None,
+    autocomplete: Any,
+    transformer: Callable[[Any, discord.Interaction], Any] | None,
+    constant: Any,
+    is_hidden: bool
+  ):
+    self.field_type = field_type
+    self.default_value = default_value
+    self.additional_description = additional_description
+    self.autocomplete = autocomplete
+    self.transformer = transformer
+    self.constant = constant # NO_CONSTANT - not a constant selector
+    self.is_hidden = is_hidden
+
 class Services(commands.Cog):
   def __init__(self, bot: HASSDiscordBot) -> None:
     self.bot = bot
 
     try:
       self.WHITELISTED_SERVICES = json.loads(os.getenv('WHITELISTED_SERVICES'))
+      self.whitelist = ServiceWhitelist(self.WHITELISTED_SERVICES)
     except Exception as e:
       self.bot.logger.error("Failed to load whitelisted services - %s %s", type(e), e)
       raise Exception("Failed to load whitelisted services")
     self.USE_AUTOCOMPLETE_MULTIPLE = True
     self.ALLOW_UNSUPPORTED = True
+    self.REFRESH_DELAY = 5 # Seconds between the first service event and the refresh
+    self.WHITELIST_DRY_RUN = os.getenv('WHITELIST_DRY_RUN', '').lower() in ('1', 'true', 'yes') # Only report the whitelist matches, no commands are created
+
+    self.service_fingerprints: Dict[str, Dict[str, str]] = {} # Domain id -> service id -> fingerprint of the built commands
+    self.field_spec_cache: Dict[str, ServiceFieldSpec] = {} # Normalized field schema -> spec
+    self.refresh_lock = asyncio.Lock()
+    self.scheduled_refresh: Optional[asyncio.Task] = None
+    self.applied_generation: Optional[int] = None # Domains cache generation the commands were built from
 
   async def cog_load(self) -> None:
     try:
       ha_domains: List[DomainModel] = await self.bot.homeassistant_client.cache_async_custom_get_domains()
-      for domain in ha_domains:
-        group = app_commands.Group(
-          name=domain.domain,
-          description=f"{domain.domain} services (actions)",
-          allowed_contexts=app_commands.AppCommandContext(guild=True, dm_channel=True, private_channel=True),
-          allowed_installs=app_commands.AppInstallationType(guild=True, user=True)
-        )
+      if self.WHITELIST_DRY_RUN:
+        self.report_whitelist(ha_domains)
+        return
+      await self.apply_domains(ha_domains)
+      self.applied_generation = self.bot.homeassistant_client.get_cache_generation(HomeAssistantCacheId.DOMAINS)
+    except Exception as e:
+      self.bot.logger.error("Failed to fetch domains and create service action commands - %s %s", type(e), e)
 
-        any_added = False
-        for service_id, service in domain.services.items():
-          if self.check_whitelist(domain.domain, service_id):
-            any_added = True
-            await self.create_service_command(group, domain, service_id, service)
+    websocket = getattr(self.bot, 'homeassistant_websocket', None)
+    if websocket is not None:
+      websocket.add_event_listener('service_registered', self.on_service_event)
+      websocket.add_event_listener('service_removed', self.on_service_event)
+    self.refresh_task.start()
+
+  async def cog_unload(self) -> None:
+    websocket = getattr(self.bot, 'homeassistant_websocket', None)
+    if websocket is not None:
+      websocket.remove_event_listener('service_registered', self.on_service_event)
+      websocket.remove_event_listener('service_removed', self.on_service_event)
+    self.refresh_task.cancel()
+    if self.scheduled_refresh is not None:
+      self.scheduled_refresh.cancel()
+    for domain_id in self.service_fingerprints.keys():
+      self.bot.tree.remove_command(domain_id)
 
-        if any_added:
-          self.bot.tree.add_command(group)
+  @staticmethod
+  def get_service_fingerprint(service: ServiceModel) -> str:
+    return hashlib.sha256(service.model_dump_json().encode()).hexdigest()
+
+  def get_domain_fingerprints(self, domain: DomainModel) -> Dict[str, str]:
+    # Only whitelisted services are part of the fingerprint, other changes do not affect the commands
+    return {
+      service_id: self.get_service_fingerprint(service)
+      for service_id, service in domain.services.items()
+      if self.check_whitelist(domain.domain, service_id)
+    }
+
+  async def create_domain_group(self, domain: DomainModel) -> app_commands.Group:
+    group = app_commands.Group(
+      name=domain.domain,
+      description=f"{domain.domain} services (actions)",
+      allowed_contexts=app_commands.AppCommandContext(guild=True, dm_channel=True, private_channel=True),
+      allowed_installs=app_commands.AppInstallationType(guild=True, user=True)
+    )
+    for service_id, service in domain.services.items():
+      if self.check_whitelist(domain.domain, service_id):
+        await self.create_service_command(group, domain, service_id, service)
+    return group
+
+  async def apply_domains(self, ha_domains: List[DomainModel]) -> List[str]:
+    """Rebuilds the groups of domains whose whitelisted services changed, returns the changed domain ids"""
+    self.field_spec_cache.clear() # Shared by the services built in this pass only, the schemas of removed services are not kept
+    changed_domains: List[str] = []
+    fingerprints: Dict[str, Dict[str, str]] = {}
+    for domain in ha_domains:
+      domain_fingerprints = self.get_domain_fingerprints(domain)
+      if len(domain_fingerprints) == 0:
+        continue
+      if domain.domain not in self.service_fingerprints and self.bot.tree.get_command(domain.domain) is not None:
+        self.bot.logger.error("Skipped the service action commands of %s - a command with the same name already exists", domain.domain)
+        continue
+      fingerprints[domain.domain] = domain_fingerprints
+      if self.service_fingerprints.get(domain.domain) == domain_fingerprints:
+        continue
+
+      changed_domains.append(domain.domain)
+      if domain.domain in self.service_fingerprints:
+        self.bot.tree.remove_command(domain.domain)
+      self.bot.tree.add_command(await self.create_domain_group(domain))
+
+    for domain_id in self.service_fingerprints.keys() - fingerprints.keys(): # Domains without any whitelisted services left
+      changed_domains.append(domain_id)
+      self.bot.tree.remove_command(domain_id)
+
+    self.service_fingerprints = fingerprints
+    return changed_domains
+
+  async def refresh_services(self) -> None:
+    async with self.refresh_lock:
+      with request_priority(HomeAssistantRequestPriority.BACKGROUND):
+        ha_domains: List[DomainModel] = await self.bot.homeassistant_client.cache_async_custom_get_domains(bypass=True)
+      generation = self.bot.homeassistant_client.get_cache_generation(HomeAssistantCacheId.DOMAINS)
+      if generation == self.applied_generation:
+        return # Unchanged response
+      changed_domains = await self.apply_domains(ha_domains)
+      self.applied_generation = generation
+      if len(changed_domains) == 0:
+        return
+
+      self.bot.logger.info(f"Rebuilt service commands of {', '.join(changed_domains)}")
+      if self.bot.is_ready(): # Otherwise synced by on_ready
+        await self.bot.sync_commands()
+
+  async def on_service_event(self, event: Dict[str, Any]) -> None:
+    data = event.get('data', {})
+    if not self.check_whitelist(data.get('domain', ''), data.get('service', '')) and data.get('domain') not in self.service_fingerprints:
+      return # Does not affect any command
+    if self.scheduled_refresh is None or self.scheduled_refresh.done(): # Integrations register many services at once
+      self.scheduled_refresh = asyncio.create_task(self.delayed_refresh_services())
+
+  async def delayed_refresh_services(self) -> None:
+    await asyncio.sleep(self.REFRESH_DELAY)
+    try:
+      await self.refresh_services()
     except Exception as e:
-      self.bot.logger.error("Failed to fetch domains and create service action commands - %s %s", type(e), e)
+      self.bot.logger.error("Failed to refresh service action commands - %s %s", type(e), e)
+
+  @tasks.loop(minutes=30)
+  async def refresh_task(self) -> None:
+    if self.refresh_task.current_loop == 0:
+      return # Commands were just built by cog_load
+    try:
+      await self.refresh_services()
+    except Exception as e:
+      self.bot.logger.error("Failed to refresh service action commands - %s %s", type(e), e)
 
   def check_whitelist(self, domain_id, service_id) -> bool:
-    for tmpl_domain_id, tmpl_service_id in self.WHITELISTED_SERVICES:
-      if re.match(tmpl_domain_id, domain_id) is not None and re.match(tmpl_service_id, service_id) is not None:
-        return True
-    return False
+    return self.whitelist.is_allowed(domain_id, service_id)
+
+  def report_whitelist(self, ha_domains: List[DomainModel]) -> None:
+    for (domain_pattern, service_pattern), matches in zip(self.whitelist.rules, self.whitelist.get_rule_matches(ha_domains)):
+      self.bot.logger.info(f"Whitelist rule [{domain_pattern}, {service_pattern}] matched {len(matches)} services: {', '.join(matches) if len(matches) > 0 else '-'}")
   
   @staticmethod
   def parse_targets(targets: List[str]) -> Dict:
@@ -150,6 +388,428 @@ class Services(commands.Cog):
     
     return parsed_kwargs
   
+  @staticmethod
+  def get_field_spec_key(field: ServiceField, service: ServiceModel) -> str:
+    """Normalized schema of the field's selector (and everything else the built spec depends on)"""
+    key = field.model_dump_json(include={'selector', 'default'}, exclude_none=True)
+    if field.selector.target is not None and service.target is not None:
+      key += service.target.model_dump_json(exclude_none=True)
+    return key
+
+  async def get_field_spec(self, field: ServiceField, service: ServiceModel) -> Optional[ServiceFieldSpec]:
+    key = self.get_field_spec_key(field, service)
+    if key in self.field_spec_cache:
+      return self.field_spec_cache[key]
+    spec = await self.create_field_spec(field, service)
+    if spec is not None:
+      self.field_spec_cache[key] = spec
+    return spec
+
+  async def create_field_spec(self, field: ServiceField, service: ServiceModel) -> Optional[ServiceFieldSpec]:
+    is_hidden: bool = False
+    field_type = None
+    default_value = None
+    additional_description: str | None = None
+    autocomplete: Any = None
+    transformer: Callable[[Any, discord.Interaction], Any] | None = None
+    constant: Any = NO_CONSTANT
+    if field.selector.area is not None: # ServiceFieldSelectorArea
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      if field.selector.area.multiple == True:
+        if self.USE_AUTOCOMPLETE_MULTIPLE:
+          autocomplete = partial(
+            multiple_autocomplete,
+            func=partial(
+              filtered_area_autocomplete,
+              entity_filter=to_list(field.selector.area.entity),
+              device_filter=to_list(field.selector.area.device)
+            ),
+            allow_custom=True
+          )
+          transformer = transform_multiple_autocomplete
+        else:
+          transformer = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str), delimiter=';')
+      else:
+        autocomplete = partial(filtered_area_autocomplete, entity_filter=to_list(field.selector.area.entity), device_filter=to_list(field.selector.area.device))
+
+    elif field.selector.attribute is not None: # ServiceFieldSelectorAttribute
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      # Options are served from the current entity attributes
+      autocomplete = partial(attribute_autocomplete, entity_id=field.selector.attribute.entity_id, hide_attributes=field.selector.attribute.hide_attributes)
+      transformer = partial(require_attribute, entity_id=field.selector.attribute.entity_id, hide_attributes=field.selector.attribute.hide_attributes)
+
+    elif field.selector.boolean is not None: # ServiceFieldSelectorBoolean
+      field_type = bool
+      if field.default is not None: default_value = bool(field.default)
+
+    elif field.selector.button_toggle is not None: # ServiceFieldSelectorButtonToggle
+      field_all_options = field.selector.button_toggle.options
+      if field.selector.button_toggle.sort == True:
+        field_all_options.sort(key=lambda x: x if isinstance(x, str) else x.label)
+
+      are_all_strings: bool = all(isinstance(x, str) for x in field_all_options)
+      field_options: List[ServiceFieldSelectorSelectOption] = replacePlainSelectorOptions(field_all_options)
+      field_choices = ChoiceIndex(field_options)
+
+      if field.default is not None: default_value = type(field_options[0].value)(field.default) if len(field_options) > 0 else field.default
+      if len(field_all_options) > 25 or not are_all_strings: # Too many options (or they're not plain strings), use autocomplete
+        autocomplete = partial(choice_autocomplete, all_choices=field_choices)
+        transformer = partial(require_choice, all_choices=field_choices)
+        field_type = str
+      else:
+        field_type = Literal[*field_all_options]
+
+    elif field.selector.color_rgb is not None: # ServiceFieldSelectorColorRGB
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      transformer = lambda input, _: transform_multiple(input, lambda x: isinstance(x, int) and x >= 0 and x <= 255, minlen=3, maxlen=3, delimiter=';', delimiter_transformer=lambda x: int(x))
+      additional_description = 'R;G;B'
+
+    elif field.selector.color_temp is not None: # ServiceFieldSelectorColorTemp
+      subtype = int
+      min_val = field.selector.color_temp.min if field.selector.color_temp.min is not None else field.selector.color_temp.min_mireds
+      max_val = field.selector.color_temp.max if field.selector.color_temp.max is not None else field.selector.color_temp.max_mireds
+      if min_val is not None or max_val is not None:
+        if max_val is not None:
+          if max_val > 9007199254740991:
+            max_val = 9007199254740991
+          max_val = subtype(max_val)
+        if min_val is not None:
+          if min_val < -9007199254740991:
+            min_val = -9007199254740991
+          min_val = subtype(min_val)
+        field_type = app_commands.Range[subtype, min_val, max_val]
+      else:
+        field_type = subtype
+      if field.default is not None: default_value = subtype(field.default)
+
+    elif field.selector.constant is not None: # ServiceFieldSelectorConstant
+      field_type = bool
+      if field.default is not None:
+        default_value = field.default
+      else:
+        default_value = False
+
+      if field.selector.constant.label is not None:
+        additional_description = field.selector.constant.label
+      constant = field.selector.constant.value
+
+    elif field.selector.conversation_agent is not None: # ServiceFieldSelectorConversationAgent
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      autocomplete = partial(filtered_entity_autocomplete, entity_filter=to_list(ServiceFieldSelectorEntityFilter.model_validate({ 'domain': 'conversation' })))
+
+    elif field.selector.country is not None: # ServiceFieldSelectorCountry
+      field_type = str
+      country_choices = get_country_choices(tuple(field.selector.country.countries), field.selector.country.no_sort == True)
+      autocomplete = partial(choice_autocomplete, all_choices=country_choices)
+      transformer = partial(require_choice, all_choices=country_choices)
+      if field.default is not None: default_value = str(field.default)
+
+    elif field.selector.date is not None: # ServiceFieldSelectorDate
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      additional_description = 'YYYY-MM-DD'
+
+    elif field.selector.datetime is not None: # ServiceFieldSelectorDateTime
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      additional_description = 'YYYY-MM-DD HH:MM:SS'
+
+    elif field.selector.device is not None: # ServiceFieldSelectorDevice | ServiceFieldSelectorDeviceLegacy
+      new_device_selector: ServiceFieldSelectorDevice = replaceLegacyDeviceSelector(field.selector.device)
+
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      if new_device_selector.multiple == True:
+        if self.USE_AUTOCOMPLETE_MULTIPLE:
+          autocomplete = partial(
+            multiple_autocomplete,
+            func=partial(
+              filtered_device_autocomplete,
+              entity_filter=to_list(new_device_selector.entity),
+              device_filter=to_list(new_device_selector.filter)
+            ),
+            allow_custom=True
+          )
+          transformer = transform_multiple_autocomplete
+        else:
+          transformer = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str), delimiter=';')
+      else:
+        autocomplete = partial(filtered_device_autocomplete, device_filter=to_list(new_device_selector.filter), entity_filter=to_list(new_device_selector.entity))
+
+    elif field.selector.duration is not None: # ServiceFieldSelectorDuration
+      field_type = str
+      if field.default is not None:
+        all_values: List[str] = []
+        if field.selector.duration.enable_days:
+          all_values.append(str(field.default.days))
+        all_values.append(str(field.default.hours))
+        all_values.append(str(field.default.minutes))
+        all_values.append(str(field.default.seconds))
+        if field.selector.duration.milliseconds:
+          all_values.append(str(field.default.milliseconds))
+        default_value = ':'.join(all_values)
+
+      additional_description = f'{'DD:' if field.selector.duration.enable_day == True else ''}HH:MM:SS{':mm' if field.selector.duration.enable_millisecond == True else ''}'
+      transformer = partial(transform_duration, selector=field.selector.duration)
+
+    elif field.selector.entity is not None: # ServiceFieldSelectorEntity | ServiceFieldSelectorEntityLegacy
+      new_entity_selector: ServiceFieldSelectorEntity = replaceLegacyEntitySelector(field.selector.entity)
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      if new_entity_selector.multiple == True:
+        if self.USE_AUTOCOMPLETE_MULTIPLE:
+          autocomplete = partial(
+            multiple_autocomplete,
+            func=partial(
+              filtered_entity_autocomplete,
+              entity_filter=to_list(new_entity_selector.filter),
+              exclude_values=field.selector.entity.exclude_entities,
+              include_values=field.selector.entity.include_entities
+            ),
+            allow_custom=True
+          )
+          transformer = transform_multiple_autocomplete
+        else:
+          transformer = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str), delimiter=';')
+      else:
+        autocomplete = partial(
+          filtered_entity_autocomplete,
+          entity_filter=to_list(new_entity_selector.filter),
+          exclude_values=field.selector.entity.exclude_entities,
+          include_values=field.selector.entity.include_entities
+        )
+
+    elif field.selector.floor is not None: # ServiceFieldSelectorFloor
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      if field.selector.floor.multiple == True:
+        if self.USE_AUTOCOMPLETE_MULTIPLE:
+          autocomplete = partial(
+            multiple_autocomplete,
+            func=partial(
+              filtered_floor_autocomplete,
+              entity_filter=to_list(field.selector.floor.entity),
+              device_filter=to_list(field.selector.floor.device)
+            ),
+            allow_custom=True
+          )
+          transformer = transform_multiple_autocomplete
+        else:
+          transformer = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str), delimiter=';')
+      else:
+        autocomplete = partial(filtered_floor_autocomplete, entity_filter=to_list(field.selector.floor.entity), device_filter=to_list(field.selector.floor.device))
+
+    elif field.selector.icon is not None: # ServiceFieldSelectorIcon
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      autocomplete = icon_autocomplete
+
+    elif field.selector.label is not None: # ServiceFieldSelectorLabel
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      if field.selector.label.multiple == True:
+        if self.USE_AUTOCOMPLETE_MULTIPLE:
+          autocomplete = partial(
+            multiple_autocomplete,
+            func=partial(
+              filtered_label_autocomplete,
+              entity_filter=to_list(field.selector.label.entity),
+              device_filter=to_list(field.selector.label.device)
+            ),
+            allow_custom=True
+          )
+          transformer = transform_multiple_autocomplete
+        else:
+          transformer = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str), delimiter=';')
+      else:
+        autocomplete = partial(filtered_label_autocomplete, entity_filter=to_list(field.selector.label.entity), device_filter=to_list(field.selector.label.device))
+
+    elif field.selector.language is not None: # ServiceFieldSelectorLanguage
+      field_type = str
+      language_choices = get_language_choices(
+        tuple(field.selector.language.languages) if field.selector.language.languages is not None else None,
+        field.selector.language.no_sort == True
+      )
+      autocomplete = partial(choice_autocomplete, all_choices=language_choices)
+      transformer = partial(require_choice, all_choices=language_choices)
+
+    elif field.selector.location is not None: # ServiceFieldSelectorLocation
+      field_type = str
+      if field.default is not None:
+        all_values: List[str] = []
+        all_values.append(str(field.default.latitude))
+        all_values.append(str(field.default.longitude))
+        if field.selector.location.radius:
+          all_values.append(str(field.default.radius))
+        default_value = ';'.join(all_values)
+
+      additional_description = f'LAT;LONG{';RADIUS' if field.selector.location.radius == True else ''}'
+      transformer = partial(transform_location, selector=field.selector.location, default_radius=field.default.radius if field.default is not None else None)
+      field_type = str
+
+    elif field.selector.number is not None: # ServiceFieldSelectorNumber
+      subtype = float if field.selector.number is not None and isinstance(field.selector.number, int) and field.selector.number.step != 1 else int
+      max_val = field.selector.number.max
+      min_val = field.selector.number.min
+      if min_val is not None or max_val is not None:
+        if max_val is not None:
+          if max_val > 9007199254740991:
+            max_val = 9007199254740991
+          max_val = subtype(max_val)
+        if min_val is not None:
+          if min_val < -9007199254740991:
+            min_val = -9007199254740991
+          min_val = subtype(min_val)
+        field_type = app_commands.Range[subtype, min_val, max_val]
+      else:
+        field_type = subtype
+      if field.default is not None: default_value = subtype(field.default)
+      if field.selector.number.unit_of_measurement is not None:
+        additional_description = str(field.selector.number.unit_of_measurement)
+
+    elif field.selector.object is not None: # ServiceFieldSelectorObject
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      transformer = lambda x, _: to_list(transform_object(x)) if field.selector.object.multiple == True else transform_object(x)
+
+    elif field.selector.select is not None: # ServiceFieldSelectorSelect
+      field_all_options = field.selector.select.options
+      if field.selector.select.sort == True:
+        field_all_options.sort(key=lambda x: x if isinstance(x, str) else x.label)
+
+      are_all_strings: bool = all(isinstance(x, str) for x in field_all_options)
+      field_options: List[ServiceFieldSelectorSelectOption] = replacePlainSelectorOptions(field_all_options)
+      field_choices = ChoiceIndex(field_options)
+
+      if field.selector.select.multiple == True:
+        if field.default is not None: default_value = str(field.default)
+        field_type = str
+        if self.USE_AUTOCOMPLETE_MULTIPLE:
+          autocomplete = partial(
+            multiple_autocomplete,
+            func=partial(choice_autocomplete, all_choices=field_choices),
+            allow_custom=field.selector.select.custom_value == True
+          )
+          transformer = partial(
+            lambda c_field_options, c_field_choices, c_allow_custom, x_in, interaction: transform_multiple_autocomplete(
+              x_in,
+              interaction,
+              default_transform_custom_checker=lambda x: (len(c_field_options) == 0 or isinstance(x, type(c_field_options[0].value))) and require_choice(x, interaction, all_choices=c_field_choices, allow_custom=c_allow_custom),
+              default_transform_transformer=lambda x: type(c_field_options[0].value)(x) if len(c_field_options) > 0 else x
+            ),
+            field_options, field_choices, field.selector.select.custom_value == True
+          )
+        else:
+          transformer = partial(lambda c_field_options, c_field_choices, c_allow_custom, input: transform_multiple(
+            input,
+            lambda x, _: (len(c_field_options) == 0 or isinstance(x, type(c_field_options[0].value))) and require_choice(x, all_choices=c_field_choices, allow_custom=c_allow_custom),
+            delimiter=';'
+          ), field_options, field_choices, field.selector.select.custom_value == True)
+      else:
+        if field.default is not None: default_value = type(field_options[0].value)(field.default) if len(field_options) > 0 else field.default
+        if len(field_all_options) > 25 or not are_all_strings or field.selector.select.custom_value == True:
+          autocomplete = partial(choice_autocomplete, all_choices=field_choices)
+          field_type = str
+        else:
+          field_type = Literal[*field_all_options]
+        transformer = partial(require_choice, all_choices=field_choices, allow_custom=field.selector.select.custom_value == True) # Confirm if the choice is valid
+
+    elif field.selector.target is not None: # ServiceFieldSelectorTarget
+      field_type = str
+      autocomplete = partial(
+        multiple_autocomplete,
+        func=partial(
+          label_floor_area_device_entity_autocomplete,
+          entity_filter=to_list(service.target.entity) if service.target is not None else None,
+          device_filter=to_list(service.target.device) if service.target is not None else None
+        )
+      )
+      transformer = lambda result, interaction: self.parse_targets(transform_multiple_autocomplete(result, interaction))
+
+    elif field.selector.template is not None: # ServiceFieldSelectorTemplate
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+
+    elif field.selector.text is not None: # ServiceFieldSelectorText
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      if field.selector.text.multiple == True:
+        if self.USE_AUTOCOMPLETE_MULTIPLE:
+          autocomplete = partial(
+            multiple_autocomplete,
+            func=None,
+            allow_custom=True
+          )
+          transformer = partial(transform_multiple_autocomplete, default_transform=None)
+        else:
+          transformer = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str)) # Needs to be customly split...
+
+    elif field.selector.time is not None: # ServiceFieldSelectorTime
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+      additional_description = 'HH:MM' if field.selector.time.no_second == True else 'HH:MM:SS'
+
+    elif self.ALLOW_UNSUPPORTED and field.selector.addon is not None: # ServiceFieldSelectorAddon
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+
+    elif self.ALLOW_UNSUPPORTED and field.selector.assist_pipeline is not None: # ServiceFieldSelectorAssistPipeline
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+
+    elif self.ALLOW_UNSUPPORTED and field.selector.backup_location is not None: # ServiceFieldSelectorBackupLocation
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+
+    elif self.ALLOW_UNSUPPORTED and field.selector.config_entry is not None: # ServiceFieldSelectorConfigEntry
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+
+    elif self.ALLOW_UNSUPPORTED and field.selector.state is not None: # ServiceFieldSelectorState
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+
+    elif self.ALLOW_UNSUPPORTED and field.selector.statistic is not None: # ServiceFieldSelectorStatistic
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+
+      entity_filter: List[ServiceFieldSelectorEntityFilter] | None = None
+      if field.selector.statistic.device_class is not None:
+        entity_filter = [ServiceFieldSelectorEntityFilter.model_validate({ 'device_class': field.selector.statistic.device_class })]
+
+      # Allow selecting actual entity here
+      if field.selector.statistic.multiple == True:
+        if self.USE_AUTOCOMPLETE_MULTIPLE:
+          autocomplete = partial(
+            multiple_autocomplete,
+            func=partial(
+              filtered_entity_autocomplete,
+              entity_filter=entity_filter
+            ),
+            allow_custom=True
+          )
+          transformer = transform_multiple_autocomplete
+        else:
+          transformer = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str), delimiter=';')
+      else:
+        autocomplete = partial(
+          filtered_entity_autocomplete,
+          entity_filter=entity_filter
+        )
+
+    elif self.ALLOW_UNSUPPORTED and field.selector.theme is not None: # ServiceFieldSelectorTheme
+      field_type = str
+      if field.default is not None: default_value = str(field.default)
+
+    else:
+      return None # Unknown selector
+
+    return ServiceFieldSpec(field_type, default_value, additional_description, autocomplete, transformer, constant, is_hidden)
+
   async def create_service_command(self, group: app_commands.Group, domain: DomainModel, service_id: str, service: ServiceModel) -> None:
     # Create handler function
     constants: Dict[str, Any] = {}
@@ -174,6 +834,9 @@ class Services(commands.Cog):
           name: transformers[name](value, interaction) if name in transformers else value
           for name, value in kwargs.items() if value is not None
         }
+        for name, value in final_kwargs.items(): # Asynchronous transformers
+          if inspect.isawaitable(value):
+            final_kwargs[name] = await value
       except Exception as e:
         self.bot.logger.error('Failed to apply transformers - %s %s', type(e), e)
         await interaction.followup.send(f'{Emoji.ERROR} {str(e)}', ephemeral=True)
@@ -207,6 +870,9 @@ class Services(commands.Cog):
         await interaction.followup.send(f'{Emoji.ERROR} Failed to send action to HomeAssistant', ephemeral=True)
         return
 
+      if final_targets is not None: # Targets with and without the type prefix (used by the target and the single type autocompletes)
+        self.bot.recent_choices.add(*(value for target in final_targets for value in (target.split('$', 1)[-1], target)))
+
       # Create embed
       embed = discord.Embed(
         title=f"{domain.domain} > {service.name} execution",
@@ -311,441 +977,22 @@ class Services(commands.Cog):
               if field.selector is None: # Ignore fields that wouldn't be visible in DevTools UI Action runner
                 continue
 
-              is_hidden: bool = False
-              field_type = None
-              default_value = None
-              additional_description: str | None = None
-              if field.selector.area is not None: # ServiceFieldSelectorArea
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                if field.selector.area.multiple == True:
-                  if self.USE_AUTOCOMPLETE_MULTIPLE:
-                    autocomplete_replacements[field_id] = partial(
-                      multiple_autocomplete,
-                      func=partial(
-                        filtered_area_autocomplete,
-                        entity_filter=to_list(field.selector.area.entity),
-                        device_filter=to_list(field.selector.area.device)
-                      ),
-                      allow_custom=True
-                    )
-                    transformers[field_id] = transform_multiple_autocomplete
-                  else:
-                    transformers[field_id] = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str), delimiter=';')
-                else:
-                  autocomplete_replacements[field_id] = partial(filtered_area_autocomplete, entity_filter=to_list(field.selector.area.entity), device_filter=to_list(field.selector.area.device))
-
-              elif field.selector.attribute is not None: # ServiceFieldSelectorAttribute
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                homeassistant_entities = await self.bot.homeassistant_client.cache_async_custom_get_entities()
-                attributes: Set[str] = set()
-                if field.selector.attribute.entity_id is not None:
-                  for entity in homeassistant_entities:
-                    if is_matching(field.selector.attribute.entity_id, entity.entity_id):
-                      for attribute, _ in entity.attributes.items():
-                        if field.selector.attribute.hide_attributes is None or attribute not in field.selector.attribute.hide_attributes:
-                          attributes.add(attribute)
-
-                attribute_options = replacePlainSelectorOptions(list(attributes))
-                autocomplete_replacements[field_id] = partial(choice_autocomplete, all_choices=attribute_options)
-                transformers[field_id] = partial(require_choice, all_choices=attribute_options)
-
-              elif field.selector.boolean is not None: # ServiceFieldSelectorBoolean
-                field_type = bool
-                if field.default is not None: default_value = bool(field.default)
-                
-              elif field.selector.button_toggle is not None: # ServiceFieldSelectorButtonToggle
-                field_all_options = field.selector.button_toggle.options
-                if field.selector.button_toggle.sort == True:
-                  field_all_options.sort(key=lambda x: x if isinstance(x, str) else x.label)
-
-                are_all_strings: bool = all(isinstance(x, str) for x in field_all_options)
-                field_options: List[ServiceFieldSelectorSelectOption] = replacePlainSelectorOptions(field_all_options)
-                
-                if field.default is not None: default_value = type(field_options[0].value)(field.default) if len(field_options) > 0 else field.default
-                if len(field_all_options) > 25 or not are_all_strings: # Too many options (or they're not plain strings), use autocomplete
-                  autocomplete_replacements[field_id] = partial(choice_autocomplete, all_choices=field_options)
-                  transformers[field_id] = partial(require_choice, all_choices=field_options)
-                  field_type = str
-                else:
-                  field_type = Literal[*field_all_options]
-                  
-              elif field.selector.color_rgb is not None: # ServiceFieldSelectorColorRGB
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                transformers[field_id] = lambda input, _: transform_multiple(input, lambda x: isinstance(x, int) and x >= 0 and x <= 255, minlen=3, maxlen=3, delimiter=';', delimiter_transformer=lambda x: int(x))
-                additional_description = 'R;G;B'
-
-              elif field.selector.color_temp is not None: # ServiceFieldSelectorColorTemp
-                subtype = int
-                min_val = field.selector.color_temp.min if field.selector.color_temp.min is not None else field.selector.color_temp.min_mireds
-                max_val = field.selector.color_temp.max if field.selector.color_temp.max is not None else field.selector.color_temp.max_mireds
-                if min_val is not None or max_val is not None:
-                  if max_val is not None:
-                    if max_val > 9007199254740991:
-                      max_val = 9007199254740991
-                    max_val = subtype(max_val)
-                  if min_val is not None:
-                    if min_val < -9007199254740991:
-                      min_val = -9007199254740991
-                    min_val = subtype(min_val)
-                  field_type = app_commands.Range[subtype, min_val, max_val]
-                else:
-                  field_type = subtype
-                if field.default is not None: default_value = subtype(field.default)
-
-              elif field.selector.constant is not None: # ServiceFieldSelectorConstant
-                field_type = bool
-                if field.default is not None:
-                  default_value = field.default
-                else:
-                  default_value = False
-
-                if field.selector.constant.label is not None:
-                  additional_description = field.selector.constant.label
-                constants[field_id] = field.selector.constant.value
-              
-              elif field.selector.conversation_agent is not None: # ServiceFieldSelectorConversationAgent
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                autocomplete_replacements[field_id] = partial(filtered_entity_autocomplete, entity=to_list(ServiceFieldSelectorEntityFilter.model_validate({ 'domain': 'conversation' })))
-              
-              elif field.selector.country is not None: # ServiceFieldSelectorCountry
-                field_type = str
-                countries: List[pycountry.ExistingCountries] = [
-                  country
-                  for code in field.selector.country.countries
-                  if (country := pycountry.countries.get(alpha_2=code) or pycountry.countries.get(alpha_3=code)) is not None
-                ]
-                if not (field.selector.country.no_sort == True):
-                  countries.sort(key=lambda x: x.name)
-
-                country_options: List[ServiceFieldSelectorSelectOption] = [
-                  ServiceFieldSelectorSelectOption.model_validate({
-                    'label': x.name,
-                    'value': x.alpha_2 # Home Assistant uses alpha2 ISO 3166
-                  })
-                  for x in countries
-                ]
-                autocomplete_replacements[field_id] = partial(choice_autocomplete, all_choices=country_options)
-                transformers[field_id] = partial(require_choice, all_choices=country_options)
-                if field.default is not None: default_value = str(field.default)
-
-              elif field.selector.date is not None: # ServiceFieldSelectorDate
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                additional_description = 'YYYY-MM-DD'
-              
-              elif field.selector.datetime is not None: # ServiceFieldSelectorDateTime
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                additional_description = 'YYYY-MM-DD HH:MM:SS'
-
-              elif field.selector.device is not None: # ServiceFieldSelectorDevice | ServiceFieldSelectorDeviceLegacy
-                new_device_selector: ServiceFieldSelectorDevice = replaceLegacyDeviceSelector(field.selector.device)
-
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                if new_device_selector.multiple == True:
-                  if self.USE_AUTOCOMPLETE_MULTIPLE:
-                    autocomplete_replacements[field_id] = partial(
-                      multiple_autocomplete,
-                      func=partial(
-                        filtered_device_autocomplete,
-                        entity_filter=to_list(new_device_selector.entity),
-                        device_filter=to_list(new_device_selector.filter)
-                      ),
-                      allow_custom=True
-                    )
-                    transformers[field_id] = transform_multiple_autocomplete
-                  else:
-                    transformers[field_id] = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str), delimiter=';')
-                else:
-                  autocomplete_replacements[field_id] = partial(filtered_device_autocomplete, device_filter=to_list(new_device_selector.filter), entity_filter=to_list(new_device_selector.entity))
-
-              elif field.selector.duration is not None: # ServiceFieldSelectorDuration
-                field_type = str
-                if field.default is not None:
-                  all_values: List[str] = []
-                  if field.selector.duration.enable_days:
-                    all_values.append(str(field.default.days))
-                  all_values.append(str(field.default.hours))
-                  all_values.append(str(field.default.minutes))
-                  all_values.append(str(field.default.seconds))
-                  if field.selector.duration.milliseconds:
-                    all_values.append(str(field.default.milliseconds))
-                  default_value = ':'.join(all_values)
-
-                additional_description = f'{'DD:' if field.selector.duration.enable_day == True else ''}HH:MM:SS{':mm' if field.selector.duration.enable_millisecond == True else ''}'
-                transformers[field_id] = partial(transform_duration, selector=field.selector.duration)
-
-              elif field.selector.entity is not None: # ServiceFieldSelectorEntity | ServiceFieldSelectorEntityLegacy
-                new_entity_selector: ServiceFieldSelectorEntity = replaceLegacyEntitySelector(field.selector.entity)
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                if new_entity_selector.multiple == True:
-                  if self.USE_AUTOCOMPLETE_MULTIPLE:
-                    autocomplete_replacements[field_id] = partial(
-                      multiple_autocomplete,
-                      func=partial(
-                        filtered_entity_autocomplete,
-                        entity_filter=to_list(new_entity_selector.filter),
-                        exclude_values=field.selector.entity.exclude_entities,
-                        include_values=field.selector.entity.include_entities
-                      ),
-                      allow_custom=True
-                    )
-                    transformers[field_id] = transform_multiple_autocomplete
-                  else:
-                    transformers[field_id] = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str), delimiter=';')
-                else:
-                  autocomplete_replacements[field_id] = partial(
-                    filtered_entity_autocomplete,
-                    entity_filter=to_list(new_entity_selector.filter),
-                    exclude_values=field.selector.entity.exclude_entities,
-                    include_values=field.selector.entity.include_entities
-                  )
-                
-              elif field.selector.floor is not None: # ServiceFieldSelectorFloor
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                if field.selector.floor.multiple == True:
-                  if self.USE_AUTOCOMPLETE_MULTIPLE:
-                    autocomplete_replacements[field_id] = partial(
-                      multiple_autocomplete,
-                      func=partial(
-                        filtered_floor_autocomplete,
-                        entity_filter=to_list(field.selector.floor.entity),
-                        device_filter=to_list(field.selector.floor.device)
-                      ),
-                      allow_custom=True
-                    )
-                    transformers[field_id] = transform_multiple_autocomplete
-                  else:
-                    transformers[field_id] = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str), delimiter=';')
-                else:
-                  autocomplete_replacements[field_id] = partial(filtered_floor_autocomplete, entity_filter=to_list(field.selector.floor.entity), device_filter=to_list(field.selector.floor.device))
-                
-              elif field.selector.icon is not None: # ServiceFieldSelectorIcon
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                autocomplete_replacements[field_id] = icon_autocomplete
-
-              elif field.selector.label is not None: # ServiceFieldSelectorLabel
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                if field.selector.label.multiple == True:
-                  if self.USE_AUTOCOMPLETE_MULTIPLE:
-                    autocomplete_replacements[field_id] = partial(
-                      multiple_autocomplete,
-                      func=partial(
-                        filtered_label_autocomplete,
-                        entity_filter=to_list(field.selector.label.entity),
-                        device_filter=to_list(field.selector.label.device)
-                      ),
-                      allow_custom=True
-                    )
-                    transformers[field_id] = transform_multiple_autocomplete
-                  else:
-                    transformers[field_id] = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str), delimiter=';')
-                else:
-                  autocomplete_replacements[field_id] = partial(filtered_label_autocomplete, entity_filter=to_list(field.selector.label.entity), device_filter=to_list(field.selector.label.device))
-
-              elif field.selector.language is not None: # ServiceFieldSelectorLanguage
-                field_type = str
-                languages: List[langcodes.Language] = ALL_LANGUAGES
-                if field.selector.language.languages is not None:
-                  languages = [
-                    language
-                    for code in field.selector.language.languages
-                    if (language := langcodes.find(code) or langcodes.get(code)) is not None
-                  ]
-
-                if not (field.selector.language.no_sort == True):
-                  languages.sort(key=lambda x: x.display_name())
-
-                language_options: List[ServiceFieldSelectorSelectOption] = [
-                  ServiceFieldSelectorSelectOption.model_validate({
-                    'label': x.display_name(),
-                    'value': x.to_tag()
-                  })
-                  for x in languages
-                ]
-                autocomplete_replacements[field_id] = partial(choice_autocomplete, all_choices=language_options)
-                transformers[field_id] = partial(require_choice, all_choices=language_options)
-
-              elif field.selector.location is not None: # ServiceFieldSelectorLocation
-                field_type = str
-                if field.default is not None:
-                  all_values: List[str] = []
-                  all_values.append(str(field.default.latitude))
-                  all_values.append(str(field.default.longitude))
-                  if field.selector.location.radius:
-                    all_values.append(str(field.default.radius))
-                  default_value = ';'.join(all_values)
-
-                additional_description = f'LAT;LONG{';RADIUS' if field.selector.location.radius == True else ''}'
-                transformers[field_id] = partial(transform_location, selector=field.selector.location, default_radius=field.default.radius if field.default is not None else None)
-                field_type = str
-                
-              elif field.selector.number is not None: # ServiceFieldSelectorNumber
-                subtype = float if field.selector.number is not None and isinstance(field.selector.number, int) and field.selector.number.step != 1 else int
-                max_val = field.selector.number.max
-                min_val = field.selector.number.min
-                if min_val is not None or max_val is not None:
-                  if max_val is not None:
-                    if max_val > 9007199254740991:
-                      max_val = 9007199254740991
-                    max_val = subtype(max_val)
-                  if min_val is not None:
-                    if min_val < -9007199254740991:
-                      min_val = -9007199254740991
-                    min_val = subtype(min_val)
-                  field_type = app_commands.Range[subtype, min_val, max_val]
-                else:
-                  field_type = subtype
-                if field.default is not None: default_value = subtype(field.default)
-                if field.selector.number.unit_of_measurement is not None:
-                  additional_description = str(field.selector.number.unit_of_measurement)
-
-              elif field.selector.object is not None: # ServiceFieldSelectorObject
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                transformers[field_id] = lambda x, _: to_list(transform_object(x)) if field.selector.object.multiple == True else transform_object(x)
-
-              elif field.selector.select is not None: # ServiceFieldSelectorSelect
-                field_all_options = field.selector.select.options
-                if field.selector.select.sort == True:
-                  field_all_options.sort(key=lambda x: x if isinstance(x, str) else x.label)
-
-                are_all_strings: bool = all(isinstance(x, str) for x in field_all_options)
-                field_options: List[ServiceFieldSelectorSelectOption] = replacePlainSelectorOptions(field_all_options)
-
-                if field.selector.select.multiple == True:
-                  if field.default is not None: default_value = str(field.default)
-                  field_type = str
-                  if self.USE_AUTOCOMPLETE_MULTIPLE:
-                    autocomplete_replacements[field_id] = partial(
-                      multiple_autocomplete,
-                      func=partial(choice_autocomplete, all_choices=field_options),
-                      allow_custom=field.selector.select.custom_value == True
-                    )
-                    transformers[field_id] = partial(
-                      lambda c_field_options, c_allow_custom, x_in, interaction: transform_multiple_autocomplete(
-                        x_in,
-                        interaction,
-                        default_transform_custom_checker=lambda x: (len(c_field_options) == 0 or isinstance(x, type(c_field_options[0].value))) and require_choice(x, interaction, all_choices=c_field_options, allow_custom=c_allow_custom),
-                        default_transform_transformer=lambda x: type(c_field_options[0].value)(x) if len(c_field_options) > 0 else x
-                      ),
-                      field_options, field.selector.select.custom_value == True
-                    )
-                  else:
-                    transformers[field_id] = partial(lambda c_field_options, c_allow_custom, input: transform_multiple(
-                      input,
-                      lambda x, _: (len(c_field_options) == 0 or isinstance(x, type(c_field_options[0].value))) and require_choice(x, all_choices=c_field_options, allow_custom=c_allow_custom),
-                      delimiter=';'
-                    ), field_options, field.selector.select.custom_value == True)
-                else:
-                  if field.default is not None: default_value = type(field_options[0].value)(field.default) if len(field_options) > 0 else field.default
-                  if len(field_all_options) > 25 or not are_all_strings or field.selector.select.custom_value == True:
-                    autocomplete_replacements[field_id] = partial(choice_autocomplete, all_choices=field_options)
-                    field_type = str
-                  else:
-                    field_type = Literal[*field_all_options]
-                  transformers[field_id] = partial(require_choice, all_choices=field_options, allow_custom=field.selector.select.custom_value == True) # Confirm if the choice is valid
-                
-              elif field.selector.target is not None: # ServiceFieldSelectorTarget
-                field_type = str
-                autocomplete_replacements[field_id] = partial(
-                  multiple_autocomplete,
-                  func=partial(
-                    label_floor_area_device_entity_autocomplete,
-                    entity_filter=to_list(service.target.entity),
-                    device_filter=to_list(service.target.device)
-                  )
-                )
-                transformers[field_id] = lambda result, interaction: self.parse_targets(transform_multiple_autocomplete(result, interaction))
-
-              elif field.selector.template is not None: # ServiceFieldSelectorTemplate
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-
-              elif field.selector.text is not None: # ServiceFieldSelectorText
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                if field.selector.text.multiple == True:
-                  if self.USE_AUTOCOMPLETE_MULTIPLE:
-                    autocomplete_replacements[field_id] = partial(
-                      multiple_autocomplete,
-                      func=None,
-                      allow_custom=True
-                    )
-                    transformers[field_id] = partial(transform_multiple_autocomplete, default_transform=None)
-                  else:
-                    transformers[field_id] = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str)) # Needs to be customly split...
-                  
-              elif field.selector.time is not None: # ServiceFieldSelectorTime
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-                additional_description = 'HH:MM' if field.selector.time.no_second == True else 'HH:MM:SS'
-
-              elif self.ALLOW_UNSUPPORTED and field.selector.addon is not None: # ServiceFieldSelectorAddon
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-
-              elif self.ALLOW_UNSUPPORTED and field.selector.assist_pipeline is not None: # ServiceFieldSelectorAssistPipeline
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-
-              elif self.ALLOW_UNSUPPORTED and field.selector.backup_location is not None: # ServiceFieldSelectorBackupLocation
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-
-              elif self.ALLOW_UNSUPPORTED and field.selector.config_entry is not None: # ServiceFieldSelectorConfigEntry
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-
-              elif self.ALLOW_UNSUPPORTED and field.selector.state is not None: # ServiceFieldSelectorState
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-
-              elif self.ALLOW_UNSUPPORTED and field.selector.statistic is not None: # ServiceFieldSelectorStatistic
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-
-                entity_filter: List[ServiceFieldSelectorEntityFilter] | None = None
-                if field.selector.statistic.device_class is not None:
-                  entity_filter = [ServiceFieldSelectorEntityFilter.model_validate({ 'device_class': field.selector.statistic.device_class })]
-
-                # Allow selecting actual entity here
-                if field.selector.statistic.multiple == True:
-                  if self.USE_AUTOCOMPLETE_MULTIPLE:
-                    autocomplete_replacements[field_id] = partial(
-                      multiple_autocomplete,
-                      func=partial(
-                        filtered_entity_autocomplete,
-                        entity_filter=entity_filter
-                      ),
-                      allow_custom=True
-                    )
-                    transformers[field_id] = transform_multiple_autocomplete
-                  else:
-                    transformers[field_id] = lambda input, _: transform_multiple(input, lambda x: isinstance(x, str), delimiter=';')
-                else:
-                  autocomplete_replacements[field_id] = partial(
-                    filtered_entity_autocomplete,
-                    entity_filter=entity_filter
-                  )
-
-              elif self.ALLOW_UNSUPPORTED and field.selector.theme is not None: # ServiceFieldSelectorTheme
-                field_type = str
-                if field.default is not None: default_value = str(field.default)
-              
-              else:
+              spec = await self.get_field_spec(field, service)
+              if spec is None:
                 self.bot.logger.error("Unknown selector - %s %s %s %s", domain.domain, service_id, field_id, str(field.selector))
                 raise Exception('Unknown selector')
 
+              if spec.autocomplete is not None:
+                autocomplete_replacements[field_id] = spec.autocomplete
+              if spec.transformer is not None:
+                transformers[field_id] = spec.transformer
+              if spec.constant is not NO_CONSTANT:
+                constants[field_id] = spec.constant
+              field_type = spec.field_type
+              default_value = spec.default_value
+              additional_description = spec.additional_description
+              is_hidden = spec.is_hidden
+
               if not is_hidden:
                 # Add the parameter to function signature
                 is_field_required = field.required == True
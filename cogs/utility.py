@@ -67,7 +67,45 @@ class Utility(commands.Cog):
     except Exception as e:
       self.bot.logger.error("General error - %s %s", type(e), e)
       await interaction.followup.send(f"{Emoji.ERROR} Failed for unknown reason.", ephemeral=True)
-    
+
+  @app_commands.command(
+      name="sync",
+      description="Syncs the application commands with Discord.",
+  )
+  @app_commands.describe(force="Sync even if the commands did not change since the last sync")
+  @app_commands.allowed_installs(guilds=True, users=True)
+  @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+  async def sync(self, interaction: discord.Interaction, force: bool = False) -> None:
+    if not await self.bot.is_owner(interaction.user):
+      await interaction.response.send_message(f"{Emoji.ERROR} Command needs to be executed by the bot's owner.", ephemeral=True)
+      return
+
+    try:
+      await interaction.response.defer(thinking=True, ephemeral=True)
+      results = await self.bot.sync_commands(force=force)
+      await interaction.followup.send(
+        f"{Emoji.SUCCESS} " + ', '.join(
+          f"{scope}: {'unchanged' if count is None else f'synced {count} commands'}"
+          for scope, count in results.items()
+        ),
+        ephemeral=True
+      )
+    except Exception as e:
+      self.bot.logger.error("Sync error - %s %s", type(e), e)
+      await interaction.followup.send(f"{Emoji.ERROR} Failed to sync the commands.", ephemeral=True)
+
+  @app_commands.command(
+      name="metrics",
+      description="Displays the bot's runtime metrics.",
+  )
+  @app_commands.allowed_installs(guilds=True, users=True)
+  @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+  async def metrics(self, interaction: discord.Interaction) -> None:
+    if not await self.bot.is_owner(interaction.user):
+      await interaction.response.send_message(f"{Emoji.ERROR} Command needs to be executed by the bot's owner.", ephemeral=True)
+      return
+
+    await interaction.response.send_message(f"```\n{self.bot.metrics.format()[:1950]}\n```", ephemeral=True)
 
 async def setup(bot: HASSDiscordBot) -> None:
   await bot.add_cog(Utility(bot))
\ No newline at end of file
@@ -4,4 +4,8 @@ class HomeAssistantCacheId:
   DEVICES = "DEVICES"
   AREAS = "AREAS"
   LABELS = "LABELS"
-  FLOORS = "FLOORS"
\ No newline at end of file
+  FLOORS = "FLOORS"
+  ENTITY_ATTRIBUTES = "ENTITY_ATTRIBUTES"
+  ENTITIES_DISPLAY = "ENTITIES_DISPLAY"
+  DEVICES_DISPLAY = "DEVICES_DISPLAY"
+  MDI_ICONS = "MDI_ICONS"
@@ -0,0 +1,8 @@
+from enum import IntEnum
+
+class HomeAssistantRequestPriority(IntEnum):
+  # Lower value - served first
+  SERVICE = 0 # Service calls and conversations run by users
+  AUTOCOMPLETE = 1
+  DETAILS = 2 # Single item commands
+  BACKGROUND = 3 # Warmup, status and periodic refreshes
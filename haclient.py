@@ -1,63 +1,269 @@
 from homeassistant_api import Client as HAClient
+from homeassistant_api.errors import RequestTimeoutError, RequestError, BadTemplateError
 from cachetools import TTLCache
-from pydantic import TypeAdapter
-from typing import List, Optional, TypeVar, Callable, Any, Tuple, Awaitable
-from helpers import find
+from pydantic import TypeAdapter, ValidationError
+from typing import List, Optional, TypeVar, Callable, Any, Tuple, Awaitable, Dict, Set
+from helpers import find, json_loads, json_dumps, iter_json_array
+from hawebsocket import HomeAssistantWebsocket
+from scheduler import RequestScheduler, SharedPriority, SHARED_PRIORITY, get_request_priority
 import re
-import json
+import asyncio
 import aiohttp
+import hashlib
+from contextvars import ContextVar
 
 from models.DeviceModel import DeviceModel
+from models.DeviceDisplayModel import DeviceDisplayModel
 from models.ConversationModel import ConversationModel
 from models.ServiceModel import DomainModel
 from models.FloorModel import FloorModel
 from models.AreaModel import AreaModel
 from models.EntityModel import EntityModel
+from models.EntityRecord import EntityRecord
+from models.EntityDisplayRecord import EntityDisplayRecord
 from models.LabelModel import LabelModel
 from models.MDIIconMeta import MDIIconMeta
 
 T = TypeVar('T')
+D = TypeVar('D')
 
 from enums.HomeAssistantCacheId import HomeAssistantCacheId
+from enums.HomeAssistantRequestPriority import HomeAssistantRequestPriority
+
+# Built once, creating an adapter compiles its validator
+FLOOR_LIST_ADAPTER = TypeAdapter(List[FloorModel])
+AREA_LIST_ADAPTER = TypeAdapter(List[AreaModel])
+LABEL_LIST_ADAPTER = TypeAdapter(List[LabelModel])
+DEVICE_LIST_ADAPTER = TypeAdapter(List[DeviceModel])
+DEVICE_DISPLAY_LIST_ADAPTER = TypeAdapter(List[DeviceDisplayModel])
+ENTITY_LIST_ADAPTER = TypeAdapter(List[EntityModel])
+DOMAIN_LIST_ADAPTER = TypeAdapter(List[DomainModel])
+MDI_ICON_LIST_ADAPTER = TypeAdapter(List[MDIIconMeta])
+
+CACHE_REFRESH_ID: ContextVar[Optional[str]] = ContextVar('CACHE_REFRESH_ID', default=None) # Cache id of the refresh running in the current task
+
+# Caches affected by the registry update events (membership lists include the other registries)
+REGISTRY_EVENT_CACHE_IDS: Dict[str, List[str]] = {
+  'floor_registry_updated': [HomeAssistantCacheId.FLOORS],
+  'area_registry_updated': [HomeAssistantCacheId.AREAS, HomeAssistantCacheId.FLOORS, HomeAssistantCacheId.LABELS, HomeAssistantCacheId.DEVICES],
+  'label_registry_updated': [HomeAssistantCacheId.LABELS],
+  'device_registry_updated': [
+    HomeAssistantCacheId.DEVICES, HomeAssistantCacheId.DEVICES_DISPLAY,
+    HomeAssistantCacheId.AREAS, HomeAssistantCacheId.FLOORS, HomeAssistantCacheId.LABELS
+  ],
+  'entity_registry_updated': [
+    HomeAssistantCacheId.ENTITIES, HomeAssistantCacheId.ENTITIES_DISPLAY, HomeAssistantCacheId.DEVICES, HomeAssistantCacheId.DEVICES_DISPLAY,
+    HomeAssistantCacheId.AREAS, HomeAssistantCacheId.FLOORS, HomeAssistantCacheId.LABELS
+  ]
+}
+# Caches built from the registries only (the entities also depend on the states), kept longer - the events invalidate them
+REGISTRY_CACHE_IDS: Set[str] = {
+  HomeAssistantCacheId.FLOORS, HomeAssistantCacheId.AREAS, HomeAssistantCacheId.LABELS, HomeAssistantCacheId.DEVICES, HomeAssistantCacheId.DEVICES_DISPLAY
+}
 
 class CustomHAClient(HAClient):
-  def __init__(self, *args, **kwargs):
-    self.cache = TTLCache(maxsize=100, ttl=15*60)
+  def __init__(self, *args, cache_ttl: float = 15*60, registry_cache_ttl: Optional[float] = None, scheduler: Optional[RequestScheduler] = None, **kwargs):
+    self.cache = TTLCache(maxsize=100, ttl=cache_ttl)
+    self.registry_cache = TTLCache(maxsize=100, ttl=registry_cache_ttl if registry_cache_ttl is not None else cache_ttl) # `REGISTRY_CACHE_IDS`, with a websocket attached also invalidated by events
+    self.cache_fetches: Dict[str, Tuple[asyncio.Task, SharedPriority]] = {} # In-flight fetches shared by concurrent callers, run at the priority of the most important one
+    self.cache_invalidations: Dict[str, int] = {} # Incremented on every invalidation, fetches started before are not stored
+    self.cache_snapshots: Dict[str, Tuple[bytes, Any]] = {} # Cache id -> (response digest, parsed data) of the last refresh
+    self.cache_sources: Dict[str, Any] = {} # Cache id -> data of the current generation
+    self.cache_generations: Dict[str, int] = {} # Incremented on every cache update
+    self.derived_cache: Dict[str, Tuple[int, Any]] = {} # Derived data id -> (source generation, data)
+    self.fetch_failures = 0 # Incremented on every failed request or cache fetch, data derived while it changed is incomplete
+    self.PARSE_IN_THREAD_SIZE = 256 * 1024 # Bytes - larger responses are decoded and validated outside of the event loop
+    self.PARSE_CHUNK_SIZE = 250 # Items validated by a single call
+    self.websocket: Optional[HomeAssistantWebsocket] = None # Registries are fetched over the websocket while it's connected
+    self.scheduler = scheduler or RequestScheduler() # All requests to Home Assistant go through it
+    kwargs.setdefault('async_cache_session', False) # Responses are cached above, a HTTP cache would serve stale data to refreshes
     super().__init__(use_async=True, *args, **kwargs)
   
   @staticmethod
-  def get_entity_friendlyname(entity: EntityModel) -> str | None:
+  def get_entity_friendlyname(entity: EntityModel | EntityRecord | EntityDisplayRecord) -> str | None:
+    if not isinstance(entity, EntityModel):
+      return entity.friendly_name
     return entity.attributes["friendly_name"] if "friendly_name" in entity.attributes else None
 
   @staticmethod
   def escape_id(id: str) -> str:
     return re.sub('[^a-zA-Z0-9_:.]', '', id)
 
+  def get_cache(self, id: str) -> TTLCache:
+    return self.registry_cache if id in REGISTRY_CACHE_IDS else self.cache
+
   def cache_data(self, func: Callable[[], T], id: str, bypass: bool = False) -> T | None:
-    data: T | None = self.cache.get(id)
+    data: T | None = self.get_cache(id).get(id)
     if bypass or data is None: # Need to fetch
       fetched_data: T = func()
       if fetched_data is not None:
-        self.cache[id] = fetched_data
+        self.get_cache(id)[id] = fetched_data
         data = fetched_data
     if data is not None:
       return data.copy()
     return None
   
+  async def async_fetch_cache_data(self, func: Callable[[], Awaitable[T]], id: str) -> T | None:
+    invalidations = self.cache_invalidations.get(id, 0)
+    token = CACHE_REFRESH_ID.set(id)
+    try:
+      fetched_data: T = await func()
+    except Exception:
+      self.fetch_failures += 1
+      raise
+    finally:
+      CACHE_REFRESH_ID.reset(token)
+    if fetched_data is None:
+      self.fetch_failures += 1
+    elif self.cache_invalidations.get(id, 0) == invalidations:
+      self.get_cache(id)[id] = fetched_data
+      if fetched_data is not self.cache_sources.get(id): # Unchanged snapshot - derived data stays valid
+        self.cache_sources[id] = fetched_data
+        self.cache_generations[id] = self.get_cache_generation(id) + 1
+    return fetched_data
+
   async def async_cache_data(self, func: Callable[[], Awaitable[T]], id: str, bypass: bool = False) -> T | None:
-    data: T | None = self.cache.get(id)
+    data: T | None = self.get_cache(id).get(id)
     if bypass or data is None: # Need to fetch
-      fetched_data: T = await func()
+      fetch = self.cache_fetches.get(id)
+      if fetch is None or bypass:
+        shared = SharedPriority(self.scheduler, get_request_priority())
+        token = SHARED_PRIORITY.set(shared)
+        try:
+          task = asyncio.create_task(self.async_fetch_cache_data(func, id))
+        finally:
+          SHARED_PRIORITY.reset(token)
+        fetch = self.cache_fetches[id] = (task, shared)
+        task.add_done_callback(lambda x: self.cache_fetches.pop(id) if self.cache_fetches.get(id, (None,))[0] is x else None)
+      else: # A more important caller raises the priority of the fetch's requests
+        fetch[1].raise_priority(get_request_priority())
+      task, shared = fetch
+      parent = SHARED_PRIORITY.get()
+      if parent is not None: # Fetched for another shared fetch, raised together with it
+        parent.children.add(shared)
+      fetched_data: T | None = await asyncio.shield(task) # Cancelling one caller does not cancel the shared fetch
       if fetched_data is not None:
-        self.cache[id] = fetched_data
         data = fetched_data
     if data is not None:
       return data.copy()
     return None
 
+  def invalidate_cache(self, id: str) -> None:
+    self.get_cache(id).pop(id, None)
+    self.cache_fetches.pop(id, None) # Later callers start a new fetch
+    self.cache_invalidations[id] = self.cache_invalidations.get(id, 0) + 1
+
+  # Registry events
+  def attach_websocket(self, websocket: HomeAssistantWebsocket) -> None:
+    self.websocket = websocket
+    for event_type in REGISTRY_EVENT_CACHE_IDS.keys():
+      websocket.add_event_listener(event_type, self.on_registry_updated)
+    websocket.add_connect_listener(self.on_websocket_connected)
+
+  async def on_registry_updated(self, event: Dict[str, Any]) -> None:
+    for id in REGISTRY_EVENT_CACHE_IDS.get(event.get('event_type'), []):
+      self.invalidate_cache(id)
+
+  async def on_websocket_connected(self, reconnect: bool) -> None:
+    if reconnect: # Events sent while disconnected were missed
+      for id in set(id for ids in REGISTRY_EVENT_CACHE_IDS.values() for id in ids):
+        self.invalidate_cache(id)
+
+  # Requests
+  async def async_request_bytes(
+    self, path: str, method: str = "GET", headers: Optional[Dict[str, str]] = None, priority: Optional[HomeAssistantRequestPriority] = None, **kwargs
+  ) -> bytes:
+    """Raw response body, for responses parsed by the caller. `priority` - defaults to the priority set by `request_priority`"""
+    if self.global_request_kwargs is not None:
+      kwargs.update(self.global_request_kwargs)
+    async with self.scheduler.slot(priority):
+      try:
+        response = await self.async_cache_session.request(
+          method,
+          self.endpoint(path),
+          headers=self.prepare_headers(headers),
+          **kwargs
+        )
+      except asyncio.TimeoutError as err:
+        self.fetch_failures += 1
+        raise RequestTimeoutError(f'Home Assistant did not respond in time (timeout: {kwargs.get("timeout", 300)} sec)') from err
+      except Exception:
+        self.fetch_failures += 1
+        raise
+      if response.status not in (200, 201):
+        self.fetch_failures += 1
+        return await self.async_response_logic(response) # Raises the matching error
+      return await response.read()
+
+  async def async_get_rendered_template_bytes(self, template: str) -> bytes:
+    try:
+      return await self.async_request_bytes("template", method="POST", json=dict(template=template))
+    except RequestError as err:
+      raise BadTemplateError("Your template is invalid. Try debugging it in the developer tools page of homeassistant.") from err
+
+  async def async_parse_snapshot(self, data: bytes, parser: Callable[[bytes], Awaitable[T]]) -> T:
+    """Parses the response of a cache refresh, a response identical to the previous one returns the previous data"""
+    id = CACHE_REFRESH_ID.get()
+    if id is None: # Not a cache refresh
+      return await parser(data)
+    digest = await self.async_parse(data, lambda x: hashlib.sha256(x).digest()) # Hashing releases the GIL
+    snapshot = self.cache_snapshots.get(id)
+    if snapshot is not None and snapshot[0] == digest:
+      return snapshot[1]
+    parsed_data = await parser(data)
+    self.cache_snapshots[id] = (digest, parsed_data)
+    return parsed_data
+
+  async def async_parse(self, data: bytes, parser: Callable[[bytes], T]) -> T:
+    if len(data) >= self.PARSE_IN_THREAD_SIZE:
+      return await asyncio.to_thread(parser, data)
+    return parser(data)
+
+  async def async_parse_list(self, data: bytes, adapter: TypeAdapter[List[T]], decode: bool = False) -> List[T]:
+    """`decode` - validate the decoded data instead of the JSON (faster for models with Python validators)"""
+    # Validating thousands of models takes long enough to delay gateway heartbeats
+    if len(data) >= self.PARSE_IN_THREAD_SIZE:
+      return await asyncio.to_thread(self.parse_list_chunked, data, adapter)
+    if decode:
+      return adapter.validate_python(json_loads(data))
+    return adapter.validate_json(data)
+
+  def parse_list_chunked(self, data: bytes, adapter: TypeAdapter[List[T]]) -> List[T]:
+    return self.validate_list_chunked(json_loads(data), adapter)
+
+  async def async_validate_list(self, items: List[Any], adapter: TypeAdapter[List[T]]) -> List[T]:
+    if len(items) > self.PARSE_CHUNK_SIZE:
+      return await asyncio.to_thread(self.validate_list_chunked, items, adapter)
+    return adapter.validate_python(items)
+
+  def validate_list_chunked(self, items: List[Any], adapter: TypeAdapter[List[T]]) -> List[T]:
+    # Validation holds the GIL for the whole call - the event loop thread can only run between the (short) calls
+    parsed: List[T] = []
+    for i in range(0, len(items), self.PARSE_CHUNK_SIZE):
+      parsed.extend(adapter.validate_python(items[i:i + self.PARSE_CHUNK_SIZE]))
+    return parsed
+
+  def get_cache_generation(self, id: str) -> int:
+    return self.cache_generations.get(id, 0)
+
+  def get_cache_version(self, id: str) -> Tuple[int, int]:
+    """Changes when the cached data is replaced or invalidated"""
+    return (self.get_cache_generation(id), self.cache_invalidations.get(id, 0))
+
+  async def async_cache_derived(self, id: str, source: Callable[[], Awaitable[T]], source_id: str, builder: Callable[[T], D]) -> D:
+    """Data computed from a cached source, rebuilt only when the source was refetched"""
+    source_data = await source()
+    generation = self.get_cache_generation(source_id)
+    cached = self.derived_cache.get(id)
+    if cached is not None and cached[0] == generation:
+      return cached[1]
+    derived_data = builder(source_data)
+    self.derived_cache[id] = (generation, derived_data)
+    return derived_data
+
   # Floors
   async def async_custom_get_floors(self) -> List[FloorModel]:
-    fetched_floors_json: str = await self.async_get_rendered_template('''
+    fetched_floors_json: bytes = await self.async_get_rendered_template_bytes('''
     {%- set ns = namespace(floors = []) %}
     {%- for floor_id in floors() %}
       {%- set areas = floor_areas(floor_id) | list %}
@@ -74,13 +280,13 @@ class CustomHAClient(HAClient):
     {{ ns.floors | tojson }}
     ''')
 
-    return TypeAdapter(List[FloorModel]).validate_json(fetched_floors_json)
+    return await self.async_parse_snapshot(fetched_floors_json, lambda data: self.async_parse(data, FLOOR_LIST_ADAPTER.validate_json))
   
   async def cache_async_custom_get_floors(self, bypass: bool = False) -> List[FloorModel]:
     return await self.async_cache_data(self.async_custom_get_floors, HomeAssistantCacheId.FLOORS, bypass=bypass)
   
   async def async_custom_get_floor(self, floor_id: str) -> Optional[FloorModel]:
-    fetched_floor_json: str = await self.async_get_rendered_template(
+    fetched_floor_json: bytes = await self.async_get_rendered_template_bytes(
     f"{"{%"}- set floor_id = '{self.escape_id(floor_id)}' {"%}"}"     
     +
     '''
@@ -97,14 +303,14 @@ class CustomHAClient(HAClient):
     {%- endif %}
     ''')
 
-    if fetched_floor_json == '':
+    if fetched_floor_json.strip() == b'':
       return None
 
-    return TypeAdapter(FloorModel).validate_json(fetched_floor_json)
+    return FloorModel.model_validate_json(fetched_floor_json)
   
   # Areas
   async def async_custom_get_areas(self) -> List[AreaModel]:
-    fetched_areas_json: str = await self.async_get_rendered_template('''
+    fetched_areas_json: bytes = await self.async_get_rendered_template_bytes('''
     {%- set ns = namespace(areas = []) %}
     {%- for area_id in areas() %}
       {%- set entities = area_entities(area_id) | list %}
@@ -121,13 +327,13 @@ class CustomHAClient(HAClient):
     {{ ns.areas | tojson }}
     ''')
 
-    return TypeAdapter(List[AreaModel]).validate_json(fetched_areas_json)
+    return await self.async_parse_snapshot(fetched_areas_json, lambda data: self.async_parse(data, AREA_LIST_ADAPTER.validate_json))
   
   async def cache_async_custom_get_areas(self, bypass: bool = False) -> List[AreaModel]:
     return await self.async_cache_data(self.async_custom_get_areas, HomeAssistantCacheId.AREAS, bypass=bypass)
 
   async def async_custom_get_area(self, area_id: str) -> Optional[AreaModel]:
-    fetched_area_json: str = await self.async_get_rendered_template(
+    fetched_area_json: bytes = await self.async_get_rendered_template_bytes(
     f"{"{%"}- set area_id = '{self.escape_id(area_id)}' {"%}"}"     
     +
     '''
@@ -144,14 +350,14 @@ class CustomHAClient(HAClient):
     {%- endif %}
     ''')
 
-    if fetched_area_json == '':
+    if fetched_area_json.strip() == b'':
       return None
 
-    return TypeAdapter(AreaModel).validate_json(fetched_area_json)
+    return AreaModel.model_validate_json(fetched_area_json)
   
   # Integrations
   async def async_custom_get_integration_entities(self, integration: str) -> List[str]:
-    return json.loads(await self.async_get_rendered_template(
+    return json_loads(await self.async_get_rendered_template_bytes(
       f"{"{%"}- set integration = '{self.escape_id(integration)}' {"%}"}"     
       +
       '''
@@ -161,7 +367,7 @@ class CustomHAClient(HAClient):
 
   # Labels
   async def async_custom_get_labels(self) -> List[LabelModel]:
-    fetched_labels_json: str = await self.async_get_rendered_template('''
+    fetched_labels_json: bytes = await self.async_get_rendered_template_bytes('''
     {%- set ns = namespace(labels = []) %}
     {%- for label_id in labels() %}
       {%- set areas = label_areas(label_id) | list %}
@@ -181,13 +387,13 @@ class CustomHAClient(HAClient):
     {{ ns.labels | tojson }}
     ''')
 
-    return TypeAdapter(List[LabelModel]).validate_json(fetched_labels_json)
+    return await self.async_parse_snapshot(fetched_labels_json, lambda data: self.async_parse(data, LABEL_LIST_ADAPTER.validate_json))
   
   async def cache_async_custom_get_labels(self, bypass: bool = False) -> List[LabelModel]:
     return await self.async_cache_data(self.async_custom_get_labels, HomeAssistantCacheId.LABELS, bypass=bypass)
 
   async def async_custom_get_label(self, label_id: str) -> Optional[LabelModel]:
-    fetched_label_json: str = await self.async_get_rendered_template(
+    fetched_label_json: bytes = await self.async_get_rendered_template_bytes(
     f"{"{%"}- set label_id = '{self.escape_id(label_id)}' {"%}"}"     
     +
     '''
@@ -204,14 +410,44 @@ class CustomHAClient(HAClient):
     } | tojson }}
     ''')
 
-    if fetched_label_json == '':
+    if fetched_label_json.strip() == b'':
       return None
 
-    return TypeAdapter(LabelModel).validate_json(fetched_label_json)
+    return LabelModel.model_validate_json(fetched_label_json)
   
   # Devices
+  async def async_ws_get_device_registry(self) -> Optional[List[Dict[str, Any]]]:
+    """Enabled devices of the device registry with their entities, None when the websocket can't be used"""
+    if self.websocket is None or not self.websocket.connected.is_set():
+      return None
+    try:
+      devices, entities = await asyncio.gather(
+        self.websocket.async_command({ 'type': 'config/device_registry/list' }),
+        self.websocket.async_command({ 'type': 'config/entity_registry/list_for_display' })
+      )
+    except Exception as e:
+      self.websocket.logger.error("Failed to fetch the device registry - %s %s", type(e), e)
+      return None
+
+    device_entities: Dict[str, List[str]] = {}
+    for entity in entities['entities']:
+      if entity.get('di') is not None:
+        device_entities.setdefault(entity['di'], []).append(entity['ei'])
+    return [
+      device | { 'entities': device_entities.get(device['id'], []) }
+      for device in devices
+      if device.get('disabled_by') is None
+    ]
+
   async def async_custom_get_devices(self) -> List[DeviceModel]:
-    fetched_devices_json: str = await self.async_get_rendered_template('''
+    device_registry = await self.async_ws_get_device_registry()
+    if device_registry is not None:
+      try:
+        return await self.async_parse_snapshot(json_dumps(device_registry), lambda _: self.async_validate_list(device_registry, DEVICE_LIST_ADAPTER))
+      except ValidationError as e: # Falls back to the template
+        self.websocket.logger.error("Failed to parse the device registry - %s %s", type(e), e)
+
+    fetched_devices_json: bytes = await self.async_get_rendered_template_bytes('''
     {% set devices = states | map(attribute='entity_id') | map('device_id') | unique | reject('eq',None) | list %}
     {%- set ns = namespace(devices = []) %}
     {%- for device_id in devices %}
@@ -236,13 +472,44 @@ class CustomHAClient(HAClient):
     {{ ns.devices | tojson }}
     ''')
 
-    return TypeAdapter(List[DeviceModel]).validate_json(fetched_devices_json)
+    return await self.async_parse_snapshot(fetched_devices_json, lambda data: self.async_parse(data, DEVICE_LIST_ADAPTER.validate_json))
   
   async def cache_async_custom_get_devices(self, bypass: bool = False) -> List[DeviceModel]:
     return await self.async_cache_data(self.async_custom_get_devices, HomeAssistantCacheId.DEVICES, bypass=bypass)
 
+  async def async_custom_get_display_devices(self) -> List[DeviceDisplayModel]:
+    """Devices with the fields used by autocompletes"""
+    device_registry = await self.async_ws_get_device_registry()
+    if device_registry is not None:
+      try:
+        return await self.async_parse_snapshot(json_dumps(device_registry), lambda _: self.async_validate_list(device_registry, DEVICE_DISPLAY_LIST_ADAPTER))
+      except ValidationError as e: # Falls back to the template
+        self.websocket.logger.error("Failed to parse the device registry - %s %s", type(e), e)
+
+    fetched_devices_json: bytes = await self.async_get_rendered_template_bytes('''
+    {%- set devices = states | map(attribute='entity_id') | map('device_id') | unique | reject('eq',None) | list %}
+    [
+    {%- for device_id in devices %}
+      {{- {
+        "id": device_id,
+        "name": device_attr(device_id, "name"),
+        "name_by_user": device_attr(device_id, "name_by_user"),
+        "manufacturer": device_attr(device_id, "manufacturer"),
+        "model": device_attr(device_id, "model"),
+        "model_id": device_attr(device_id, "model_id"),
+        "entities": device_entities(device_id) | list
+      } | tojson }}{{ "," if not loop.last }}
+    {%- endfor -%}
+    ]
+    ''')
+
+    return await self.async_parse_snapshot(fetched_devices_json, lambda data: self.async_parse_list(data, DEVICE_DISPLAY_LIST_ADAPTER))
+
+  async def cache_async_custom_get_display_devices(self, bypass: bool = False) -> List[DeviceDisplayModel]:
+    return await self.async_cache_data(self.async_custom_get_display_devices, HomeAssistantCacheId.DEVICES_DISPLAY, bypass=bypass)
+
   async def async_custom_get_device(self, device_id: str) -> Optional[DeviceModel]:
-    fetched_device_json: str = await self.async_get_rendered_template(
+    fetched_device_json: bytes = await self.async_get_rendered_template_bytes(
     f"{"{%"}- set device_id = '{self.escape_id(device_id)}' {"%}"}"     
     +
     '''
@@ -263,59 +530,62 @@ class CustomHAClient(HAClient):
     } | tojson }}
     ''')
 
-    if fetched_device_json == '':
+    if fetched_device_json.strip() == b'':
       return None
 
-    return TypeAdapter(DeviceModel).validate_json(fetched_device_json)
+    return DeviceModel.model_validate_json(fetched_device_json)
   
   # Entities
-  async def async_custom_get_entities(self) -> List[EntityModel]:
-    return TypeAdapter(List[EntityModel]).validate_python(await self.async_request("states"))
+  @staticmethod
+  def parse_entity_records(data: bytes) -> List[EntityRecord]:
+    # Decoded one state at a time, the decoded response is never held as a whole
+    return [EntityRecord.from_state(state) for state in iter_json_array(data)]
+
+  async def async_custom_get_entities(self) -> List[EntityRecord]:
+    return await self.async_parse_snapshot(await self.async_request_bytes("states"), lambda data: self.async_parse(data, self.parse_entity_records))
 
-  async def cache_async_custom_get_entities(self, bypass: bool = False) -> List[EntityModel]:
+  async def cache_async_custom_get_entities(self, bypass: bool = False) -> List[EntityRecord]:
     return await self.async_cache_data(self.async_custom_get_entities, HomeAssistantCacheId.ENTITIES, bypass=bypass)
   
+  @staticmethod
+  def parse_entity_display_records(data: bytes) -> List[EntityDisplayRecord]:
+    return [EntityDisplayRecord.from_row(row) for row in json_loads(data)]
+
+  async def async_custom_get_display_entities(self) -> List[EntityDisplayRecord]:
+    """Entities with the fields used by autocompletes (a fraction of the `/api/states` size)"""
+    fetched_entities_json: bytes = await self.async_get_rendered_template_bytes('''
+    [
+    {%- for state in states %}
+      {{- [
+        state.entity_id,
+        state.attributes.get("friendly_name"),
+        state.attributes.get("device_class"),
+        state.attributes.get("supported_features")
+      ] | tojson }}{{ "," if not loop.last }}
+    {%- endfor -%}
+    ]
+    ''')
+
+    return await self.async_parse_snapshot(fetched_entities_json, lambda data: self.async_parse(data, self.parse_entity_display_records))
+
+  async def cache_async_custom_get_display_entities(self, bypass: bool = False) -> List[EntityDisplayRecord]:
+    return await self.async_cache_data(self.async_custom_get_display_entities, HomeAssistantCacheId.ENTITIES_DISPLAY, bypass=bypass)
+
+  async def cache_async_get_entity_attributes(self) -> Dict[str, List[str]]:
+    """Entity id -> attribute names"""
+    return await self.async_cache_derived(
+      HomeAssistantCacheId.ENTITY_ATTRIBUTES,
+      self.cache_async_custom_get_entities,
+      HomeAssistantCacheId.ENTITIES,
+      lambda entities: { entity.entity_id: list(entity.attribute_keys) for entity in entities }
+    )
+
   async def async_custom_get_entity(self, entity_id: str) -> Optional[EntityModel]:
-    return EntityModel.model_validate(await self.async_request(f"states/{self.escape_id(entity_id)}"))
+    return EntityModel.model_validate_json(await self.async_request_bytes(f"states/{self.escape_id(entity_id)}"))
   
   # Services
   async def async_custom_get_domains(self) -> List[DomainModel]:
-    # Apply fixes to all services
-    fetched_domains = await self.async_request("services")
-    for domain in fetched_domains:
-      for service in domain["services"].values():
-        # Fix targets (get rid of the list)
-        service_target = service.get("target", None)
-        if service_target is not None:
-          service_target_entity = service_target.get("entity", None)
-          if service_target_entity is not None:
-            service_target["entity"] = service_target_entity[0]
-
-          service_target_device = service_target.get("device", None)
-          if service_target_device is not None:
-            service_target["device"] = service_target_device[0]
-        
-        # Fix field selectors
-        service_fields = service.get("fields", None)
-        fields_tofix_queue = []
-        if service_fields is not None:
-          fields_tofix_queue.append(service_fields)
-        
-        # Loop for fixing the service fields (proper parsing of [type]: null)
-        while len(fields_tofix_queue) > 0:
-          fields = fields_tofix_queue.pop(0)
-          for field in fields.values():
-            field_selector = field.get('selector', None)
-            if field_selector is not None:
-              for i, v in field_selector.items():
-                if v is None:
-                  field_selector[i] = {} # Create empty object
-
-            field_fields = field.get('fields', None)
-            if field_fields is not None:
-              fields_tofix_queue.append(field_fields)
-    
-    return TypeAdapter(List[DomainModel]).validate_python(fetched_domains)
+    return await self.async_parse_snapshot(await self.async_request_bytes("services"), lambda data: self.async_parse_list(data, DOMAIN_LIST_ADAPTER, decode=True))
 
   async def cache_async_custom_get_domains(self, bypass: bool = False) -> List[DomainModel]:
     return await self.async_cache_data(self.async_custom_get_domains, HomeAssistantCacheId.DOMAINS, bypass=bypass)
@@ -326,36 +596,39 @@ class CustomHAClient(HAClient):
 
   # Conversations
   async def async_custom_conversation(self, data) -> ConversationModel:
-    return ConversationModel.model_validate(await self.async_request(
+    return ConversationModel.model_validate_json(await self.async_request_bytes(
       "conversation/process",
       method="POST",
-      json=data
+      json=data,
+      priority=HomeAssistantRequestPriority.SERVICE
     ))
   
   # Triggering services
   async def async_custom_trigger_services(self, domain: str, service: str, **service_data) -> List[EntityModel]:
-    data = await self.async_request(
+    data = await self.async_request_bytes(
       f"services/{self.escape_id(domain)}/{self.escape_id(service)}",
       method="POST",
-      json=service_data
+      json=service_data,
+      priority=HomeAssistantRequestPriority.SERVICE
     )
-    return TypeAdapter(List[EntityModel]).validate_python(data)
+    return ENTITY_LIST_ADAPTER.validate_json(data)
 
   async def async_custom_trigger_service_with_response(self, domain: str, service: str, **service_data) -> Tuple[List[EntityModel], dict[str, Any]]:
-    data = await self.async_request(
+    data = json_loads(await self.async_request_bytes(
       f"services/{self.escape_id(domain)}/{self.escape_id(service)}?return_response",
       method='POST',
-      json=service_data
-    )
+      json=service_data,
+      priority=HomeAssistantRequestPriority.SERVICE
+    ))
 
     return (
-      TypeAdapter(List[EntityModel]).validate_python(data.get('changed_states', [])),
+      ENTITY_LIST_ADAPTER.validate_python(data.get('changed_states', [])),
       data.get("service_response", {})
     )
   
   # Templating
   async def async_format_string(self, txt: str) -> str:
-    homeassistant_entities: List[EntityModel] = await self.cache_async_custom_get_entities(bypass=True)
+    homeassistant_entities: List[EntityRecord] = await self.cache_async_custom_get_entities(bypass=True)
     if homeassistant_entities is None:
       raise Exception("No entities were returned")
 
@@ -373,7 +646,7 @@ class CustomHAClient(HAClient):
   async def async_get_mdi_icons(self) -> List[MDIIconMeta]:
     async with aiohttp.ClientSession() as session:
       async with session.get('https://raw.githubusercontent.com/Templarian/MaterialDesign-SVG/master/meta.json') as resp:
-        return TypeAdapter(List[MDIIconMeta]).validate_python(resp.json())
+        return MDI_ICON_LIST_ADAPTER.validate_json(await resp.read()) # Served as text/plain
   
   async def cache_async_get_mdi_icons(self, bypass: bool = False) -> List[MDIIconMeta]:
-    return await self.async_cache_data(self.async_get_mdi_icons, 'MDI_ICONS', bypass=bypass)
\ No newline at end of file
+    return await self.async_cache_data(self.async_get_mdi_icons, HomeAssistantCacheId.MDI_ICONS, bypass=bypass)
\ No newline at end of file
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import aiohttp
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from helpers import json_loads
+
+EventCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+ConnectCallback = Callable[[bool], Awaitable[None]]
+
+class HomeAssistantWebsocketError(Exception):
+  pass
+
+class HomeAssistantWebsocket():
+  def __init__(self, api_url: str, token: str, logger: logging.Logger):
+    # http(s)://host/api/ -> ws(s)://host/api/websocket
+    self.url = f"{'ws' + api_url[len('http'):] if api_url.startswith('http') else api_url}{'' if api_url.endswith('/') else '/'}websocket"
+    self.token = token
+    self.logger = logger
+
+    self.RECONNECT_DELAY_MIN = 1
+    self.RECONNECT_DELAY_MAX = 60
+    self.COMMAND_TIMEOUT = 30
+
+    self.session: Optional[aiohttp.ClientSession] = None
+    self.ws: Optional[aiohttp.ClientWebSocketResponse] = None
+    self.connected = asyncio.Event()
+    self.task: Optional[asyncio.Task] = None
+    self.next_id = 1
+    self.pending: Dict[int, asyncio.Future] = {}
+    self.listeners: List[Tuple[Optional[str], EventCallback]] = [] # Kept across reconnects
+    self.subscriptions: Dict[int, Optional[str]] = {} # Subscription id of the current connection -> event type
+    self.connect_callbacks: List[ConnectCallback] = []
+
+  def start(self) -> None:
+    if self.task is None:
+      self.task = asyncio.create_task(self.run())
+
+  async def close(self) -> None:
+    if self.task is not None:
+      self.task.cancel()
+      self.task = None
+    if self.ws is not None:
+      await self.ws.close()
+    if self.session is not None:
+      await self.session.close()
+      self.session = None
+
+  # Connection
+  async def run(self) -> None:
+    delay = self.RECONNECT_DELAY_MIN
+    reconnect = False
+    while True:
+      receiver: Optional[asyncio.Task] = None
+      try:
+        await self.connect()
+        receiver = asyncio.create_task(self.receive())
+        for event_type in set(event_type for event_type, _ in self.listeners):
+          await self.subscribe(event_type)
+        delay = self.RECONNECT_DELAY_MIN
+        for callback in self.connect_callbacks:
+          asyncio.create_task(self.run_callback(callback(reconnect)))
+        reconnect = True
+        await receiver
+      except asyncio.CancelledError:
+        raise
+      except Exception as e:
+        self.logger.error("Home Assistant websocket error - %s %s", type(e), e)
+      finally:
+        if receiver is not None:
+          receiver.cancel()
+        self.disconnected()
+        if self.ws is not None and not self.ws.closed:
+          await self.ws.close()
+      await asyncio.sleep(delay)
+      delay = min(delay * 2, self.RECONNECT_DELAY_MAX)
+
+  async def connect(self) -> None:
+    if self.session is None:
+      self.session = aiohttp.ClientSession()
+    self.ws = await self.session.ws_connect(self.url, max_msg_size=0, heartbeat=30)
+
+    message = await self.ws.receive_json()
+    if message.get('type') != 'auth_required':
+      raise HomeAssistantWebsocketError(f"Unexpected message {message.get('type')}")
+    await self.ws.send_json({ 'type': 'auth', 'access_token': self.token })
+    message = await self.ws.receive_json()
+    if message.get('type') != 'auth_ok':
+      raise HomeAssistantWebsocketError(f"Authentication failed - {message.get('message')}")
+
+    self.connected.set()
+
+  def disconnected(self) -> None:
+    self.connected.clear()
+    self.subscriptions.clear()
+    for future in self.pending.values():
+      if not future.done():
+        future.set_exception(HomeAssistantWebsocketError("Connection lost"))
+    self.pending.clear()
+
+  async def receive(self) -> None:
+    async for message in self.ws:
+      if message.type != aiohttp.WSMsgType.TEXT:
+        break
+      payload = json_loads(message.data)
+      for item in payload if isinstance(payload, list) else [payload]:
+        self.handle_message(item)
+
+  def handle_message(self, message: Dict[str, Any]) -> None:
+    if message.get('type') == 'event':
+      event_type = self.subscriptions.get(message.get('id'), '')
+      for listener_type, callback in self.listeners:
+        if listener_type == event_type:
+          asyncio.create_task(self.run_callback(callback(message['event'])))
+      return
+
+    future = self.pending.pop(message.get('id'), None)
+    if future is None or future.done():
+      return
+    if message.get('type') == 'pong':
+      future.set_result(None)
+    elif message.get('success', False):
+      future.set_result(message.get('result'))
+    else:
+      error = message.get('error') or {}
+      future.set_exception(HomeAssistantWebsocketError(f"{error.get('code')} - {error.get('message')}"))
+
+  async def run_callback(self, coroutine: Awaitable[None]) -> None:
+    try:
+      await coroutine
+    except Exception as e:
+      self.logger.error("Home Assistant websocket callback error - %s %s", type(e), e)
+
+  # Commands
+  def allocate_id(self) -> int:
+    command_id = self.next_id
+    self.next_id += 1
+    return command_id
+
+  async def async_command(self, payload: Dict[str, Any], timeout: Optional[float] = None, command_id: Optional[int] = None) -> Any:
+    await asyncio.wait_for(self.connected.wait(), timeout or self.COMMAND_TIMEOUT)
+    if command_id is None:
+      command_id = self.allocate_id()
+    future = asyncio.get_running_loop().create_future()
+    self.pending[command_id] = future
+    try:
+      await self.ws.send_json({ **payload, 'id': command_id })
+      return await asyncio.wait_for(future, timeout or self.COMMAND_TIMEOUT)
+    finally:
+      self.pending.pop(command_id, None)
+
+  async def subscribe(self, event_type: Optional[str]) -> None:
+    command_id = self.allocate_id()
+    self.subscriptions[command_id] = event_type # Registered before sending, events may follow the result immediately
+    try:
+      await self.async_command({ 'type': 'subscribe_events', **({ 'event_type': event_type } if event_type is not None else {}) }, command_id=command_id)
+    except Exception:
+      self.subscriptions.pop(command_id, None)
+      raise
+
+  # Listeners
+  def add_event_listener(self, event_type: str, callback: EventCallback) -> None:
+    is_subscribed = any(x == event_type for x, _ in self.listeners)
+    self.listeners.append((event_type, callback))
+    if not is_subscribed and self.connected.is_set():
+      asyncio.create_task(self.run_callback(self.subscribe(event_type)))
+
+  def remove_event_listener(self, event_type: str, callback: EventCallback) -> None:
+    self.listeners = [x for x in self.listeners if x != (event_type, callback)]
+
+  def add_connect_listener(self, callback: ConnectCallback) -> None:
+    """The callback receives True when the connection was re-established"""
+    self.connect_callbacks.append(callback)
+
+  def remove_connect_listener(self, callback: ConnectCallback) -> None:
+    self.connect_callbacks = [x for x in self.connect_callbacks if x != callback]
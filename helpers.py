@@ -1,6 +1,9 @@
 import re
+import asyncio
+import json
+import codecs
 from Levenshtein import distance as levenshtein_distance
-from typing import TypeVar, Callable, Iterable, List, Optional
+from typing import TypeVar, Callable, Iterable, Iterator, List, Optional, Any, Awaitable, Dict, Hashable
 
 T = TypeVar('T')
 
@@ -107,4 +110,125 @@ def fuzzy_keyword_match_with_order(target_tokens: list[str], input_tokens: list[
   ) / len(match_indexes)
 
   # Final score: mostly fuzzy match + small bonus for order
-  return 0.9 * average_similarity + 0.1 * order_score
\ No newline at end of file
+  return 0.9 * average_similarity + 0.1 * order_score
+
+# JSON (orjson is optional, used for the large Home Assistant responses when installed)
+try:
+  import orjson
+  json_loads: Callable[[bytes | str], Any] = orjson.loads
+  json_dumps: Callable[[Any], bytes] = orjson.dumps
+except ImportError:
+  json_loads = json.loads
+  json_dumps = lambda obj: json.dumps(obj, separators=(',', ':')).encode()
+
+JSON_DECODER = json.JSONDecoder()
+JSON_WHITESPACE = ' \t\n\r'
+
+def iter_json_array(data: bytes, chunk_size: int = 1024 * 1024) -> Iterator[Any]:
+  """Decodes the items of a JSON array one at a time, only a chunk of the text is decoded at once"""
+  decoder = codecs.getincrementaldecoder('utf-8')()
+  buffer = ''
+  position = 0
+  consumed = 0 # Bytes of data decoded into the buffer
+
+  def fill() -> bool:
+    """Appends the next chunk to the rest of the buffer, False at the end of the data"""
+    nonlocal buffer, position, consumed
+    if consumed >= len(data):
+      return False
+    end = consumed + chunk_size
+    buffer = buffer[position:] + decoder.decode(data[consumed:end], end >= len(data))
+    position = 0
+    consumed = end
+    return True
+
+  def skip_whitespace() -> str:
+    """Next character after the whitespace ('' at the end of the data)"""
+    nonlocal position
+    while True:
+      while position < len(buffer) and buffer[position] in JSON_WHITESPACE:
+        position += 1
+      if position < len(buffer):
+        return buffer[position]
+      if not fill():
+        return ''
+
+  if skip_whitespace() != '[':
+    raise ValueError("Expected a JSON array")
+  position += 1
+  if skip_whitespace() == ']':
+    return
+  while True:
+    skip_whitespace()
+    if len(buffer) - position < chunk_size // 2: # Most items are then decoded on the first attempt
+      fill()
+    while True:
+      try:
+        item, end = JSON_DECODER.raw_decode(buffer, position)
+        following = end
+        while following < len(buffer) and buffer[following] in JSON_WHITESPACE:
+          following += 1
+        if (following < len(buffer) and buffer[following] in ',]') or consumed >= len(data): # Otherwise a number may continue in the next chunk
+          break
+      except json.JSONDecodeError:
+        if consumed >= len(data):
+          raise
+      fill()
+    yield item
+    position = end
+
+    separator = skip_whitespace()
+    if separator == ']':
+      return
+    if separator != ',':
+      raise ValueError("Expected ',' or ']' in the JSON array")
+    position += 1
+
+# Recently used values
+class RecentValues():
+  """Most recently used values (the latest first)"""
+  def __init__(self, limit: int = 50):
+    self.limit = limit
+    self.values: Dict[str, None] = {}
+
+  def add(self, *values: str) -> None:
+    for value in values:
+      self.values.pop(value, None)
+      self.values[value] = None # Insertion order - the latest last
+    while len(self.values) > self.limit:
+      del self.values[next(iter(self.values))]
+
+  def __iter__(self) -> Iterator[str]:
+    return reversed(self.values)
+
+  def __len__(self) -> int:
+    return len(self.values)
+
+# Deduplicating concurrent work
+
+class SingleFlightCall():
+  __slots__ = ('task', 'waiters')
+
+  def __init__(self, task: asyncio.Task):
+    self.task = task
+    self.waiters = 0
+
+class SingleFlight():
+  """Concurrent calls with the same key share a single run, which is cancelled once all of its callers were cancelled"""
+  def __init__(self):
+    self.calls: Dict[Hashable, SingleFlightCall] = {}
+
+  async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+    call = self.calls.get(key)
+    if call is None:
+      call = self.calls[key] = SingleFlightCall(asyncio.create_task(func()))
+      call.task.add_done_callback(lambda _: self.calls.pop(key) if self.calls.get(key) is call else None)
+    call.waiters += 1
+    try:
+      return await asyncio.shield(call.task) # Cancelling one caller does not cancel the others
+    finally:
+      call.waiters -= 1
+      if call.waiters == 0 and not call.task.done():
+        call.task.cancel()
+        if self.calls.get(key) is call: # Later callers start a new run
+          del self.calls[key]
@@ -1,3 +1,4 @@
+from metrics import METRICS # Imported first - marks the process start
 import logging
 from logging.handlers import RotatingFileHandler
 import os
@@ -26,6 +27,8 @@ logger.addHandler(handler)
 file_logger.addHandler(handler)
 file_logger.addHandler(file_handler)
 
+METRICS.startup.mark("imports done")
+
 HASSDiscordBot(
   logger=logger,
   file_logger=file_logger
@@ -0,0 +1,127 @@
+import time
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from typing import List, Optional, Iterator, Callable, Deque, TYPE_CHECKING
+
+if TYPE_CHECKING:
+  from scheduler import RequestScheduler
+
+PROCESS_STARTED = time.perf_counter() # metrics is the first module imported by main.py
+
+class TimelineEntry():
+  def __init__(self, name: str, start: float, end: Optional[float] = None):
+    self.name = name
+    self.start = start # Seconds since process start
+    self.end = end # None - still running
+
+  @property
+  def duration(self) -> Optional[float]:
+    return self.end - self.start if self.end is not None else None
+
+class Timeline():
+  def __init__(self, started: float = PROCESS_STARTED):
+    self.started = started
+    self.entries: List[TimelineEntry] = []
+
+  def now(self) -> float:
+    return time.perf_counter() - self.started
+
+  def begin(self, name: str) -> TimelineEntry:
+    entry = TimelineEntry(name, self.now())
+    self.entries.append(entry)
+    return entry
+
+  def end(self, entry: TimelineEntry) -> None:
+    entry.end = self.now()
+
+  def mark(self, name: str) -> TimelineEntry:
+    """Records an instant event"""
+    entry = self.begin(name)
+    entry.end = entry.start
+    return entry
+
+  @contextmanager
+  def span(self, name: str) -> Iterator[TimelineEntry]:
+    entry = self.begin(name)
+    try:
+      yield entry
+    finally:
+      self.end(entry)
+
+  def get(self, name: str) -> Optional[TimelineEntry]:
+    for entry in self.entries:
+      if entry.name == name:
+        return entry
+    return None
+
+  def format(self) -> List[str]:
+    lines: List[str] = []
+    for entry in sorted(self.entries, key=lambda x: x.start):
+      if entry.end is None:
+        lines.append(f'{entry.start * 1000:9.1f} ms  {entry.name} (running)')
+      elif entry.duration == 0:
+        lines.append(f'{entry.start * 1000:9.1f} ms  {entry.name}')
+      else:
+        lines.append(f'{entry.start * 1000:9.1f} ms  {entry.name} ({entry.duration * 1000:.1f} ms)')
+    return lines
+
+class LoopLagMonitor():
+  """Measures how late a periodic sleep wakes up - the time the event loop was blocked"""
+  def __init__(self, interval: float = 0.5, history: int = 120):
+    self.interval = interval
+    self.samples: Deque[float] = deque(maxlen=history) # Recent lags (seconds)
+    self.max_lag = 0.0
+    self.blocked_count = 0
+    self.threshold = 0.1
+    self.on_blocked: Optional[Callable[[float], None]] = None
+    self.task: Optional[asyncio.Task] = None
+
+  def start(self, threshold: float = 0.1, on_blocked: Optional[Callable[[float], None]] = None) -> None:
+    self.threshold = threshold
+    self.on_blocked = on_blocked
+    if self.task is None:
+      self.task = asyncio.create_task(self.run())
+
+  def stop(self) -> None:
+    if self.task is not None:
+      self.task.cancel()
+      self.task = None
+
+  async def run(self) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+      expected = loop.time() + self.interval
+      await asyncio.sleep(self.interval)
+      self.record(max(0.0, loop.time() - expected))
+
+  def record(self, lag: float) -> None:
+    self.samples.append(lag)
+    self.max_lag = max(self.max_lag, lag)
+    if lag >= self.threshold:
+      self.blocked_count += 1
+      if self.on_blocked is not None:
+        self.on_blocked(lag)
+
+  def format(self) -> List[str]:
+    if len(self.samples) == 0:
+      return ['no samples']
+    recent = sorted(self.samples)
+    return [
+      f'recent median {recent[len(recent) // 2] * 1000:.1f} ms, recent max {recent[-1] * 1000:.1f} ms',
+      f'max {self.max_lag * 1000:.1f} ms, blocked >= {self.threshold * 1000:.0f} ms {self.blocked_count} times'
+    ]
+
+class Metrics():
+  def __init__(self):
+    self.startup = Timeline()
+    self.loop_lag = LoopLagMonitor()
+    self.requests: Optional['RequestScheduler'] = None # Home Assistant request scheduler, set by the bot
+
+  def format(self) -> str:
+    sections: List[str] = ['Startup timeline:', *self.startup.format(), '', 'Event loop lag:', *self.loop_lag.format()]
+    if self.requests is not None:
+      sections += ['', 'Home Assistant requests:', *self.requests.format()]
+    return '\n'.join(sections)
+
+METRICS = Metrics()
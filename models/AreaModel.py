@@ -1,8 +1,8 @@
 from pydantic import BaseModel
-from typing import List
+from models.InternedIdList import InternedIdList
 
 class AreaModel(BaseModel):
   id: str
   name: str
-  entities: List[str]
-  devices: List[str]
\ No newline at end of file
+  entities: InternedIdList
+  devices: InternedIdList
\ No newline at end of file
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional
+from models.InternedIdList import InternedIdList
+
+class DeviceDisplayModel(BaseModel):
+  id: str
+  name: Optional[str] = None # Can be empty in the registry, see `display_name`
+  name_by_user: Optional[str] = None
+  manufacturer: Optional[str] = None
+  model: Optional[str] = None
+  model_id: Optional[str] = None
+  entities: InternedIdList
+
+  @property
+  def display_name(self) -> str:
+    return self.name or self.name_by_user or self.id
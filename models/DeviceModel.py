@@ -1,15 +1,20 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Optional
+from models.InternedIdList import InternedIdList
 
 class DeviceModel(BaseModel):
   id: str
   area_id: Optional[str] = None
-  name: str
+  name: Optional[str] = None # Can be empty in the registry, see `display_name`
   name_by_user: Optional[str] = None
-  entities: List[str]
+  entities: InternedIdList
   manufacturer: Optional[str] = None
   model: Optional[str] = None
   model_id: Optional[str] = None
   serial_number: Optional[str] = None
   hw_version: Optional[str] = None
-  sw_version: Optional[str] = None
\ No newline at end of file
+  sw_version: Optional[str] = None
+
+  @property
+  def display_name(self) -> str:
+    return self.name or self.name_by_user or self.id
@@ -0,0 +1,32 @@
+import sys
+from typing import Any, Optional
+
+from helpers import get_domain_from_entity_id
+from models.EntityRecord import intern_str
+
+class EntityDisplayRecord():
+  """Entity fields used by autocompletes (`EntityRecord` keeps the state and attributes)"""
+  __slots__ = ('entity_id', 'domain', 'friendly_name', 'device_class', 'supported_features')
+
+  def __init__(
+    self,
+    entity_id: str,
+    friendly_name: Optional[str] = None,
+    device_class: Any = None,
+    supported_features: Any = None
+  ):
+    self.entity_id: str = sys.intern(entity_id)
+    self.domain: Optional[str] = intern_str(get_domain_from_entity_id(entity_id))
+    self.friendly_name: Optional[str] = friendly_name
+    self.device_class: Any = intern_str(device_class)
+    self.supported_features: Any = supported_features
+
+  @classmethod
+  def from_row(cls, row: Any) -> 'EntityDisplayRecord':
+    """Creates the record from the `[entity_id, friendly_name, device_class, supported_features]` row"""
+    if not isinstance(row, list) or len(row) != 4 or not isinstance(row[0], str):
+      raise ValueError(f"Invalid entity row {str(row)[:100]}")
+    return cls(*row)
+
+  def __repr__(self) -> str:
+    return f'EntityDisplayRecord(entity_id={self.entity_id!r}, friendly_name={self.friendly_name!r})'
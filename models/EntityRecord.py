@@ -0,0 +1,77 @@
+import sys
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from helpers import json_loads, json_dumps, get_domain_from_entity_id
+
+def intern_str(value: Any) -> Any:
+  return sys.intern(value) if isinstance(value, str) else value
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+  return datetime.fromisoformat(value) if value is not None else None
+
+class EntityRecord():
+  """
+  Compact cached entity (`EntityModel` is used for single entity details).
+  Keeps the fields used by autocompletes and listings, the attributes are stored as JSON and decoded on access.
+  """
+  __slots__ = (
+    'entity_id', 'domain', 'state', 'friendly_name', 'device_class', 'supported_features',
+    'attribute_keys', 'raw_attributes', 'raw_last_changed', 'raw_last_updated', 'raw_last_reported'
+  )
+
+  def __init__(
+    self,
+    entity_id: str,
+    state: str,
+    attributes: Dict[str, Any],
+    last_changed: Optional[str] = None,
+    last_updated: Optional[str] = None,
+    last_reported: Optional[str] = None
+  ):
+    # Ids, states, device classes and attribute names repeat across entities and snapshots
+    self.entity_id: str = sys.intern(entity_id)
+    self.domain: Optional[str] = intern_str(get_domain_from_entity_id(entity_id))
+    self.state: str = sys.intern(state)
+    self.friendly_name: Optional[str] = attributes.get('friendly_name')
+    self.device_class: Any = intern_str(attributes.get('device_class'))
+    self.supported_features: Any = attributes.get('supported_features')
+    self.attribute_keys: Tuple[str, ...] = tuple(sys.intern(key) for key in attributes)
+    self.raw_attributes: bytes = bytes(memoryview(json_dumps(attributes))) # Exact size copy - orjson output keeps a 4 KiB allocation
+    # The timestamps are usually equal, keep a single string then
+    self.raw_last_changed = last_changed
+    self.raw_last_updated = last_changed if last_updated == last_changed else last_updated
+    self.raw_last_reported = self.raw_last_updated if last_reported == last_updated else last_reported
+
+  @classmethod
+  def from_state(cls, state: Any) -> 'EntityRecord':
+    """Creates the record from the `/api/states` item"""
+    if not isinstance(state, dict) or not isinstance(state.get('entity_id'), str) or not isinstance(state.get('state'), str) or not isinstance(state.get('attributes'), dict):
+      raise ValueError(f"Invalid entity state {str(state)[:100]}")
+    return cls(
+      state['entity_id'],
+      state['state'],
+      state['attributes'],
+      state.get('last_changed'),
+      state.get('last_updated'),
+      state.get('last_reported')
+    )
+
+  @property
+  def attributes(self) -> Dict[str, Any]:
+    return json_loads(self.raw_attributes)
+
+  @property
+  def last_changed(self) -> Optional[datetime]:
+    return parse_datetime(self.raw_last_changed)
+
+  @property
+  def last_updated(self) -> Optional[datetime]:
+    return parse_datetime(self.raw_last_updated)
+
+  @property
+  def last_reported(self) -> Optional[datetime]:
+    return parse_datetime(self.raw_last_reported)
+
+  def __repr__(self) -> str:
+    return f'EntityRecord(entity_id={self.entity_id!r}, state={self.state!r})'
@@ -1,8 +1,8 @@
 from pydantic import BaseModel
-from typing import List
+from models.InternedIdList import InternedIdList
 
 class FloorModel(BaseModel):
   id: str
   name: str
-  areas: List[str]
-  entities: List[str]
\ No newline at end of file
+  areas: InternedIdList
+  entities: InternedIdList
\ No newline at end of file
@@ -0,0 +1,82 @@
+import threading
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import core_schema
+
+class IdInterner():
+  """Maps registry ids (entities, devices, areas, labels) to dense ints"""
+  def __init__(self):
+    self.ids: Dict[str, int] = {}
+    self.strings: List[str] = []
+    self.lock = threading.Lock() # Registries may be parsed in a worker thread
+
+  def intern(self, value: str) -> int:
+    index = self.ids.get(value)
+    if index is None:
+      with self.lock:
+        index = self.ids.get(value)
+        if index is None:
+          index = len(self.strings)
+          self.strings.append(value)
+          self.ids[value] = index
+    return index
+
+  def lookup(self, value: str) -> Optional[int]:
+    return self.ids.get(value)
+
+  def lookup_set(self, values: Iterable[str]) -> Set[int]:
+    """Ids of the known values (the unknown ones can't be a member of any list)"""
+    result = set(map(self.ids.get, values))
+    result.discard(None)
+    return result
+
+  def get(self, index: int) -> str:
+    return self.strings[index]
+
+# Shared by all registry snapshots, so the memberships of separately cached registries can be joined on ints
+ID_INTERNER = IdInterner()
+
+class InternedIdList():
+  """Immutable list of registry ids stored as a packed array of interned ints"""
+  __slots__ = ('ids',)
+
+  def __init__(self, values: Iterable[str] = ()):
+    self.ids: array = array('I', map(ID_INTERNER.intern, values))
+
+  def __len__(self) -> int:
+    return len(self.ids)
+
+  def __iter__(self) -> Iterator[str]:
+    strings = ID_INTERNER.strings
+    return (strings[index] for index in self.ids)
+
+  def __getitem__(self, index: int) -> str:
+    return ID_INTERNER.strings[self.ids[index]]
+
+  def __contains__(self, value: Any) -> bool:
+    index = ID_INTERNER.lookup(value) if isinstance(value, str) else None
+    return index is not None and index in self.ids
+
+  def __eq__(self, other: Any) -> bool:
+    if isinstance(other, InternedIdList):
+      return self.ids == other.ids
+    if isinstance(other, list):
+      return list(self) == other
+    return NotImplemented
+
+  def __repr__(self) -> str:
+    return f'InternedIdList({list(self)!r})'
+
+  def intersects(self, ids: Set[int]) -> bool:
+    """Whether any member is in the set of interned ids"""
+    return not ids.isdisjoint(self.ids)
+
+  @classmethod
+  def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+    return core_schema.no_info_after_validator_function(
+      cls,
+      handler(List[str]),
+      serialization=core_schema.plain_serializer_function_ser_schema(list)
+    )
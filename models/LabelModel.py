@@ -1,10 +1,11 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Optional
+from models.InternedIdList import InternedIdList
 
 class LabelModel(BaseModel):
   id: str
   name: str
   description: Optional[str]
-  areas: List[str]
-  devices: List[str]
-  entities: List[str]
\ No newline at end of file
+  areas: InternedIdList
+  devices: InternedIdList
+  entities: InternedIdList
\ No newline at end of file
@@ -1,6 +1,6 @@
 from __future__ import annotations
-from pydantic import BaseModel
-from typing import List, Dict, Optional, Any
+from pydantic import BaseModel, Discriminator, Tag, BeforeValidator, field_validator, create_model
+from typing import List, Dict, Optional, Any, Annotated, Union
 from enum import Enum
 
 # Sources:
@@ -208,7 +208,7 @@ class ServiceFieldSelectorNumber(BaseModel, extra='forbid'):
   translation_key: Optional[str] = None
 
 class ServiceFieldSelectorObjectField(BaseModel, extra='forbid'):
-  selector: ServiceFieldSelector
+  selector: ParsedServiceFieldSelector
   label: Optional[str] = None
   required: Optional[bool] = None
 
@@ -358,6 +358,44 @@ class ServiceFieldSelector(BaseModel, extra='forbid'):
   ui_color: Optional[ServiceFieldSelectorUIColor] = None
   ui_state_content: Optional[ServiceFieldSelectorUIStateContext] = None
 
+# Home Assistant sends selectors with a single type key. They are parsed into models holding just that type
+# (the full model has to fill in dozens of defaults), other types read as None like in ServiceFieldSelector.
+class ServiceFieldSelectorSingle(BaseModel, extra='forbid'):
+  def __getattr__(self, name: str) -> Any:
+    if name in ServiceFieldSelector.model_fields:
+      return None
+    return super().__getattr__(name)
+
+def replace_null_selector(data: Any) -> Any:
+  # `[type]: null` selectors have no options
+  if isinstance(data, dict) and None in data.values():
+    if data.keys() == ServiceFieldSelector.model_fields.keys(): # Dumped full model - null types are not set
+      return { key: value for key, value in data.items() if value is not None }
+    return { key: {} if value is None else value for key, value in data.items() }
+  return data
+
+def get_selector_tag(data: Any) -> Optional[str]:
+  if isinstance(data, dict):
+    if len(data) == 1:
+      return next(iter(data))
+    return 'empty' if len(data) == 0 else 'multiple'
+  if isinstance(data, ServiceFieldSelectorSingle):
+    return next(iter(type(data).model_fields), 'empty')
+  return 'multiple' if isinstance(data, ServiceFieldSelector) else None
+
+def create_single_selectors():
+  # Tagged union dispatching on the selector type key, selectors with multiple keys use the full model
+  single_selectors: List[Any] = [
+    Annotated[ServiceFieldSelector, Tag('multiple')],
+    Annotated[create_model('ServiceFieldSelectorEmpty', __base__=ServiceFieldSelectorSingle), Tag('empty')]
+  ]
+  for name, field in ServiceFieldSelector.model_fields.items():
+    model_name = 'ServiceFieldSelectorSingle' + ''.join(x.capitalize() for x in name.split('_'))
+    single_selectors.append(Annotated[create_model(model_name, __base__=ServiceFieldSelectorSingle, **{ name: (field.annotation, ...) }), Tag(name)])
+  return Annotated[Union[tuple(single_selectors)], Discriminator(get_selector_tag), BeforeValidator(replace_null_selector)]
+
+ParsedServiceFieldSelector = create_single_selectors()
+
 # Legacy replacers
 def replaceLegacyEntitySelector(selector: ServiceFieldSelectorEntityLegacy | ServiceFieldSelectorEntity):
   if not isinstance(selector, ServiceFieldSelectorEntityLegacy):
@@ -434,7 +472,7 @@ class ServiceField(BaseModel, extra='forbid'):
   name: Optional[str] = None
   required: Optional[bool] = None
   advanced: Optional[bool] = None
-  selector: Optional[ServiceFieldSelector] = None # Field is not displayed if it's missing (only available in YAML mode)
+  selector: Optional[ParsedServiceFieldSelector] = None # Field is not displayed if it's missing (only available in YAML mode)
   filter: Optional[ServiceFieldFilter] = None # Unable to utilize this information as the arguments are pre-created within slash-commands
 
 class ServiceFieldCollection(BaseModel, extra='forbid'):
@@ -452,6 +490,17 @@ class ServiceModel(BaseModel, extra='forbid'):
   target: Optional[ServiceFieldSelectorTarget] = None # `area_id`, `floor_id`, `device_id``, `entity_id`, `label_id` can be passed as a target
   response: Optional[ServiceResponse] = None
 
+  @field_validator('target', mode='before')
+  @classmethod
+  def replace_target_lists(cls, target: Any) -> Any:
+    # Service targets list the filters, only the first one is used
+    if isinstance(target, dict) and (isinstance(target.get('entity'), list) or isinstance(target.get('device'), list)):
+      target = dict(target)
+      for key in ('entity', 'device'):
+        if isinstance(target.get(key), list):
+          target[key] = target[key][0] if len(target[key]) > 0 else None
+    return target
+
 class DomainModel(BaseModel, extra='forbid'):
   domain: str
   services: Dict[str, ServiceModel]
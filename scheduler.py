@@ -0,0 +1,165 @@
+import time
+import asyncio
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from enums.HomeAssistantRequestPriority import HomeAssistantRequestPriority
+
+REQUEST_PRIORITY: ContextVar[HomeAssistantRequestPriority] = ContextVar('REQUEST_PRIORITY', default=HomeAssistantRequestPriority.DETAILS)
+
+class SharedPriority():
+  """Priority of work shared by several callers (e.g. a cache fetch) - raised to the most important caller's, also for its queued requests"""
+  def __init__(self, scheduler: 'RequestScheduler', priority: HomeAssistantRequestPriority):
+    self.scheduler = scheduler
+    self.priority = priority
+    self.waiting: Dict[asyncio.Future, HomeAssistantRequestPriority] = {} # Queued requests -> class they wait in
+    self.children: Set['SharedPriority'] = set() # Shared work the work waits for
+
+  def raise_priority(self, priority: HomeAssistantRequestPriority) -> None:
+    if priority >= self.priority:
+      return
+    self.priority = priority
+    for waiter, current in list(self.waiting.items()):
+      self.scheduler.move(waiter, current, priority)
+      self.waiting[waiter] = priority
+    for child in self.children:
+      child.raise_priority(priority)
+    self.scheduler.wake()
+
+SHARED_PRIORITY: ContextVar[Optional[SharedPriority]] = ContextVar('SHARED_PRIORITY', default=None)
+
+def get_request_priority() -> HomeAssistantRequestPriority:
+  """Priority of the requests made in the current task"""
+  shared = SHARED_PRIORITY.get()
+  return shared.priority if shared is not None else REQUEST_PRIORITY.get()
+
+@contextmanager
+def request_priority(priority: HomeAssistantRequestPriority) -> Iterator[None]:
+  """Priority of the Home Assistant requests made in the block (and in the tasks it creates)"""
+  token = REQUEST_PRIORITY.set(priority)
+  try:
+    yield
+  finally:
+    REQUEST_PRIORITY.reset(token)
+
+# The lower classes together stay below the global limit - one slot is always left for a service call
+DEFAULT_CLASS_LIMITS: Dict[HomeAssistantRequestPriority, int] = {
+  HomeAssistantRequestPriority.SERVICE: 10,
+  HomeAssistantRequestPriority.AUTOCOMPLETE: 4,
+  HomeAssistantRequestPriority.DETAILS: 3,
+  HomeAssistantRequestPriority.BACKGROUND: 2
+}
+
+class RequestClassStats():
+  def __init__(self, history: int = 200):
+    self.started = 0
+    self.queued = 0 # Requests which had to wait for a slot
+    self.running = 0
+    self.waiting = 0
+    self.max_wait = 0.0
+    self.waits: Deque[float] = deque(maxlen=history) # Recent queue times (seconds)
+
+  def record(self, wait: float) -> None:
+    self.started += 1
+    if wait > 0:
+      self.queued += 1
+    self.max_wait = max(self.max_wait, wait)
+    self.waits.append(wait)
+
+class RequestScheduler():
+  """Limits the concurrent requests, waiting requests are started by priority (FIFO within a class)"""
+  def __init__(self, max_concurrency: int = 10, class_limits: Optional[Dict[HomeAssistantRequestPriority, int]] = None):
+    self.max_concurrency = max_concurrency
+    self.class_limits: Dict[HomeAssistantRequestPriority, int] = DEFAULT_CLASS_LIMITS | (class_limits or {})
+    self.running = 0
+    self.waiters: Dict[HomeAssistantRequestPriority, Deque[asyncio.Future]] = { priority: deque() for priority in HomeAssistantRequestPriority }
+    self.stats: Dict[HomeAssistantRequestPriority, RequestClassStats] = { priority: RequestClassStats() for priority in HomeAssistantRequestPriority }
+
+  def can_start(self, priority: HomeAssistantRequestPriority) -> bool:
+    return self.running < self.max_concurrency and self.stats[priority].running < min(self.class_limits[priority], self.max_concurrency)
+
+  def start(self, priority: HomeAssistantRequestPriority) -> None:
+    self.running += 1
+    self.stats[priority].running += 1
+
+  def release(self, priority: HomeAssistantRequestPriority) -> None:
+    self.running -= 1
+    self.stats[priority].running -= 1
+    self.wake()
+
+  def wake(self) -> None:
+    for priority in HomeAssistantRequestPriority: # Ascending - the most important first
+      waiters = self.waiters[priority]
+      while len(waiters) > 0 and self.can_start(priority):
+        waiter = waiters.popleft()
+        if waiter.done(): # Cancelled while waiting
+          continue
+        self.stats[priority].waiting -= 1
+        self.start(priority)
+        waiter.set_result(priority) # The class of the granted slot
+
+  def move(self, waiter: asyncio.Future, priority: HomeAssistantRequestPriority, new_priority: HomeAssistantRequestPriority) -> None:
+    """Moves a queued request to another class"""
+    if waiter.done() or waiter not in self.waiters[priority]:
+      return
+    self.waiters[priority].remove(waiter)
+    self.stats[priority].waiting -= 1
+    self.waiters[new_priority].append(waiter)
+    self.stats[new_priority].waiting += 1
+
+  async def acquire(self, priority: HomeAssistantRequestPriority, shared: Optional[SharedPriority] = None) -> Tuple[float, HomeAssistantRequestPriority]:
+    """Waits for a slot, returns the queue time and the class of the slot. `shared` - the request can be moved to a higher class while queued"""
+    if shared is not None:
+      priority = shared.priority
+    if len(self.waiters[priority]) == 0 and self.can_start(priority):
+      self.start(priority)
+      return 0.0, priority
+    queued = time.perf_counter()
+    waiter = asyncio.get_running_loop().create_future()
+    self.waiters[priority].append(waiter)
+    self.stats[priority].waiting += 1
+    if shared is not None:
+      shared.waiting[waiter] = priority
+    try:
+      priority = await waiter
+    except asyncio.CancelledError:
+      if shared is not None:
+        priority = shared.waiting[waiter]
+      if waiter.done() and not waiter.cancelled(): # The slot was granted in the meantime
+        self.release(waiter.result())
+      else:
+        if waiter in self.waiters[priority]: # Not skipped by `wake` yet
+          self.waiters[priority].remove(waiter)
+        self.stats[priority].waiting -= 1
+      raise
+    finally:
+      if shared is not None:
+        shared.waiting.pop(waiter, None)
+    return time.perf_counter() - queued, priority
+
+  @asynccontextmanager
+  async def slot(self, priority: Optional[HomeAssistantRequestPriority] = None) -> AsyncIterator[None]:
+    """`priority` - defaults to the priority set by `request_priority`, or the priority of the shared work the request is made for"""
+    shared = None
+    if priority is None:
+      shared = SHARED_PRIORITY.get()
+      priority = REQUEST_PRIORITY.get()
+    wait, priority = await self.acquire(priority, shared)
+    self.stats[priority].record(wait)
+    try:
+      yield
+    finally:
+      self.release(priority)
+
+  def format(self) -> List[str]:
+    lines: List[str] = [f'running {self.running}/{self.max_concurrency}']
+    for priority, stats in self.stats.items():
+      recent = sorted(stats.waits)
+      median = recent[len(recent) // 2] if len(recent) > 0 else 0.0
+      lines.append(
+        f'{priority.name.lower()}: {stats.started} requests ({stats.queued} queued), running {stats.running}/{self.class_limits[priority]}, waiting {stats.waiting}, '
+        f'queue time recent median {median * 1000:.1f} ms, max {stats.max_wait * 1000:.1f} ms'
+      )
+    return lines